@@ -0,0 +1,54 @@
+"""Benchmark palette quantization throughput per dither mode, in megapixels per second.
+
+uv run python benchmarks/dither.py
+uv run python benchmarks/dither.py --sides 256 1024 --palettes gameboy nes
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from pixelsmith._dither import DITHER_MODES
+from pixelsmith._palettes import Palette, get_palette
+from pixelsmith._postprocess import quantize_array
+
+
+def _smooth_image(side: int, rng: np.random.Generator) -> np.ndarray:
+    """Gradients plus mild noise: the banding-prone content dithering is for."""
+    y, x = np.mgrid[0:side, 0:side].astype(np.float32) / side
+    image = np.stack([x * 255, y * 255, (1 - x) * y * 255], axis=-1)
+    image += rng.normal(0, 4, image.shape)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sides", type=int, nargs="+", default=[256, 1024])
+    parser.add_argument("--palettes", nargs="+", default=["gameboy", "pico8", "nes"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'palette':>8} {'side':>5} {'dither':>16} {'MPix/s':>8}")
+    for name in args.palettes:
+        for side in args.sides:
+            image = _smooth_image(side, rng)
+            out = np.empty_like(image)
+            for mode in (None, *DITHER_MODES):
+                # A fresh palette per row, so earlier rows' lookup structures don't help.
+                palette = Palette(name, get_palette(name).colors)
+                quantize_array(image, palette, out=out, dither=mode)  # warm-up
+                best = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    quantize_array(image, palette, out=out, dither=mode)
+                    best = min(best, time.perf_counter() - start)
+                mpix = side * side / 1e6 / best
+                print(f"{name:>8} {side:>5} {mode or 'none':>16} {mpix:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Benchmark downscale modes on a raw-render-sized image, in milliseconds.
+
+uv run python benchmarks/downscale.py
+uv run python benchmarks/downscale.py --render 1024 --sizes 32 64 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from pixelsmith._downscale import DOWNSCALE_MODES
+from pixelsmith._postprocess import Downscale, run_stages
+
+
+def _render(side: int, rng: np.random.Generator) -> np.ndarray:
+    """Flat 16 px cells plus render noise: roughly what the pixel-art LoRA produces."""
+    cells = rng.integers(0, 256, (side // 16 + 1, side // 16 + 1, 3), dtype=np.uint8)
+    image = cells.repeat(16, axis=0).repeat(16, axis=1)[:side, :side].astype(np.int16)
+    image += rng.integers(-3, 4, image.shape, dtype=np.int16)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--render", type=int, default=1024)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[32, 64, 100, 128])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    image = _render(args.render, rng)
+    print(f"{'size':>5} " + " ".join(f"{mode:>8}" for mode in DOWNSCALE_MODES))
+    for size in args.sizes:
+        row = []
+        for mode in DOWNSCALE_MODES:
+            stage = Downscale(size, mode)
+            run_stages(image, [stage])  # warm-up
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                run_stages(image, [stage])
+                best = min(best, time.perf_counter() - start)
+            row.append(f"{best * 1e3:>6.2f}ms")
+        print(f"{size:>5} " + " ".join(row))
+
+
+if __name__ == "__main__":
+    main()
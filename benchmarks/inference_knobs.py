@@ -0,0 +1,168 @@
+"""Benchmark denoising latency and peak memory per attention / slicing / offload setting.
+
+Runs a tiny randomly initialized SDXL UNet and VAE, so no weights are downloaded;
+every setting runs in a fresh process so peak memory is not shared between rows.
+
+uv run python benchmarks/inference_knobs.py
+uv run python benchmarks/inference_knobs.py --side 256 --steps 8 --device cuda
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from pixelsmith._config import GenerationConfig
+
+# (label, GenerationConfig overrides)
+SETTINGS = [
+    ("default (sdpa)", {}),
+    ("eager attention", {"attention": "eager"}),
+    ("xformers", {"attention": "xformers"}),
+    ("attention slicing", {"attention_slicing": "auto"}),
+    ("vae slicing", {"vae_slicing": True}),
+    ("vae tiling", {"vae_tiling": True}),
+    ("channels_last", {"channels_last": True}),
+    ("1 thread", {"num_threads": 1}),
+]
+
+
+def _tiny_pipeline():
+    import torch
+    from diffusers import (
+        AutoencoderKL,
+        EulerDiscreteScheduler,
+        StableDiffusionXLPipeline,
+        UNet2DConditionModel,
+    )
+
+    torch.manual_seed(0)
+    unet = UNet2DConditionModel(
+        block_out_channels=(32, 64),
+        layers_per_block=1,
+        sample_size=32,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+        up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+        attention_head_dim=(2, 4),
+        transformer_layers_per_block=(1, 2),
+        cross_attention_dim=64,
+        addition_embed_type="text_time",
+        addition_time_embed_dim=8,
+        projection_class_embeddings_input_dim=80,
+        use_linear_projection=True,
+    )
+    vae = AutoencoderKL(
+        block_out_channels=(32, 64),
+        in_channels=3,
+        out_channels=3,
+        down_block_types=("DownEncoderBlock2D", "DownEncoderBlock2D"),
+        up_block_types=("UpDecoderBlock2D", "UpDecoderBlock2D"),
+        latent_channels=4,
+    )
+    return StableDiffusionXLPipeline(
+        vae=vae,
+        text_encoder=None,
+        text_encoder_2=None,
+        tokenizer=None,
+        tokenizer_2=None,
+        unet=unet,
+        scheduler=EulerDiscreteScheduler(),
+    )
+
+
+def _run_one(overrides: dict, side: int, steps: int, device: str, repeat: int) -> dict:
+    """Time one setting in this process; prints a JSON line for the parent."""
+    import torch
+
+    from pixelsmith._pipeline import _apply_inference_options, _place_pipeline
+
+    # Offload only in the rows that ask for it, so the others measure the settings alone.
+    options = {"enable_cpu_offload": False, **overrides}
+    key = GenerationConfig(device=device, **options).load_key()
+    pipe = _tiny_pipeline()
+    # The same two steps _build_pipeline runs after loading weights.
+    _apply_inference_options(pipe, key)
+    pipe = _place_pipeline(pipe, key)
+
+    # 64 = cross_attention_dim; 80 - 6 * 8 = pooled embedding width.
+    embeds = torch.randn(1, 77, 64, device=device)
+    pooled = torch.randn(1, 32, device=device)
+
+    def render():
+        return pipe(
+            prompt_embeds=embeds,
+            pooled_prompt_embeds=pooled,
+            negative_prompt_embeds=torch.zeros_like(embeds),
+            negative_pooled_prompt_embeds=torch.zeros_like(pooled),
+            num_inference_steps=steps,
+            height=side,
+            width=side,
+            output_type="np",
+        )
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    render()  # warm-up
+    if device == "cuda":
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        if device == "cuda":
+            torch.cuda.synchronize()
+        best = min(best, time.perf_counter() - start)
+    if device == "cuda":
+        peak_mb = torch.cuda.max_memory_allocated() / 2**20
+    else:
+        # ru_maxrss is in KiB on Linux: growth of the high-water mark while rendering.
+        peak_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+    return {"seconds": best, "peak_mb": peak_mb}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--side", type=int, default=256)
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        result = _run_one(json.loads(args.child), args.side, args.steps, args.device, args.repeat)
+        print(json.dumps(result))
+        return
+
+    settings = list(SETTINGS)
+    if args.device == "cuda":
+        settings += [
+            ("model offload", {"enable_cpu_offload": True}),
+            ("sequential offload", {"enable_cpu_offload": True, "offload_mode": "sequential"}),
+        ]
+    print(f"{'setting':>20} {'s/image':>8} {'peak MB':>8}")
+    for label, overrides in settings:
+        cmd = [
+            sys.executable,
+            __file__,
+            *("--side", str(args.side), "--steps", str(args.steps)),
+            *("--repeat", str(args.repeat), "--device", args.device),
+            *("--child", json.dumps(overrides)),
+        ]
+        proc = subprocess.run(cmd, capture_output=True, text=True, check=False)
+        if proc.returncode != 0:
+            reason = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+            print(f"{label:>20} {'-':>8} {'-':>8}  ({reason})")
+            continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{label:>20} {result['seconds']:>8.3f} {result['peak_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Benchmark nearest-palette-color strategies: brute force, grid index and LUT.
+
+Prints build and query times per palette size and image size, the winner when the
+structure must be built first, and the strategy ``Palette.nearest_strategy`` picks.
+
+    uv run python benchmarks/nearest.py
+    uv run python benchmarks/nearest.py --colors 16 256 --sides 64 1024
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from pixelsmith._nearest import GridIndex, build_lut, choose_strategy, nearest_brute, pack_rgb
+
+
+def _timed(fn):  # noqa: ANN001, ANN202
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--colors", type=int, nargs="+", default=[4, 16, 40, 256])
+    parser.add_argument("--sides", type=int, nargs="+", default=[64, 256, 1024, 2048])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    header = f"{'colors':>6} {'pixels':>9} {'brute':>9} {'index':>16} {'lut':>16}  best  auto"
+    print(header)
+    print("-" * len(header))
+    for n_colors in args.colors:
+        colors = rng.integers(0, 256, (n_colors, 3), dtype=np.uint8)
+        index, index_build = _timed(lambda colors=colors: GridIndex(colors))
+        lut, lut_build = _timed(lambda colors=colors: build_lut(colors))
+        for side in args.sides:
+            pixels = rng.integers(0, 256, (side * side, 3), dtype=np.uint8)
+            _, brute = _timed(lambda pixels=pixels, colors=colors: nearest_brute(pixels, colors))
+            _, index_query = _timed(lambda pixels=pixels, index=index: index.query(pixels))
+            _, lut_query = _timed(lambda pixels=pixels, lut=lut: lut[pack_rgb(pixels)])
+
+            totals = {
+                "brute": brute,
+                "index": index_build + index_query,
+                "lut": lut_build + lut_query,
+            }
+            best = min(totals, key=totals.__getitem__)
+            auto = choose_strategy(n_colors, len(pixels), has_index=False, has_lut=False)
+            print(
+                f"{n_colors:>6} {len(pixels):>9} {brute * 1e3:>7.1f}ms"
+                f" {index_build * 1e3:>6.1f}+{index_query * 1e3:>7.1f}ms"
+                f" {lut_build * 1e3:>6.0f}+{lut_query * 1e3:>7.1f}ms  {best:<5} {auto}"
+            )
+
+
+if __name__ == "__main__":
+    main()
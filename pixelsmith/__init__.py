@@ -2,32 +2,106 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import importlib
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Any
 
 from pixelsmith._config import GenerationConfig
-from pixelsmith._palettes import C64, GAMEBOY, NES, PICO8, Palette, resolve_palette
-from pixelsmith._pipeline import run_pipeline, unload_pipeline
-from pixelsmith._postprocess import downscale as _downscale
-from pixelsmith._postprocess import quantize_palette as _quantize
+from pixelsmith._embedding_cache import EmbeddingCacheStats
+from pixelsmith._pipeline import (
+    configure_pipeline_cache,
+    embedding_cache_stats,
+    pipeline_cache_stats,
+    run_pipeline,
+    run_pipeline_batch,
+    unload_pipeline,
+)
+from pixelsmith._pipeline_cache import PipelineCacheStats
 from pixelsmith.exceptions import GenerationError, ModelLoadError, PaletteError, PixelsmithError
 
 if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import NDArray
     from PIL import Image
 
+    from pixelsmith._dither import DITHER_MODES
+    from pixelsmith._downscale import DOWNSCALE_MODES
+    from pixelsmith._palettes import C64, GAMEBOY, NES, PICO8, Palette
+    from pixelsmith._postprocess import (
+        Downscale,
+        ImageSource,
+        Outline,
+        Quantize,
+        RenderSource,
+        Stage,
+        StageStats,
+        Upscale,
+    )
+
+# Public names from modules that import NumPy and PIL, loaded on first access
+# (PEP 562) so that importing pixelsmith stays cheap. Torch and diffusers are only
+# imported inside _pipeline when a pipeline is actually loaded.
+_LAZY = {
+    "C64": "pixelsmith._palettes",
+    "GAMEBOY": "pixelsmith._palettes",
+    "NES": "pixelsmith._palettes",
+    "PICO8": "pixelsmith._palettes",
+    "Palette": "pixelsmith._palettes",
+    "DITHER_MODES": "pixelsmith._dither",
+    "DOWNSCALE_MODES": "pixelsmith._downscale",
+    "Downscale": "pixelsmith._postprocess",
+    "Outline": "pixelsmith._postprocess",
+    "Quantize": "pixelsmith._postprocess",
+    "StageStats": "pixelsmith._postprocess",
+    "Upscale": "pixelsmith._postprocess",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY))
+
+
 __version__ = "0.1.0"
 __all__ = [
     "C64",
+    "DITHER_MODES",
+    "DOWNSCALE_MODES",
+    "Downscale",
+    "EmbeddingCacheStats",
     "GAMEBOY",
     "GenerationConfig",
     "GenerationError",
     "ModelLoadError",
     "NES",
+    "Outline",
     "PICO8",
     "Palette",
     "PaletteError",
+    "PipelineCacheStats",
     "PixelsmithError",
+    "Quantize",
+    "StageStats",
+    "Upscale",
+    "configure_pipeline_cache",
     "downscale",
+    "embedding_cache_stats",
     "generate",
+    "generate_batch",
+    "generate_sheet",
+    "generate_variants",
+    "pipeline_cache_stats",
+    "postprocess",
+    "quantize_array",
     "quantize_palette",
     "unload_pipeline",
 ]
@@ -43,6 +117,10 @@ def generate(
     palette: str | Palette | None = None,
     seed: int | None = None,
     config: GenerationConfig | None = None,
+    preview: bool = False,
+    indexed: bool = False,
+    dither: str | None = None,
+    downscale_mode: str = "nearest",
 ) -> Image.Image:
     """Generate pixel art from a text prompt.
 
@@ -53,37 +131,352 @@ def generate(
         palette: Optional palette name ("nes", "gameboy", "pico8", "c64") or Palette object.
         seed: Optional seed for reproducibility.
         config: Optional GenerationConfig for advanced settings.
+        preview: Render a fast, low-fidelity draft (see GenerationConfig.as_preview).
+        indexed: Return a "P" mode image carrying the palette (ignored without one).
+        dither: Optional dithering when quantizing: "bayer2", "bayer4", "bayer8" or
+            "floyd_steinberg".
+        downscale_mode: How each output pixel is picked from the render: "nearest"
+            (default), "center", "mode" (dominant color) or "median" per block.
 
     Returns:
         PIL Image with the generated pixel art.
     """
+    from pixelsmith._dither import check_dither
+    from pixelsmith._downscale import check_downscale_mode
+    from pixelsmith._palettes import resolve_palette
+    from pixelsmith._postprocess import finalize
+    from pixelsmith._result_cache import raw_key, result_cache_for, sprite_key
+
+    cfg = _resolve_config(config, preview)
+    resolved_pal = resolve_palette(palette)
+    check_dither(dither)
+    check_downscale_mode(downscale_mode)
+    post = {"indexed": indexed, "dither": dither, "downscale_mode": downscale_mode}
+
+    # Unseeded results are random by design, so only seeded ones are cacheable.
+    if not _cacheable(cfg, seed):
+        raw_image = _render(prompt, negative_prompt, seed, cfg)
+        return finalize(raw_image, size, resolved_pal, **post)
+
+    raw = raw_key(prompt, negative_prompt=negative_prompt, seed=seed, config=cfg)
+    return result_cache_for(cfg).get_or_create(
+        sprite_key(raw, size=size, palette=resolved_pal, **post),
+        lambda: finalize(_render(prompt, negative_prompt, seed, cfg), size, resolved_pal, **post),
+    )
+
+
+def generate_variants(
+    prompt: str,
+    *,
+    sizes: Sequence[int] = (64,),
+    palettes: Sequence[str | Palette | None] = (None,),
+    negative_prompt: str = _DEFAULT_NEGATIVE,
+    seed: int | None = None,
+    config: GenerationConfig | None = None,
+    preview: bool = False,
+    indexed: bool = False,
+    dither: str | None = None,
+    downscale_mode: str = "nearest",
+) -> dict[tuple[int, str | Palette | None], Image.Image]:
+    """Render a prompt once and derive every size/palette combination from it.
+
+    Args:
+        prompt: Text description of the desired image.
+        sizes: Output pixel dimensions (square) to produce.
+        palettes: Palette names, Palette objects, or None (no quantization) to produce.
+        negative_prompt: Things to avoid in the generation.
+        seed: Optional seed for reproducibility.
+        config: Optional GenerationConfig for advanced settings.
+        preview: Render a fast, low-fidelity draft (see GenerationConfig.as_preview).
+        indexed: Return quantized variants as "P" mode images carrying their palette.
+        dither: Optional dithering for quantized variants (see ``generate``).
+        downscale_mode: Downscale mode for every size (see ``generate``).
+
+    Returns:
+        Dict mapping ``(size, palette)`` — palette as passed in — to each PIL Image.
+    """
+    from pixelsmith._dither import check_dither
+    from pixelsmith._downscale import check_downscale_mode
+    from pixelsmith._palettes import resolve_palette
+    from pixelsmith._postprocess import finalize_many
+
+    cfg = _resolve_config(config, preview)
+    check_dither(dither)
+    check_downscale_mode(downscale_mode)
+    combos = [(size, pal) for size in sizes for pal in palettes]
+    resolved = [(size, resolve_palette(pal)) for size, pal in combos]
+
+    raw = _render(prompt, negative_prompt, seed, cfg)
+    return dict(
+        zip(
+            combos,
+            finalize_many(
+                raw, resolved, indexed=indexed, dither=dither, downscale_mode=downscale_mode
+            ),
+            strict=True,
+        )
+    )
+
+
+def _resolve_config(config: GenerationConfig | None, preview: bool) -> GenerationConfig:
     cfg = config or GenerationConfig()
+    return cfg.as_preview() if preview else cfg
+
+
+def _cacheable(cfg: GenerationConfig, seed: int | None) -> bool:
+    return cfg.result_cache and seed is not None
+
+
+def _render(
+    prompt: str, negative_prompt: str, seed: int | None, cfg: GenerationConfig
+) -> RenderSource:
+    """Run the pipeline for one raw render, through the result cache when enabled.
+
+    Uncached renders come back as diffusers' float array and never become a PIL
+    image; cached ones are stored as PNGs, so they are rendered as PIL images.
+    """
+    from pixelsmith._result_cache import raw_key, result_cache_for
+
+    if not _cacheable(cfg, seed):
+        return run_pipeline(
+            prompt, negative_prompt=negative_prompt, seed=seed, config=cfg, output_type="np"
+        )
+    raw = raw_key(prompt, negative_prompt=negative_prompt, seed=seed, config=cfg)
+    return result_cache_for(cfg).get_or_create(
+        raw, lambda: run_pipeline(prompt, negative_prompt=negative_prompt, seed=seed, config=cfg)
+    )
+
+
+def generate_batch(
+    prompts: str | Sequence[str],
+    *,
+    seeds: Sequence[int | None] | None = None,
+    size: int = 64,
+    negative_prompt: str = _DEFAULT_NEGATIVE,
+    palette: str | Palette | None = None,
+    config: GenerationConfig | None = None,
+    max_batch_size: int | None = None,
+    preview: bool = False,
+    indexed: bool = False,
+    dither: str | None = None,
+    downscale_mode: str = "nearest",
+) -> list[Image.Image]:
+    """Generate several images with batched diffusion calls.
+
+    Args:
+        prompts: One prompt per image, or a single prompt shared by every seed.
+        seeds: Optional seed per image (None entries are random). Default: all random.
+        size: Output pixel dimensions (square). Default 64.
+        negative_prompt: Things to avoid in every generation.
+        palette: Optional palette name or Palette object applied to every image.
+        config: Optional GenerationConfig for advanced settings.
+        max_batch_size: Images per diffusion call. Default: sized to free device memory.
+        preview: Render fast, low-fidelity drafts (see GenerationConfig.as_preview).
+        indexed: Return "P" mode images carrying the palette (ignored without one).
+        dither: Optional dithering when quantizing (see ``generate``).
+        downscale_mode: Downscale mode (see ``generate``).
+
+    Returns:
+        PIL Images in the same order as the prompts/seeds.
+    """
+    from pixelsmith._dither import check_dither
+    from pixelsmith._downscale import check_downscale_mode
+    from pixelsmith._palettes import resolve_palette
+    from pixelsmith._postprocess import finalize
+
+    cfg = _resolve_config(config, preview)
+    resolved_pal = resolve_palette(palette)
+    check_dither(dither)
+    check_downscale_mode(downscale_mode)
+
+    if isinstance(prompts, str):
+        prompts = [prompts] * (1 if seeds is None else len(seeds))
+    if seeds is None:
+        seeds = [None] * len(prompts)
+    if len(seeds) != len(prompts):
+        msg = f"got {len(prompts)} prompts but {len(seeds)} seeds"
+        raise ValueError(msg)
+
+    raws = run_pipeline_batch(
+        list(prompts),
+        negative_prompt=negative_prompt,
+        seeds=list(seeds),
+        config=cfg,
+        max_batch_size=max_batch_size,
+        output_type="np",
+    )
+    post = {"indexed": indexed, "dither": dither, "downscale_mode": downscale_mode}
+    return [finalize(raw, size, resolved_pal, **post) for raw in raws]
+
+
+def generate_sheet(
+    prompts: str | Sequence[str],
+    *,
+    frames: int | None = None,
+    cols: int | None = None,
+    size: int = 64,
+    seed: int | None = None,
+    shared_seed: bool = False,
+    negative_prompt: str = _DEFAULT_NEGATIVE,
+    palette: str | Palette | None = None,
+    config: GenerationConfig | None = None,
+    max_batch_size: int | None = None,
+    preview: bool = False,
+    indexed: bool = False,
+    dither: str | None = None,
+    downscale_mode: str = "nearest",
+) -> tuple[Image.Image, dict[str, Any]]:
+    """Generate a sprite sheet: every frame rendered in batches and packed into one atlas.
+
+    Args:
+        prompts: One prompt per frame (an item set or animation frames), or a single
+            prompt repeated ``frames`` times.
+        frames: Number of frames when ``prompts`` is a single prompt. Default 1.
+        cols: Frames per atlas row. Default: a near-square grid.
+        size: Frame pixel dimensions (square). Default 64.
+        seed: Base seed; frame i uses ``seed + i``. Default: a random base.
+        shared_seed: Use ``seed`` for every frame, so frames share composition and
+            differ only by prompt (useful for animation frames).
+        negative_prompt: Things to avoid in every frame.
+        palette: Optional palette name or Palette object applied to the whole sheet.
+        config: Optional GenerationConfig for advanced settings.
+        max_batch_size: Frames per diffusion call. Default: sized to free device memory.
+        preview: Render fast, low-fidelity drafts (see GenerationConfig.as_preview).
+        indexed: Return a "P" mode sheet carrying the palette (ignored without one).
+        dither: Optional dithering when quantizing (see ``generate``).
+        downscale_mode: Downscale mode (see ``generate``).
+
+    Returns:
+        The sheet as a PIL Image, and a JSON-serializable manifest with the atlas
+        dimensions and each frame's index, prompt, seed and ``x``/``y``/``w``/``h``.
+    """
+    from pixelsmith._dither import check_dither
+    from pixelsmith._downscale import check_downscale_mode
+    from pixelsmith._palettes import resolve_palette
+    from pixelsmith._postprocess import to_image
+    from pixelsmith._sheet import build_sheet, sheet_manifest, sheet_plan
+
+    cfg = _resolve_config(config, preview)
     resolved_pal = resolve_palette(palette)
+    check_dither(dither)
+    check_downscale_mode(downscale_mode)
 
-    raw = run_pipeline(
-        prompt,
+    prompts, seeds, cols = sheet_plan(
+        prompts, frames=frames, cols=cols, seed=seed, shared_seed=shared_seed
+    )
+
+    raws = run_pipeline_batch(
+        prompts,
         negative_prompt=negative_prompt,
-        seed=seed,
+        seeds=seeds,
         config=cfg,
+        max_batch_size=max_batch_size,
+        output_type="np",
     )
+    atlas = build_sheet(
+        raws,
+        size,
+        resolved_pal,
+        cols=cols,
+        indexed=indexed,
+        dither=dither,
+        downscale_mode=downscale_mode,
+    )
+    manifest = sheet_manifest(prompts, seeds, size=size, cols=cols, palette=resolved_pal)
+    return to_image(atlas, resolved_pal), manifest
+
+
+def downscale(image: Image.Image, size: int, mode: str = "nearest") -> Image.Image:
+    """Downscale to a square target size.
+
+    ``mode`` is "nearest" (PIL NEAREST), or a per-block reduction: "center" (the
+    block's central pixels), "mode" (its dominant color) or "median".
+    """
+    from pixelsmith._downscale import check_downscale_mode
+    from pixelsmith._postprocess import downscale as _downscale
+
+    return _downscale(image, size, check_downscale_mode(mode))
+
+
+def postprocess(
+    image: RenderSource,
+    stages: Sequence[Stage],
+    *,
+    output_type: str = "pil",
+    stats: StageStats | None = None,
+) -> Image.Image | NDArray[np.uint8]:
+    """Run post-processing stages over one contiguous uint8 buffer.
+
+    Args:
+        image: PIL image, uint8 array, float array in [0, 1] (diffusers
+            ``output_type="np"``) or image file path.
+        stages: Downscale, Quantize, Outline and Upscale instances, applied in order.
+        output_type: "pil" for a PIL image ("P" mode after an indexed Quantize), or
+            "np" for the final uint8 array.
+        stats: Optional StageStats that records every buffer the stages allocate.
 
-    result = _downscale(raw, size)
+    Example:
+        postprocess(raw, [Downscale(64), Quantize(PICO8), Outline((0, 0, 0)), Upscale(8)])
+    """
+    from pixelsmith._postprocess import Quantize, run_stages, to_image
+
+    if output_type not in ("pil", "np"):
+        msg = f"Unknown output_type {output_type!r}. Available: pil, np"
+        raise ValueError(msg)
+    buf = run_stages(image, stages, stats=stats)
+    if output_type == "np":
+        return buf
+    indexed = [st.palette for st in stages if isinstance(st, Quantize) and st.indexed]
+    return to_image(buf, indexed[-1] if indexed else None)
 
-    if resolved_pal is not None:
-        result = _quantize(result, resolved_pal)
 
-    return result
+def quantize_palette(
+    image: ImageSource,
+    palette: str | Palette,
+    *,
+    indexed: bool = False,
+    dither: str | None = None,
+) -> Image.Image:
+    """Snap every pixel to the nearest color in the given palette.
+
+    ``image`` may be a PIL image, an (H, W, 3) uint8 array or an image file path. With
+    ``indexed``, the result is a "P" mode image whose color table is the palette.
+    ``dither`` is one of DITHER_MODES ("bayer2", "bayer4", "bayer8",
+    "floyd_steinberg") or None for hard nearest-color snapping.
+    """
+    from pixelsmith._postprocess import quantize_palette as _quantize
+
+    return _quantize(image, _require_palette(palette), indexed=indexed, dither=dither)
+
+
+def quantize_array(
+    image: ImageSource,
+    palette: str | Palette,
+    *,
+    out: NDArray[np.uint8] | None = None,
+    max_bytes: int = 64 << 20,
+    dither: str | None = None,
+) -> NDArray[np.uint8]:
+    """Quantize in memory-bounded row bands, returning an (H, W, 3) uint8 array.
+
+    Args:
+        image: PIL image, (H, W), (H, W, 3) or (H, W, 4) uint8 array, or file path.
+        palette: Palette name or Palette object.
+        out: Optional preallocated C-contiguous (H, W, 3) uint8 array to fill.
+        max_bytes: Approximate ceiling on working memory per band. Default 64 MiB.
+        dither: Optional dithering mode (see ``quantize_palette``).
+    """
+    from pixelsmith._postprocess import quantize_array as _quantize_array
 
+    resolved = _require_palette(palette)
+    return _quantize_array(image, resolved, out=out, max_bytes=max_bytes, dither=dither)
 
-def downscale(image: Image.Image, size: int) -> Image.Image:
-    """Nearest-neighbor downscale to a square target size."""
-    return _downscale(image, size)
 
+def _require_palette(palette: str | Palette) -> Palette:
+    from pixelsmith._palettes import resolve_palette
 
-def quantize_palette(image: Image.Image, palette: str | Palette) -> Image.Image:
-    """Snap every pixel to the nearest color in the given palette."""
     resolved = resolve_palette(palette)
     if resolved is None:
         msg = "palette cannot be None for quantize_palette()"
         raise PaletteError(msg)
-    return _quantize(image, resolved)
+    return resolved
@@ -2,15 +2,81 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
+from functools import cache
 
-from platformdirs import user_cache_dir
+# Sampler names accepted by GenerationConfig.scheduler; "default" keeps the model's own.
+SCHEDULERS = ("default", "dpmpp_2m_karras", "euler_a", "unipc", "lcm")
+
+# Attention implementations accepted by GenerationConfig.attention: PyTorch's fused
+# scaled_dot_product_attention (diffusers' default), xformers' memory-efficient
+# kernels, or the plain matmul-softmax-matmul path.
+ATTENTION_BACKENDS = ("sdpa", "xformers", "eager")
+
+# How GenerationConfig.enable_cpu_offload offloads on CUDA: whole models moved to the
+# GPU while they run, or individual submodules (far less VRAM, much slower).
+OFFLOAD_MODES = ("model", "sequential")
+
+# Preview preset: a quarter of the default render area and a few sampling steps.
+_PREVIEW_RENDER_SIZE = 512
+_PREVIEW_STEPS = 12
+_PREVIEW_LCM_STEPS = 4
 
 
 def _default_cache_dir() -> str:
+    from platformdirs import user_cache_dir
+
     return user_cache_dir("pixelsmith")
 
 
+@cache
+def _resolve_device(device: str) -> str:
+    """Return the actual device string, resolving 'auto' (once per process)."""
+    if device != "auto":
+        return device
+    try:
+        import torch
+
+        if torch.cuda.is_available():
+            return "cuda"
+        if hasattr(torch.backends, "mps") and torch.backends.mps.is_available():
+            return "mps"
+    except ImportError:
+        pass
+    return "cpu"
+
+
+@dataclass(frozen=True, slots=True)
+class PipelineKey:
+    """The load-time subset of a GenerationConfig that identifies a loaded pipeline.
+
+    Two configs with equal keys can share one pipeline; everything else in
+    GenerationConfig (including ``lora_weight``, which is re-fused in place) is
+    applied per call. With ``lora_snapshot`` the LoRA is baked into the weights, so
+    ``lora_weight`` is part of the key instead.
+    """
+
+    base_model: str
+    lora_repo: str
+    dtype: str
+    device: str
+    enable_cpu_offload: bool
+    cache_dir: str
+    lcm_lora_path: str | None = None
+    lora_weight: float | None = None  # baked-in pixel LoRA weight (lora_snapshot only)
+    offload_mode: str = "model"
+    attention: str = "sdpa"
+    attention_slicing: str | int | None = None
+    vae_slicing: bool = False
+    vae_tiling: bool = False
+    channels_last: bool = False
+    num_threads: int | None = None
+
+    def resolved_device(self) -> str:
+        """Return the actual device string, resolving 'auto'."""
+        return _resolve_device(self.device)
+
+
 @dataclass(frozen=True, slots=True)
 class GenerationConfig:
     """Settings for the SDXL + LoRA pixel art pipeline."""
@@ -23,18 +89,92 @@ class GenerationConfig:
     dtype: str = "float16"
     enable_cpu_offload: bool = True
     cache_dir: str = field(default_factory=_default_cache_dir)
+    base_model: str = "stabilityai/stable-diffusion-xl-base-1.0"
+    lora_repo: str = "nerijs/pixel-art-xl"
+    result_cache: bool = False  # reuse seeded results stored under cache_dir/results
+    result_cache_max_bytes: int = 1 << 30
+    scheduler: str = "default"  # one of SCHEDULERS
+    lcm_lora_path: str | None = None  # local LCM LoRA weights, required for "lcm"
+    # Load SDXL with the pixel LoRA fused in from a safetensors snapshot under
+    # cache_dir/snapshots (written on first load); each lora_weight is its own pipeline.
+    lora_snapshot: bool = False
+    # Memory/speed knobs, applied when the pipeline loads:
+    offload_mode: str = "model"  # one of OFFLOAD_MODES, used with enable_cpu_offload
+    attention: str = "sdpa"  # one of ATTENTION_BACKENDS
+    attention_slicing: str | int | None = None  # "auto", "max" or a slice size
+    vae_slicing: bool = False  # decode a batch one image at a time
+    vae_tiling: bool = False  # decode each image in overlapping tiles
+    channels_last: bool = False  # NHWC memory format for the UNet and VAE
+    num_threads: int | None = None  # torch intra-op CPU threads (process-wide)
+
+    def __post_init__(self) -> None:
+        if self.scheduler not in SCHEDULERS:
+            msg = f"Unknown scheduler {self.scheduler!r}. Available: {', '.join(SCHEDULERS)}"
+            raise ValueError(msg)
+        if self.scheduler == "lcm" and self.lcm_lora_path is None:
+            msg = "scheduler='lcm' requires lcm_lora_path"
+            raise ValueError(msg)
+        if self.attention not in ATTENTION_BACKENDS:
+            msg = (
+                f"Unknown attention {self.attention!r}. Available: {', '.join(ATTENTION_BACKENDS)}"
+            )
+            raise ValueError(msg)
+        if self.offload_mode not in OFFLOAD_MODES:
+            msg = (
+                f"Unknown offload_mode {self.offload_mode!r}. Available: {', '.join(OFFLOAD_MODES)}"
+            )
+            raise ValueError(msg)
+        slicing = self.attention_slicing
+        if not (slicing in (None, "auto", "max") or (isinstance(slicing, int) and slicing > 0)):
+            msg = (
+                f"attention_slicing must be 'auto', 'max', a positive int or None, got {slicing!r}"
+            )
+            raise ValueError(msg)
+        if self.num_threads is not None and self.num_threads < 1:
+            msg = f"num_threads must be at least 1, got {self.num_threads}"
+            raise ValueError(msg)
 
     def resolved_device(self) -> str:
         """Return the actual device string, resolving 'auto'."""
-        if self.device != "auto":
-            return self.device
-        try:
-            import torch
-
-            if torch.cuda.is_available():
-                return "cuda"
-            if hasattr(torch.backends, "mps") and torch.backends.mps.is_available():
-                return "mps"
-        except ImportError:
-            pass
-        return "cpu"
+        return _resolve_device(self.device)
+
+    def as_preview(self) -> GenerationConfig:
+        """Return a fast, low-fidelity variant of this config for prompt iteration.
+
+        Renders at 512px (or less) with a few steps: LCM with guidance disabled when
+        ``lcm_lora_path`` is set, otherwise DPM++ 2M Karras.
+        """
+        if self.lcm_lora_path is not None:
+            return replace(
+                self,
+                scheduler="lcm",
+                num_inference_steps=_PREVIEW_LCM_STEPS,
+                guidance_scale=1.0,
+                render_size=min(self.render_size, _PREVIEW_RENDER_SIZE),
+            )
+        return replace(
+            self,
+            scheduler="dpmpp_2m_karras",
+            num_inference_steps=min(self.num_inference_steps, _PREVIEW_STEPS),
+            render_size=min(self.render_size, _PREVIEW_RENDER_SIZE),
+        )
+
+    def load_key(self) -> PipelineKey:
+        """Return the settings that require a pipeline (re)load when they change."""
+        return PipelineKey(
+            base_model=self.base_model,
+            lora_repo=self.lora_repo,
+            dtype=self.dtype,
+            device=self.device,
+            enable_cpu_offload=self.enable_cpu_offload,
+            cache_dir=self.cache_dir,
+            lcm_lora_path=self.lcm_lora_path,
+            lora_weight=self.lora_weight if self.lora_snapshot else None,
+            offload_mode=self.offload_mode,
+            attention=self.attention,
+            attention_slicing=self.attention_slicing,
+            vae_slicing=self.vae_slicing,
+            vae_tiling=self.vae_tiling,
+            channels_last=self.channels_last,
+            num_threads=self.num_threads,
+        )
@@ -0,0 +1,113 @@
+"""Dithering for palette quantization: ordered Bayer and Floyd–Steinberg error diffusion."""
+
+from __future__ import annotations
+
+from functools import cache
+
+import numpy as np
+from numpy.typing import NDArray
+
+from pixelsmith._palettes import Palette
+
+DITHER_MODES = ("bayer2", "bayer4", "bayer8", "floyd_steinberg")
+
+_BAYER_SIZES = {"bayer2": 2, "bayer4": 4, "bayer8": 8}
+
+# Floyd–Steinberg weights: right, down-left, down, down-right.
+_FS_RIGHT, _FS_DOWN_LEFT, _FS_DOWN, _FS_DOWN_RIGHT = 7 / 16, 3 / 16, 5 / 16, 1 / 16
+
+
+def check_dither(dither: str | None) -> str | None:
+    """Validate a dither mode name (None means no dithering)."""
+    if dither is not None and dither not in DITHER_MODES:
+        msg = f"Unknown dither mode {dither!r}. Available: {', '.join(DITHER_MODES)}"
+        raise ValueError(msg)
+    return dither
+
+
+@cache
+def bayer_matrix(n: int) -> NDArray[np.float32]:
+    """(n, n) ordered-dither thresholds in (-0.5, 0.5), for n a power of two."""
+    m = np.zeros((1, 1), dtype=np.int32)
+    while len(m) < n:
+        m = np.block([[4 * m, 4 * m + 2], [4 * m + 3, 4 * m + 1]])
+    thresholds = (m.astype(np.float32) + 0.5) / (n * n) - 0.5
+    thresholds.flags.writeable = False
+    return thresholds
+
+
+def palette_spread(palette: Palette) -> float:
+    """Typical spacing between palette colors: the median nearest-neighbor distance."""
+    colors = np.unique(palette.as_array(), axis=0).astype(np.float32)
+    if len(colors) < 2:
+        return 0.0
+    dist = np.sqrt(((colors[:, None, :] - colors[None, :, :]) ** 2).sum(axis=2))
+    np.fill_diagonal(dist, np.inf)
+    return float(np.median(dist.min(axis=1)))
+
+
+def ordered_dither(
+    band: NDArray[np.uint8], top: int, palette: Palette, mode: str, strategy: str
+) -> NDArray[np.integer]:
+    """Palette indices for an (h, W, 3) band starting at image row ``top``, Bayer-dithered.
+
+    Each pixel is nudged by its threshold (scaled to the palette's color spacing) before
+    the nearest-color lookup; the pattern is anchored to image coordinates, so bands tile
+    seamlessly.
+    """
+    n = _BAYER_SIZES[mode]
+    height, width = band.shape[:2]
+    rows = np.arange(top, top + height) % n
+    cols = np.arange(width) % n
+    offsets = bayer_matrix(n)[rows[:, None], cols[None, :]] * palette_spread(palette)
+    nudged = band + offsets[:, :, None]
+    pixels = np.clip(np.rint(nudged), 0, 255).astype(np.uint8)
+    return palette.nearest_indices(pixels, strategy=strategy)
+
+
+def floyd_steinberg(
+    band: NDArray[np.uint8],
+    palette: Palette,
+    strategy: str,
+    carry: NDArray[np.float32] | None = None,
+) -> tuple[NDArray[np.intp], NDArray[np.float32]]:
+    """Floyd–Steinberg error diffusion over an (h, W, 3) band, vectorized by wavefront.
+
+    Pixel (x, y) depends only on pixels with a smaller ``t = x + 2y``, so every pixel
+    on one anti-diagonal wavefront is quantized in a single vectorized step. ``carry``
+    is the error diffused into this band's first row by the band above; the error for
+    the next band is returned alongside the palette indices.
+    """
+    height, width = band.shape[:2]
+    colors = palette.as_array().astype(np.float32)
+    # One column of padding on each side and a spare row below absorb edge spills;
+    # the buffer is addressed flat so each step indexes with one integer array.
+    stride = width + 2
+    work = np.zeros((height + 1, stride, 3), dtype=np.float32)
+    work[:height, 1:-1] = band
+    if carry is not None:
+        work[0, 1:-1] += carry
+    flat = work.reshape(-1, 3)
+    nearest = np.empty(height * width, dtype=np.intp)
+
+    ys_all = np.arange(height)
+    for t in range(width + 2 * (height - 1)):
+        # Rows y whose column x = t - 2y falls inside the band.
+        ys = ys_all[max(0, (t - width) // 2 + 1) : min(height, t // 2 + 1)]
+        xs = t - 2 * ys
+        cell = ys * stride + xs + 1
+        values = flat[cell]
+        pixels = np.clip(np.rint(values), 0, 255).astype(np.uint8)
+        chosen = palette.nearest_indices(pixels, strategy=strategy)
+        nearest[ys * width + xs] = chosen
+        err = values - colors[chosen]
+        # Four separate adds: two pixels on one wavefront can target the same cell from
+        # different directions, which a single fancy-indexed += would count once.
+        flat[cell + 1] += err * _FS_RIGHT
+        below = cell + stride
+        flat[below - 1] += err * _FS_DOWN_LEFT
+        flat[below] += err * _FS_DOWN
+        flat[below + 1] += err * _FS_DOWN_RIGHT
+
+    # Errors spilled into the padding columns are dropped, as at any image edge.
+    return nearest.reshape(height, width), work[height, 1:-1].copy()
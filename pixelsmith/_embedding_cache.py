@@ -0,0 +1,77 @@
+"""LRU cache of text-encoder outputs, so repeated prompts skip the SDXL encoders."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any
+
+# (prompt_embeds, pooled_prompt_embeds) for one text, batch dimension 1
+Embeddings = tuple[Any, Any]
+
+
+@dataclass(frozen=True, slots=True)
+class EmbeddingCacheStats:
+    """Snapshot of prompt-embedding cache occupancy and counters."""
+
+    entries: int
+    hits: int
+    misses: int
+    max_entries: int
+
+
+class EmbeddingCache:
+    """Maps ``(pipeline token, LoRA state, text)`` to encoded embeddings, LRU-bounded.
+
+    The pipeline token identifies one loaded pipeline and the LoRA state the adapters
+    fused into its text encoders, so a reload or re-fuse never serves stale embeddings.
+    """
+
+    def __init__(self, max_entries: int = 64) -> None:
+        self._entries: OrderedDict[tuple[int, Hashable, str], Embeddings] = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, token: int, lora_state: Hashable, text: str, encode: Callable[[str], Embeddings]
+    ) -> Embeddings:
+        """Return cached embeddings for text, calling ``encode(text)`` on a miss."""
+        key = (token, lora_state, text)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return cached
+            self.misses += 1
+
+        embeddings = encode(text)
+        with self._lock:
+            self._entries[key] = embeddings
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return embeddings
+
+    def drop(self, token: Hashable) -> None:
+        """Forget every entry for one pipeline (e.g. after it is unloaded)."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == token]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> EmbeddingCacheStats:
+        with self._lock:
+            return EmbeddingCacheStats(
+                entries=len(self._entries),
+                hits=self.hits,
+                misses=self.misses,
+                max_entries=self.max_entries,
+            )
@@ -0,0 +1,199 @@
+"""Adaptive palette extraction: median cut, mini-batch k-means and octree."""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+from PIL import Image
+
+EXTRACT_METHODS = ("kmeans", "median_cut", "octree")
+
+# Pixels sampled across all inputs; enough for stable clusters on 1024² renders.
+_SAMPLE_PIXELS = 1 << 16
+
+# Mini-batch k-means schedule.
+_KMEANS_BATCH = 4096
+_KMEANS_ITERATIONS = 60
+
+
+def extract_colors(
+    sources: Sequence[Image.Image | NDArray[np.uint8] | str | os.PathLike],
+    n_colors: int,
+    method: str = "kmeans",
+    *,
+    seed: int = 0,
+) -> NDArray[np.uint8]:
+    """Up to ``n_colors`` (k, 3) uint8 colors representing every source, most used first.
+
+    Each source contributes an equal share of a fixed-size pixel subsample, so one
+    large image cannot drown out the rest of a sprite set.
+    """
+    if method not in EXTRACT_METHODS:
+        msg = f"Unknown method {method!r}. Available: {', '.join(EXTRACT_METHODS)}"
+        raise ValueError(msg)
+    if not 1 <= n_colors <= 256:
+        msg = f"n_colors must be between 1 and 256, got {n_colors}"
+        raise ValueError(msg)
+    if not sources:
+        msg = "at least one image is required"
+        raise ValueError(msg)
+
+    rng = np.random.default_rng(seed)
+    share = max(1, _SAMPLE_PIXELS // len(sources))
+    pixels = np.concatenate([_sample(_load_pixels(s), share, rng) for s in sources])
+
+    if method == "median_cut":
+        colors = _median_cut(pixels, n_colors)
+    elif method == "octree":
+        colors = _octree(pixels, n_colors)
+    else:
+        colors = _kmeans(pixels, n_colors, rng)
+    return _by_population(colors, pixels)
+
+
+def _load_pixels(source: Image.Image | NDArray[np.uint8] | str | os.PathLike) -> NDArray:
+    """(P, 3) uint8 RGB pixels of a PIL image, uint8 array or image path."""
+    from pixelsmith._postprocess import _as_rgb_array
+
+    if isinstance(source, (str, os.PathLike)):
+        with Image.open(source) as img:
+            return _load_pixels(img)
+    if isinstance(source, Image.Image):
+        return np.asarray(source.convert("RGB")).reshape(-1, 3)
+    return _as_rgb_array(source).reshape(-1, 3)
+
+
+def _sample(pixels: NDArray[np.uint8], n: int, rng: np.random.Generator) -> NDArray[np.uint8]:
+    if len(pixels) <= n:
+        return pixels
+    return pixels[rng.choice(len(pixels), n, replace=False)]
+
+
+def _median_cut(pixels: NDArray[np.uint8], n_colors: int) -> NDArray[np.uint8]:
+    """Split the box with the largest squared error at its median until n boxes exist.
+
+    Scoring by squared error rather than channel range keeps a big flat background
+    with a few stray pixels from soaking up every split.
+    """
+    boxes = [pixels]
+    errors = [_box_error(pixels)]
+    while len(boxes) < n_colors:
+        worst = int(np.argmax(errors))
+        if errors[worst] <= 0:
+            break  # every box is a single color
+        box = boxes.pop(worst)
+        errors.pop(worst)
+        channel = int(np.argmax(box.var(axis=0)))
+        order = np.argsort(box[:, channel], kind="stable")
+        half = len(box) // 2
+        for part in (box[order[:half]], box[order[half:]]):
+            boxes.append(part)
+            errors.append(_box_error(part))
+    return np.array([np.rint(b.mean(axis=0)) for b in boxes], dtype=np.uint8)
+
+
+def _box_error(box: NDArray[np.uint8]) -> float:
+    """Sum of squared distances from the box's pixels to their mean color."""
+    return float(box.var(axis=0).sum() * len(box)) if len(box) > 1 else 0.0
+
+
+def _kmeans(
+    pixels: NDArray[np.uint8], n_colors: int, rng: np.random.Generator
+) -> NDArray[np.uint8]:
+    """Mini-batch k-means (Sculley 2010) seeded with the median-cut palette."""
+    data = pixels.astype(np.float32)
+    centers = _median_cut(pixels, n_colors).astype(np.float32)
+    k = len(centers)
+    counts = np.zeros(k, dtype=np.float64)
+    batch = min(_KMEANS_BATCH, len(data))
+    for _ in range(_KMEANS_ITERATIONS):
+        sample = data[rng.choice(len(data), batch, replace=False)]
+        labels = _assign(sample, centers)
+        hits = np.bincount(labels, minlength=k)
+        sums = np.stack([np.bincount(labels, sample[:, ch], minlength=k) for ch in range(3)], 1)
+        counts += hits
+        # Per-center learning rate 1/count: each center is the running mean of its points.
+        seen = hits > 0
+        rate = (hits[seen] / counts[seen])[:, None]
+        centers[seen] += (sums[seen] / hits[seen, None] - centers[seen]) * rate
+    return np.clip(np.rint(centers), 0, 255).astype(np.uint8)
+
+
+def _assign(points: NDArray[np.float32], centers: NDArray[np.float32]) -> NDArray[np.intp]:
+    dists = (points * points).sum(1)[:, None] - 2 * points @ centers.T + (centers * centers).sum(1)
+    return np.argmin(dists, axis=1)
+
+
+def _octree(pixels: NDArray[np.uint8], n_colors: int) -> NDArray[np.uint8]:
+    """Octree quantization, top down: split the most populous nodes while nodes fit.
+
+    A node at depth d holds every color sharing the top d bits of each channel; its
+    color is the mean of its pixels.
+    """
+    rgb = pixels.astype(np.int32)
+    depth = np.zeros(len(rgb), dtype=np.int32)  # depth of the leaf holding each pixel
+    for _ in range(8):
+        _, inverse, population = np.unique(
+            _node_at(rgb, depth), return_inverse=True, return_counts=True
+        )
+        inverse = inverse.ravel()
+        children = _children_per_node(rgb, depth, inverse, len(population))
+        if children.sum() <= n_colors:
+            depth += 1
+            continue
+        # Not every node can split: split the most populous nodes first. A node with
+        # more children than the budget allows keeps its smallest children merged.
+        budget = n_colors - len(population)
+        child = _node_at(rgb, depth + 1)
+        for node in np.argsort(-population, kind="stable"):
+            if budget <= 0:
+                break
+            members = np.flatnonzero(inverse == node)
+            kids, kid_inverse, kid_counts = np.unique(
+                child[members], return_inverse=True, return_counts=True
+            )
+            if len(kids) - 1 <= budget:
+                depth[members] += 1
+                budget -= len(kids) - 1
+                continue
+            # Peel off the `budget` largest children; the rest stay behind as the parent.
+            keep = np.argsort(-kid_counts, kind="stable")[:budget]
+            depth[members[np.isin(kid_inverse.ravel(), keep)]] += 1
+            budget = 0
+        break
+
+    # Leaves at different depths can share an id, so key by (depth, id).
+    keys = depth.astype(np.int64) << 32 | _node_at(rgb, depth)
+    _, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.ravel()
+    population = np.bincount(inverse)
+    sums = np.stack([np.bincount(inverse, rgb[:, ch]) for ch in range(3)], axis=1)
+    return np.rint(sums / population[:, None]).astype(np.uint8)
+
+
+def _node_at(rgb: NDArray[np.int32], depth: NDArray[np.int32]) -> NDArray[np.int64]:
+    """Octree node id of each pixel at its own depth (depth-0 pixels share the root)."""
+    shift = 8 - depth
+    r, g, b = (rgb[:, ch].astype(np.int64) >> shift for ch in range(3))
+    return (r << 16) | (g << 8) | b
+
+
+def _children_per_node(
+    rgb: NDArray[np.int32], depth: NDArray[np.int32], inverse: NDArray, n_nodes: int
+) -> NDArray[np.intp]:
+    """Number of non-empty children each current node would split into."""
+    child = _node_at(rgb, depth + 1)
+    pairs = np.unique(np.stack([inverse.ravel(), child], axis=1), axis=0)
+    return np.bincount(pairs[:, 0], minlength=n_nodes)
+
+
+def _by_population(colors: NDArray[np.uint8], pixels: NDArray[np.uint8]) -> NDArray[np.uint8]:
+    """Drop duplicate and unused colors, ordering the rest by pixels they cover."""
+    colors = np.unique(colors, axis=0)
+    labels = _assign(pixels.astype(np.float32), colors.astype(np.float32))
+    population = np.bincount(labels, minlength=len(colors))
+    order = np.argsort(-population, kind="stable")
+    return colors[order[population[order] > 0]]
@@ -0,0 +1,273 @@
+"""Nearest-palette-color search: brute force, a bucketed RGB grid and a 24-bit lookup table."""
+
+from __future__ import annotations
+
+import numpy as np
+from numpy.typing import NDArray
+
+# The LUT is compiled on a coarse grid of 2**_GRID_BITS cells per channel. Cells whose
+# nearest color is provably unique are filled in one broadcast; only the cells that
+# straddle a Voronoi boundary are resolved exactly, color by color.
+_GRID_BITS = 6
+_CELL = 256 >> _GRID_BITS
+
+# GridIndex buckets RGB into 2**_INDEX_BITS cells per channel: cheap to build (tens of
+# milliseconds for 256 colors) while leaving only a handful of candidates per cell.
+_INDEX_BITS = 5
+
+# Rough costs in nanoseconds, measured with benchmarks/nearest.py, used to pick the
+# cheapest strategy for a palette of N colors: per-pixel query cost (base + per-color
+# slope) and one-off build cost (base + per-color slope).
+_BRUTE_NS = (30, 14)
+_INDEX_NS = (200, 0.8)
+_INDEX_BUILD_NS = (10e6, 0.4e6)
+_LUT_NS = (30, 0)
+_LUT_BUILD_NS = (200e6, 7.5e6)
+
+STRATEGIES = ("brute", "index", "lut")
+
+# Brute force and the index collapse the input to its distinct colors first (sorting
+# costs ~65 ns/pixel) unless a strided sample says most pixels are distinct anyway.
+_DISTINCT_MIN_PIXELS = 1024
+_DISTINCT_SAMPLE = 16384
+_DISTINCT_MAX_FRACTION = 0.75
+
+# Upper bound on int32 elements in a brute-force distance block (~64 MB).
+_BRUTE_BLOCK_ELEMS = 1 << 24
+
+# Channel value of the padding color: farther from every RGB point than any real
+# color, while its squared distance still fits comfortably in int32.
+_FAR = 4096
+
+_CORNERS = np.array([[r, g, b] for r in (0, 1) for g in (0, 1) for b in (0, 1)], np.int32)
+_FINE = np.stack(
+    np.meshgrid(*[np.arange(_CELL, dtype=np.int32)] * 3, indexing="ij"), axis=-1
+).reshape(-1, 3)
+
+
+def unique_first(colors: NDArray[np.uint8]) -> NDArray[np.intp]:
+    """Indices of the first occurrence of each distinct color, in palette order.
+
+    Duplicate entries can never win ``argmin`` (the earlier copy always ties and
+    wins), so dropping them leaves every nearest-color result unchanged.
+    """
+    _, first = np.unique(colors, axis=0, return_index=True)
+    return np.sort(first)
+
+
+def nearest_brute(pixels: NDArray[np.uint8], colors: NDArray[np.uint8]) -> NDArray[np.intp]:
+    """Index of the nearest palette color for each (P, 3) pixel, by exhaustive search.
+
+    Squared distances are computed exactly in int32, so ties resolve to the lowest
+    palette index just like ``np.argmin`` over float32 distances.
+    """
+    pal = colors.astype(np.int32)
+    out = np.empty(len(pixels), dtype=np.intp)
+    step = max(1, _BRUTE_BLOCK_ELEMS // max(1, len(pal)))
+    for start in range(0, len(pixels), step):
+        block = pixels[start : start + step].astype(np.int32)
+        dists = np.zeros((len(block), len(pal)), dtype=np.int32)
+        for ch in range(3):
+            diff = block[:, ch, None] - pal[None, :, ch]
+            dists += diff * diff
+        out[start : start + step] = np.argmin(dists, axis=1)
+    return out
+
+
+class GridIndex:
+    """Bucketed RGB grid holding, per cell, every palette color that can be nearest in it.
+
+    Queries compare each pixel against its cell's short candidate list only, and agree
+    exactly with :func:`nearest_brute`, including lowest-index tie-breaking.
+    """
+
+    def __init__(self, colors: NDArray[np.uint8]) -> None:
+        self._keep = unique_first(colors)
+        self._pal = colors[self._keep].astype(np.int32)
+        mask, _ = _cell_candidates(self._pal, _INDEX_BITS)
+        mask = mask.reshape(-1, len(self._pal))
+        self._counts = np.count_nonzero(mask, axis=1)
+        # Candidates of each cell in palette order (stable sort), padded past the count.
+        order = np.argsort(~mask, axis=1, kind="stable")[:, : int(self._counts.max())]
+        self._candidates = order.astype(np.int32)
+
+    def query(self, pixels: NDArray[np.uint8]) -> NDArray[np.intp]:
+        """Index of the nearest palette color for each (P, 3) pixel."""
+        rgb = pixels.astype(np.int32)
+        shift = 8 - _INDEX_BITS
+        cell = (
+            ((rgb[:, 0] >> shift) << (2 * _INDEX_BITS))
+            | ((rgb[:, 1] >> shift) << _INDEX_BITS)
+            | (rgb[:, 2] >> shift)
+        )
+        best = self._candidates[cell, 0].astype(np.intp)
+        best_dist = _sq_dist(rgb, self._pal[best])
+
+        # Visit pixels by descending candidate count, so slot j only touches the prefix
+        # of pixels whose cell has more than j candidates.
+        counts = self._counts[cell]
+        by_count = np.argsort(-counts, kind="stable")
+        remaining = np.bincount(counts, minlength=self._candidates.shape[1] + 1)[::-1].cumsum()
+        for j in range(1, self._candidates.shape[1]):
+            idx = by_count[: remaining[-j - 1]]
+            cand = self._candidates[cell[idx], j]
+            dist = _sq_dist(rgb[idx], self._pal[cand])
+            # Strict "<" with candidates in palette order keeps the lowest index on ties.
+            closer = dist < best_dist[idx]
+            best_dist[idx[closer]] = dist[closer]
+            best[idx[closer]] = cand[closer]
+        return self._keep[best]
+
+
+def choose_strategy(n_colors: int, n_pixels: int, *, has_index: bool, has_lut: bool) -> str:
+    """Cheapest of brute force, GridIndex and LUT for ``n_pixels`` lookups.
+
+    Build costs count only for structures not built yet, so a palette that has seen
+    enough pixels graduates from brute force to the index or the table for good.
+    """
+
+    def cost(query: tuple[float, float], build: tuple[float, float], built: bool) -> float:
+        per_pixel = query[0] + query[1] * n_colors
+        return n_pixels * per_pixel + (0 if built else build[0] + build[1] * n_colors)
+
+    costs = {
+        "brute": cost(_BRUTE_NS, (0, 0), True),
+        "index": cost(_INDEX_NS, _INDEX_BUILD_NS, has_index),
+        "lut": cost(_LUT_NS, _LUT_BUILD_NS, has_lut),
+    }
+    return min(STRATEGIES, key=costs.__getitem__)
+
+
+def _sq_dist(a: NDArray[np.int32], b: NDArray[np.int32]) -> NDArray[np.int32]:
+    diff = a - b
+    return np.einsum("px,px->p", diff, diff)
+
+
+def pack_rgb(pixels: NDArray[np.uint8]) -> NDArray[np.int32]:
+    """Pack (..., 3) uint8 RGB into (...) int32 ``0xRRGGBB`` codes."""
+    rgb = pixels.astype(np.int32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+
+def unpack_rgb(codes: NDArray[np.int32]) -> NDArray[np.uint8]:
+    """Unpack (...) ``0xRRGGBB`` codes into (..., 3) uint8 RGB."""
+    return np.stack([(codes >> 16) & 0xFF, (codes >> 8) & 0xFF, codes & 0xFF], axis=-1).astype(
+        np.uint8
+    )
+
+
+def distinct_colors(
+    codes: NDArray[np.int32],
+) -> tuple[NDArray[np.int32], NDArray[np.intp]] | None:
+    """Distinct packed colors and the inverse index that rebuilds ``codes.ravel()``.
+
+    Returns None when collapsing would not pay off: too few pixels, or a strided
+    sample in which most colors are distinct (a sample overstates the distinct
+    fraction of the whole, so this errs toward the dense path).
+    """
+    flat = codes.ravel()
+    if flat.size < _DISTINCT_MIN_PIXELS:
+        return None
+    sample = flat[:: max(1, flat.size // _DISTINCT_SAMPLE)]
+    if len(np.unique(sample)) > _DISTINCT_MAX_FRACTION * len(sample):
+        return None
+    unique, inverse = np.unique(flat, return_inverse=True)
+    return unique, inverse.ravel()
+
+
+def _axis_bounds(
+    channel: NDArray[np.int32], bits: int
+) -> tuple[NDArray[np.int32], NDArray[np.int32]]:
+    """Per-cell min/max squared distance along one axis: two (2**bits, N) arrays."""
+    size = 256 >> bits
+    lo = (np.arange(1 << bits, dtype=np.int32) * size)[:, None]
+    hi = lo + (size - 1)
+    c = channel[None, :]
+    near = np.clip(c, lo, hi) - c
+    far = np.maximum(np.abs(c - lo), np.abs(hi - c))
+    return near * near, far * far
+
+
+def build_lut(colors: NDArray[np.uint8]) -> NDArray[np.uint8] | NDArray[np.uint16]:
+    """Compile a palette into a flat ``2**24`` table mapping packed RGB to palette index.
+
+    The table agrees exactly with :func:`nearest_brute` for every possible color.
+    """
+    keep = unique_first(colors)
+    pal = colors[keep].astype(np.int32)
+    cells = 1 << _GRID_BITS
+    index_dtype = np.uint8 if len(colors) <= 256 else np.uint16
+
+    candidates, coarse = _cell_candidates(pal, _GRID_BITS)
+
+    lut = np.empty(1 << 24, dtype=index_dtype)
+    grid = lut.reshape(cells, _CELL, cells, _CELL, cells, _CELL)
+    grid[...] = keep[coarse].astype(index_dtype)[:, None, :, None, :, None]
+
+    # Resolve the ambiguous cells exactly against their own (short) candidate lists.
+    counts = np.count_nonzero(candidates, axis=3)
+    amb = np.argwhere(counts > 1).astype(np.int32)
+    k = int(counts.max())
+    padded = np.vstack([pal, np.full((1, 3), _FAR, dtype=np.int32)])
+    step = max(1, _BRUTE_BLOCK_ELEMS // (8 * k * k))
+    for start in range(0, len(amb), step):
+        cell = amb[start : start + step]
+        best = _resolve_cells(cell, candidates[cell[:, 0], cell[:, 1], cell[:, 2]], k, padded)
+        grid[cell[:, 0], :, cell[:, 1], :, cell[:, 2], :] = keep[best].astype(index_dtype)
+    return lut
+
+
+def _cell_candidates(
+    pal: NDArray[np.int32], bits: int
+) -> tuple[NDArray[np.bool_], NDArray[np.intp]]:
+    """Candidate mask (c, c, c, N) and best worst-case color (c, c, c) per grid cell."""
+    cells = 1 << bits
+    (rmin, rmax), (gmin, gmax), (bmin, bmax) = (_axis_bounds(pal[:, ch], bits) for ch in range(3))
+
+    coarse = np.empty((cells, cells, cells), dtype=np.intp)
+    candidates = np.empty((cells, cells, cells, len(pal)), dtype=bool)
+    for r in range(cells):
+        lo = rmin[r] + gmin[:, None, :] + bmin[None, :, :]  # (g, b, N)
+        hi = rmax[r] + gmax[:, None, :] + bmax[None, :, :]
+        # A color is a candidate for the cell unless it is farther from every point of
+        # the cell than the best worst-case color. A single candidate is exact.
+        candidates[r] = lo <= hi.min(axis=2, keepdims=True)
+        coarse[r] = np.argmin(hi, axis=2)
+    return candidates, coarse
+
+
+def _resolve_cells(
+    cell: NDArray[np.int32], mask: NDArray[np.bool_], k: int, padded: NDArray[np.int32]
+) -> NDArray[np.intp]:
+    """Exact nearest (deduplicated) palette index for every color in each grid cell.
+
+    ``mask`` flags the candidate colors of each cell; ``padded`` is the palette plus a
+    trailing sentinel color. Returns an (M, _CELL, _CELL, _CELL) index array.
+    """
+    sentinel = len(padded) - 1
+    # Stable sort keeps candidates in palette order, so the scan below breaks ties low.
+    # Short lists are padded with the sentinel, which is farther than any real color.
+    order = np.argsort(~mask, axis=1, kind="stable")[:, :k]
+    order[~np.take_along_axis(mask, order, axis=1)] = sentinel
+
+    # d(x, p) - d(x, q) is linear in x, so if p is farther than q at all eight corners of
+    # a cell it is farther everywhere inside it. Drop such dominated candidates.
+    corners = cell[:, None, :] * _CELL + _CORNERS * (_CELL - 1)  # (M, 8, 3)
+    diff = corners[:, :, None, :] - padded[order][:, None, :, :]  # (M, 8, k, 3)
+    dist = np.einsum("mckx,mckx->mck", diff, diff)
+    dominated = np.all(dist[:, :, :, None] > dist[:, :, None, :], axis=1).any(axis=2)
+    order[dominated] = sentinel
+    order = np.take_along_axis(order, np.argsort(order, axis=1, kind="stable"), axis=1)
+    order = order[:, : int(np.count_nonzero(order < sentinel, axis=1).max())]
+
+    points = cell[:, None, :] * _CELL + _FINE[None, :, :]  # (M, _CELL**3, 3)
+    best_dist = np.full(points.shape[:2], np.iinfo(np.int32).max, dtype=np.int32)
+    best = np.zeros(points.shape[:2], dtype=np.intp)
+    # Scan candidate slots in palette order; strict "<" keeps the lowest index on ties.
+    for j in range(order.shape[1]):
+        diff = points - padded[order[:, j]][:, None, :]
+        dist = np.einsum("mpx,mpx->mp", diff, diff)
+        closer = dist < best_dist
+        best_dist = np.where(closer, dist, best_dist)
+        best = np.where(closer, order[:, j, None], best)
+    return best.reshape(-1, _CELL, _CELL, _CELL)
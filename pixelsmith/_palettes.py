@@ -2,14 +2,29 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import ClassVar
+import os
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, ClassVar
 
 import numpy as np
 from numpy.typing import NDArray
 
+from pixelsmith._nearest import (
+    STRATEGIES,
+    GridIndex,
+    build_lut,
+    choose_strategy,
+    distinct_colors,
+    nearest_brute,
+    pack_rgb,
+    unpack_rgb,
+)
 from pixelsmith.exceptions import PaletteError
 
+if TYPE_CHECKING:
+    from PIL import Image
+
 
 @dataclass(frozen=True, slots=True)
 class Palette:
@@ -17,11 +32,121 @@ class Palette:
 
     name: str
     colors: tuple[tuple[int, int, int], ...]
+    _lut: NDArray[np.uint8] | NDArray[np.uint16] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _index: GridIndex | None = field(default=None, init=False, repr=False, compare=False)
+    # Colors looked up so far; a busy palette earns a costlier, faster search structure.
+    _queried: int = field(default=0, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_image(
+        cls,
+        image: Image.Image | NDArray[np.uint8] | str | os.PathLike,
+        n_colors: int,
+        method: str = "kmeans",
+        *,
+        name: str | None = None,
+        seed: int = 0,
+    ) -> Palette:
+        """Derive an ``n_colors`` palette from an image (PIL image, uint8 array or path).
+
+        ``method`` is "kmeans" (mini-batch k-means), "median_cut" or "octree"; all run
+        on a fixed-size pixel subsample. Colors are ordered most used first, and fewer
+        than ``n_colors`` are returned if the image has fewer distinct colors.
+        """
+        return cls.from_images([image], n_colors, method, name=name, seed=seed)
+
+    @classmethod
+    def from_images(
+        cls,
+        images: Sequence[Image.Image | NDArray[np.uint8] | str | os.PathLike],
+        n_colors: int,
+        method: str = "kmeans",
+        *,
+        name: str | None = None,
+        seed: int = 0,
+    ) -> Palette:
+        """Derive one palette shared by a batch of images, so a sprite set stays consistent.
+
+        Every image contributes equally to the sample; see :meth:`from_image`.
+        """
+        from pixelsmith._extract import extract_colors
+
+        colors = extract_colors(images, n_colors, method, seed=seed)
+        return cls(name or f"{method}{n_colors}", tuple(tuple(int(v) for v in c) for c in colors))
 
     def as_array(self) -> NDArray[np.uint8]:
         """Return palette as (N, 3) uint8 array."""
         return np.array(self.colors, dtype=np.uint8)
 
+    def lookup_table(self) -> NDArray[np.uint8] | NDArray[np.uint16]:
+        """Return the nearest-color index for every packed ``0xRRGGBB`` value.
+
+        The ``2**24`` table is compiled on first use and cached on the palette.
+        """
+        lut = self._lut
+        if lut is None:
+            lut = build_lut(self.as_array())
+            object.__setattr__(self, "_lut", lut)
+        return lut
+
+    def spatial_index(self) -> GridIndex:
+        """Return the bucketed RGB index over the palette, built on first use."""
+        index = self._index
+        if index is None:
+            index = GridIndex(self.as_array())
+            object.__setattr__(self, "_index", index)
+        return index
+
+    def nearest_strategy(self, n_pixels: int) -> str:
+        """Pick "brute", "index" or "lut" for looking up ``n_pixels`` more pixels."""
+        return choose_strategy(
+            len(self.colors),
+            self._queried + n_pixels,
+            has_index=self._index is not None,
+            has_lut=self._lut is not None,
+        )
+
+    def nearest_indices(
+        self, pixels: NDArray[np.uint8], *, strategy: str | None = None
+    ) -> NDArray[np.integer]:
+        """Index of the nearest color for each (..., 3) uint8 pixel, shaped (...).
+
+        Every strategy returns exactly what an ``np.argmin`` over squared RGB distances
+        would, ties going to the lowest index. By default the strategy is chosen with
+        :meth:`nearest_strategy`.
+        """
+        n_pixels = pixels.size // 3
+        strategy = strategy or self.nearest_strategy(n_pixels)
+        if strategy not in STRATEGIES:
+            msg = f"Unknown strategy {strategy!r}. Available: {', '.join(STRATEGIES)}"
+            raise ValueError(msg)
+
+        codes = pack_rgb(pixels)
+        if strategy == "lut":
+            self._count_queries(n_pixels)
+            return self.lookup_table()[codes]
+
+        # Flat-shaded art repeats a few colors many times: search each distinct color
+        # once and scatter the answers back through the inverse index.
+        distinct = distinct_colors(codes)
+        if distinct is None:
+            queries, inverse = pixels.reshape(-1, 3), None
+        else:
+            queries, inverse = unpack_rgb(distinct[0]), distinct[1]
+        self._count_queries(len(queries))
+        if strategy == "index":
+            nearest = self.spatial_index().query(queries)
+        else:
+            nearest = nearest_brute(queries, self.as_array())
+        if inverse is not None:
+            nearest = nearest[inverse]
+        return nearest.reshape(pixels.shape[:-1])
+
+    def _count_queries(self, n: int) -> None:
+        object.__setattr__(self, "_queried", self._queried + n)
+
 
 # fmt: off
 NES = Palette("nes", (
@@ -2,23 +2,82 @@
 
 from __future__ import annotations
 
+import itertools
 import logging
-from typing import TYPE_CHECKING
+import shutil
+import threading
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
 
-from pixelsmith._config import GenerationConfig
+from pixelsmith._config import GenerationConfig, PipelineKey
+from pixelsmith._embedding_cache import EmbeddingCache, EmbeddingCacheStats, Embeddings
+from pixelsmith._pipeline_cache import PipelineCache, PipelineCacheStats
+from pixelsmith._singleflight import SingleFlight
+from pixelsmith._snapshot import COMPONENTS, find_snapshot, load_components, save_snapshot
 from pixelsmith.exceptions import GenerationError, ModelLoadError
 
 if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import NDArray
     from PIL import Image
 
+    # A PIL image, or an (H, W, 3) float array in [0, 1] with output_type="np"
+    Render = Image.Image | NDArray[np.float32]
+
 logger = logging.getLogger(__name__)
 
-_BASE_MODEL = "stabilityai/stable-diffusion-xl-base-1.0"
-_LORA_REPO = "nerijs/pixel-art-xl"
+_LORA_ADAPTER = "pixel"
+_LCM_ADAPTER = "lcm"
+
+# diffusers scheduler class and from_config overrides per GenerationConfig.scheduler
+_SCHEDULER_CLASSES: dict[str, tuple[str, dict[str, Any]]] = {
+    "dpmpp_2m_karras": (
+        "DPMSolverMultistepScheduler",
+        {"algorithm_type": "dpmsolver++", "use_karras_sigmas": True},
+    ),
+    "euler_a": ("EulerAncestralDiscreteScheduler", {}),
+    "unipc": ("UniPCMultistepScheduler", {}),
+    "lcm": ("LCMScheduler", {}),
+}
+
+_tokens = itertools.count()
+
+
+@dataclass(slots=True)
+class _LoadedPipeline:
+    """A resident pipeline plus the per-call state currently applied to it."""
+
+    pipe: Any
+    key: PipelineKey
+    host_bytes: int = 0
+    device_bytes: int = 0
+    # (pixel LoRA scale, LCM LoRA fused) currently fused into the weights, None if unfused
+    lora_state: tuple[float, bool] | None = None
+    # Scheduler instances by name, built once from the model's own ("default") config.
+    # They hold per-run timesteps, so one is only swapped in or used under ``lock``.
+    schedulers: dict[str, Any] = field(default_factory=dict)
+    token: int = field(default_factory=lambda: next(_tokens))  # unique per load
+    # Held from applying per-call LoRA/scheduler state until the pipeline call returns
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+# Module-level pipeline cache, keyed by load-time settings only
+_cache: PipelineCache[_LoadedPipeline] = PipelineCache()
+_cache_lock = threading.Lock()
 
-# Module-level pipeline cache
-_cached_pipeline: object | None = None
-_cached_config: GenerationConfig | None = None
+# Concurrent cold loads of one key share a single from_pretrained call
+_loads: SingleFlight[_LoadedPipeline] = SingleFlight()
+
+# Bumped by every unload_pipeline() call; a load that started before an unload of
+# its key finishes for its callers but is not cached.
+_unload_epoch = 0
+_cleared_at = 0
+_unloaded_at: dict[PipelineKey, int] = {}
+
+# Text-encoder outputs per (pipeline, fused LoRA state, text)
+_embeddings = EmbeddingCache()
 
 
 def _resolve_torch_dtype(dtype_str: str):  # noqa: ANN202
@@ -30,43 +89,373 @@ def _resolve_torch_dtype(dtype_str: str):  # noqa: ANN202
     ]
 
 
-def _load_pipeline(config: GenerationConfig):  # noqa: ANN202
-    """Load SDXL base + pixel-art-xl LoRA, with caching."""
-    global _cached_pipeline, _cached_config  # noqa: PLW0603
+def _build_pipeline(key: PipelineKey):  # noqa: ANN202
+    """Load SDXL base + pixel-art LoRA (+ LCM LoRA), unfused, for the given load-time settings.
 
-    if _cached_pipeline is not None and _cached_config == config:
-        return _cached_pipeline
+    When the key carries a ``lora_weight`` (``lora_snapshot``), the pixel LoRA is
+    baked in instead: loaded from a fused snapshot when a valid one exists,
+    otherwise fused once and saved as one.
+    """
+    import torch  # noqa: F401 — required by diffusers at runtime
+    from diffusers import StableDiffusionXLPipeline
 
-    try:
-        import torch  # noqa: F401 — required by diffusers at runtime
-        from diffusers import StableDiffusionXLPipeline
-
-        dtype = _resolve_torch_dtype(config.dtype)
-        device = config.resolved_device()
-
-        logger.info("Loading SDXL base model from %s", _BASE_MODEL)
-        pipe = StableDiffusionXLPipeline.from_pretrained(
-            _BASE_MODEL,
-            torch_dtype=dtype,
-            cache_dir=config.cache_dir,
-            use_safetensors=True,
-        )
+    dtype = _resolve_torch_dtype(key.dtype)
 
-        logger.info("Loading LoRA weights from %s", _LORA_REPO)
-        pipe.load_lora_weights(_LORA_REPO, cache_dir=config.cache_dir)
-        pipe.fuse_lora(lora_scale=config.lora_weight)
+    components = _snapshot_components(key, dtype) if key.lora_weight is not None else {}
+    logger.info("Loading SDXL base model from %s", key.base_model)
+    pipe = StableDiffusionXLPipeline.from_pretrained(
+        key.base_model,
+        torch_dtype=dtype,
+        cache_dir=key.cache_dir,
+        use_safetensors=True,
+        **components,
+    )
 
-        if config.enable_cpu_offload and device == "cuda":
-            pipe.enable_model_cpu_offload()
-        else:
-            pipe = pipe.to(device)
+    if not components:
+        logger.info("Loading LoRA weights from %s", key.lora_repo)
+        pipe.load_lora_weights(key.lora_repo, cache_dir=key.cache_dir, adapter_name=_LORA_ADAPTER)
+        if key.lora_weight is not None:
+            _bake_lora(pipe, key)
+    if key.lcm_lora_path is not None:
+        logger.info("Loading LCM LoRA weights from %s", key.lcm_lora_path)
+        pipe.load_lora_weights(key.lcm_lora_path, adapter_name=_LCM_ADAPTER)
+
+    _apply_inference_options(pipe, key)
+    return _place_pipeline(pipe, key)
 
-        _cached_pipeline = pipe
-        _cached_config = config
+
+def _place_pipeline(pipe: Any, key: PipelineKey) -> Any:
+    """Move the pipeline to the key's device, or install CPU offload hooks on CUDA."""
+    device = key.resolved_device()
+    if key.enable_cpu_offload and device == "cuda":
+        if key.offload_mode == "sequential":
+            pipe.enable_sequential_cpu_offload()
+        else:
+            pipe.enable_model_cpu_offload()
         return pipe
+    return pipe.to(device)
+
+
+def _apply_inference_options(pipe: Any, key: PipelineKey) -> None:
+    """Apply the key's attention, slicing, tiling and memory-format settings.
+
+    Runs before device placement and offload hooks, which keep these settings.
+    """
+    if key.attention == "xformers":
+        pipe.enable_xformers_memory_efficient_attention()
+    elif key.attention == "eager":
+        from diffusers.models.attention_processor import AttnProcessor
+
+        pipe.unet.set_attn_processor(AttnProcessor())
+    # "sdpa" is what diffusers installs by default on torch 2.
+    if key.attention_slicing is not None:
+        pipe.enable_attention_slicing(key.attention_slicing)
+    if key.vae_slicing:
+        pipe.vae.enable_slicing()
+    if key.vae_tiling:
+        pipe.vae.enable_tiling()
+    if key.channels_last:
+        import torch
+
+        pipe.unet.to(memory_format=torch.channels_last)
+        pipe.vae.to(memory_format=torch.channels_last)
+    _apply_num_threads(key)
+
+
+def _apply_num_threads(key: PipelineKey) -> None:
+    """Set torch's intra-op thread count if the key asks for one it isn't using."""
+    if key.num_threads is None:
+        return
+    import torch
+
+    if torch.get_num_threads() != key.num_threads:
+        torch.set_num_threads(key.num_threads)
+
+
+def _snapshot_components(key: PipelineKey, dtype: Any) -> dict[str, Any]:
+    """Fused components from the key's snapshot, or {} when there is no usable one."""
+    files = find_snapshot(key)
+    if files is None:
+        return {}
+    logger.info("Loading fused LoRA snapshot (%s)", ", ".join(files))
+    try:
+        return load_components(key, files, dtype)
+    except Exception:
+        # Unreadable or mismatched weights: rebuild, which rewrites the snapshot.
+        logger.warning("Fused LoRA snapshot failed to load; fusing from scratch", exc_info=True)
+        shutil.rmtree(next(iter(files.values())).parent, ignore_errors=True)
+        return {}
+
+
+def _bake_lora(pipe: Any, key: PipelineKey) -> None:
+    """Fuse the pixel LoRA at the key's weight, drop the adapter and save a snapshot."""
+    touched = [
+        name for name in COMPONENTS if getattr(getattr(pipe, name, None), "peft_config", None)
+    ]
+    pipe.set_adapters([_LORA_ADAPTER], adapter_weights=[key.lora_weight])
+    pipe.fuse_lora(lora_scale=1.0, adapter_names=[_LORA_ADAPTER])
+    pipe.unload_lora_weights()  # keeps the fused weights
+    if not touched:
+        return
+    try:
+        save_snapshot(pipe, key, touched)
+    except Exception:
+        # The pipeline is usable either way; the next cold load just fuses again.
+        logger.warning("Could not save fused LoRA snapshot", exc_info=True)
+
+
+def _apply_lora_weight(entry: _LoadedPipeline, weight: float, *, lcm: bool = False) -> None:
+    """Fuse the pixel-art LoRA at ``weight`` (plus the LCM LoRA if ``lcm``).
+
+    Re-fuses in place only when the requested adapters or scale changed. A pipeline
+    with the pixel LoRA baked in (snapshot) only ever fuses and unfuses the LCM LoRA,
+    and disables it (no adapter active) when it is not wanted.
+    """
+    state = (weight, lcm)
+    if entry.lora_state == state:
+        return
+    baked = entry.key.lora_weight is not None
+    pipe = entry.pipe
+    if entry.lora_state is not None and (not baked or entry.lora_state[1]):
+        pipe.unfuse_lora()
+    entry.lora_state = None
+    names, weights = ([], []) if baked else ([_LORA_ADAPTER], [weight])
+    if lcm:
+        names.append(_LCM_ADAPTER)
+        weights.append(1.0)
+    if names:
+        if baked:
+            pipe.enable_lora()
+        # set_adapters sets the scale absolutely, so repeated sweeps never compound it.
+        pipe.set_adapters(names, adapter_weights=weights)
+        pipe.fuse_lora(lora_scale=1.0, adapter_names=names)
+    elif entry.key.lcm_lora_path is not None:
+        # unfuse_lora only unmerges: the loaded LCM adapter would stay active.
+        pipe.disable_lora()
+    entry.lora_state = state
+
+
+def _make_scheduler(name: str, base_config: Any):  # noqa: ANN202
+    """Instantiate the named diffusers scheduler from the model's scheduler config."""
+    import diffusers
+
+    class_name, overrides = _SCHEDULER_CLASSES[name]
+    return getattr(diffusers, class_name).from_config(base_config, **overrides)
+
+
+def _apply_scheduler(entry: _LoadedPipeline, name: str) -> None:
+    """Install the named scheduler on the pipeline, creating it on first use.
+
+    The caller holds ``entry.lock`` (see :func:`_use_entry`): replacing the scheduler
+    of a running call would switch its timesteps mid-loop.
+    """
+    scheduler = entry.schedulers.get(name)
+    if scheduler is None:
+        base = entry.schedulers["default"]
+        scheduler = entry.schedulers[name] = _make_scheduler(name, base.config)
+    entry.pipe.scheduler = scheduler
+
+
+def _module_nbytes(module: Any) -> int:
+    """Bytes held by a torch module's parameters and buffers (0 for non-modules)."""
+    total = 0
+    for attr in ("parameters", "buffers"):
+        tensors = getattr(module, attr, None)
+        if callable(tensors):
+            total += sum(t.numel() * t.element_size() for t in tensors())
+    return total
+
+
+def _pipeline_footprint(pipe: Any, key: PipelineKey) -> tuple[int, int]:
+    """Estimate (host_bytes, device_bytes) held by a loaded pipeline."""
+    components = getattr(pipe, "components", None) or {}
+    nbytes = sum(_module_nbytes(m) for m in components.values())
+    device = key.resolved_device()
+    if device == "cpu" or (key.enable_cpu_offload and device == "cuda"):
+        return nbytes, 0
+    return 0, nbytes
+
+
+def _load_pipeline(config: GenerationConfig):  # noqa: ANN202
+    """Return the pipeline for config (see _load_entry)."""
+    return _load_entry(config).pipe
+
+
+def _load_entry(config: GenerationConfig) -> _LoadedPipeline:
+    """Return the cache entry for config with its per-call state applied (see _use_entry).
+
+    The entry is unlocked on return, so another caller may change that state before
+    it is used; generation goes through :func:`_use_entry` instead.
+    """
+    with _use_entry(config) as entry:
+        return entry
+
+
+@contextmanager
+def _use_entry(config: GenerationConfig) -> Iterator[_LoadedPipeline]:
+    """Hold the cache entry for config, loading it only when its load-time key is not cached.
+
+    ``lora_weight`` and ``scheduler`` are not part of the key: a resident pipeline
+    is re-fused at the requested scale and has the requested scheduler swapped in
+    instead of being reloaded. The entry's lock is held from then until the block
+    exits, so another thread cannot change the fused weights or the scheduler in
+    the middle of a denoising loop.
+
+    Safe to call from several threads: concurrent cold loads of one key run a single
+    load that every caller waits on, and a load failure is raised in every caller.
+    """
+    key = config.load_key()
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry is None:
+        entry = _loads.do(key, lambda: _load_and_cache(key))
+
+    with entry.lock:
+        # The thread count is process-wide, so re-apply it when switching pipelines.
+        _apply_num_threads(key)
+        try:
+            _apply_lora_weight(entry, config.lora_weight, lcm=config.scheduler == "lcm")
+        except Exception as exc:
+            raise ModelLoadError(f"Failed to apply LoRA weight: {exc}") from exc
+        try:
+            _apply_scheduler(entry, config.scheduler)
+        except Exception as exc:
+            raise ModelLoadError(f"Failed to set scheduler {config.scheduler!r}: {exc}") from exc
+        yield entry
+
 
+def _load_and_cache(key: PipelineKey) -> _LoadedPipeline:
+    """Build the pipeline for key and cache it, unless it was unloaded meanwhile."""
+    with _cache_lock:
+        # A load for key may have finished between the caller's miss and this flight.
+        # peek, not get: the caller already counted this lookup as a miss.
+        entry = _cache.peek(key)
+        if entry is not None:
+            return entry
+        started = _unload_epoch
+        # Evicting before the build only happens when max_entries leaves no room, so
+        # two full sets of weights are never resident at once. A failed load then
+        # costs the evicted pipeline; budget-driven eviction waits for put().
+        evicted = _cache.reserve()
+    _free_memory(evicted)
+
+    try:
+        pipe = _build_pipeline(key)
     except Exception as exc:
         raise ModelLoadError(f"Failed to load pipeline: {exc}") from exc
+    host_bytes, device_bytes = _pipeline_footprint(pipe, key)
+    entry = _LoadedPipeline(pipe, key, host_bytes=host_bytes, device_bytes=device_bytes)
+    entry.schedulers["default"] = pipe.scheduler
+
+    with _cache_lock:
+        if max(_cleared_at, _unloaded_at.get(key, 0)) > started:
+            logger.info("Pipeline %s was unloaded while loading; not caching it", key)
+            evicted = []
+        else:
+            evicted = _cache.put(entry)
+    _free_memory(evicted)
+    return entry
+
+
+def configure_pipeline_cache(
+    *,
+    max_entries: int = 1,
+    host_budget_bytes: int | None = None,
+    device_budget_bytes: int | None = None,
+) -> None:
+    """Set how many pipelines stay resident and their host/device memory budgets.
+
+    Args:
+        max_entries: Maximum number of loaded pipelines. Default 1.
+        host_budget_bytes: Budget for weights held in host RAM (None = unbounded).
+        device_budget_bytes: Budget for weights held on the GPU (None = unbounded).
+
+    Entries over the new limits are evicted immediately, least recently used first.
+    """
+    with _cache_lock:
+        _cache.max_entries = max_entries
+        _cache.host_budget_bytes = host_budget_bytes
+        _cache.device_budget_bytes = device_budget_bytes
+        evicted = _cache.enforce()
+    _free_memory(evicted)
+
+
+def shrink_caches() -> None:
+    """Drop cached prompt embeddings and every pipeline but the most recently used."""
+    _embeddings.clear()
+    with _cache_lock:
+        evicted = _cache.trim(1)
+    _free_memory(evicted)
+
+
+def pipeline_cache_stats() -> PipelineCacheStats:
+    """Return pipeline cache occupancy plus hit, miss and eviction counters."""
+    with _cache_lock:
+        return _cache.stats()
+
+
+def embedding_cache_stats() -> EmbeddingCacheStats:
+    """Return prompt-embedding cache occupancy plus hit and miss counters."""
+    return _embeddings.stats()
+
+
+def _encode(entry: _LoadedPipeline, text: str) -> Embeddings:
+    """(prompt_embeds, pooled_prompt_embeds) for text, from the cache when possible.
+
+    Negative prompts are encoded the same way: SDXL runs a string negative prompt
+    through exactly the tokenizer/encoder path used for the positive prompt.
+    """
+
+    def encode(text: str) -> Embeddings:
+        embeds, _, pooled, _ = entry.pipe.encode_prompt(
+            prompt=text, num_images_per_prompt=1, do_classifier_free_guidance=False
+        )
+        return embeds, pooled
+
+    return _embeddings.get(entry.token, entry.lora_state, text, encode)
+
+
+def _concat_embeds(tensors: Sequence[Any]) -> Any:
+    """Stack per-item embeddings along the batch dimension."""
+    import torch
+
+    return torch.cat(list(tensors))
+
+
+def _embedding_kwargs(
+    entry: _LoadedPipeline, prompts: Sequence[str], negative_prompt: str
+) -> dict[str, Any]:
+    """Pipeline kwargs carrying cached embeddings for prompts and the negative prompt.
+
+    A single prompt is passed once (the pipeline repeats it per image); distinct
+    prompts are stacked with the negative repeated to match.
+    """
+    negative, negative_pooled = _encode(entry, negative_prompt)
+    if len(set(prompts)) == 1:
+        embeds, pooled = _encode(entry, prompts[0])
+    else:
+        encoded = [_encode(entry, p) for p in prompts]
+        embeds = _concat_embeds([e for e, _ in encoded])
+        pooled = _concat_embeds([p for _, p in encoded])
+        negative = _concat_embeds([negative] * len(prompts))
+        negative_pooled = _concat_embeds([negative_pooled] * len(prompts))
+    return {
+        "prompt_embeds": embeds,
+        "pooled_prompt_embeds": pooled,
+        "negative_prompt_embeds": negative,
+        "negative_pooled_prompt_embeds": negative_pooled,
+    }
+
+
+def _make_generator(seed: int | None):  # noqa: ANN202
+    """CPU torch generator seeded with seed, or with fresh entropy when seed is None."""
+    import torch
+
+    generator = torch.Generator(device="cpu")
+    if seed is None:
+        generator.seed()
+        return generator
+    return generator.manual_seed(seed)
 
 
 def run_pipeline(
@@ -75,38 +464,160 @@ def run_pipeline(
     negative_prompt: str,
     seed: int | None = None,
     config: GenerationConfig,
-) -> Image.Image:
-    """Run the SDXL + LoRA pipeline and return the raw generated image."""
-    pipe = _load_pipeline(config)
+    output_type: str = "pil",
+) -> Render:
+    """Run the SDXL + LoRA pipeline and return the raw generated image.
 
-    try:
-        import torch
+    ``output_type="np"`` returns the float array diffusers decodes to, skipping its
+    PIL conversion; the post-processing stages read it directly.
+    """
+    with _use_entry(config) as entry:
+        try:
+            result = entry.pipe(
+                **_embedding_kwargs(entry, [prompt], negative_prompt),
+                num_inference_steps=config.num_inference_steps,
+                guidance_scale=config.guidance_scale,
+                width=config.render_size,
+                height=config.render_size,
+                generator=_make_generator(seed),
+                output_type=output_type,
+            )
+            return result.images[0]
 
-        generator = torch.Generator(device="cpu")
-        if seed is not None:
-            generator = generator.manual_seed(seed)
-
-        result = pipe(
-            prompt=prompt,
-            negative_prompt=negative_prompt,
-            num_inference_steps=config.num_inference_steps,
-            guidance_scale=config.guidance_scale,
-            width=config.render_size,
-            height=config.render_size,
-            generator=generator,
-        )
-        return result.images[0]
+        except Exception as exc:
+            raise GenerationError(f"Generation failed: {exc}") from exc
+
+
+# Rough peak activation memory of one 1024px SDXL image with classifier-free guidance
+# in half precision; scaled by render area and dtype width to size micro-batches.
+_IMAGE_ACTIVATION_BYTES = 2 << 30
+_MAX_BATCH_SIZE = 8
+_CPU_BATCH_SIZE = 2
+
+
+def _auto_batch_size(config: GenerationConfig) -> int:
+    """Largest micro-batch expected to fit in free device memory."""
+    if config.resolved_device() != "cuda":
+        return _CPU_BATCH_SIZE
+    import torch
+
+    free, _ = torch.cuda.mem_get_info()
+    scale = (config.render_size / 1024) ** 2 * (2 if config.dtype == "float32" else 1)
+    return max(1, min(_MAX_BATCH_SIZE, int(free // (_IMAGE_ACTIVATION_BYTES * scale))))
+
+
+def _is_out_of_memory(exc: BaseException) -> bool:
+    return type(exc).__name__ == "OutOfMemoryError" or "out of memory" in str(exc).lower()
+
+
+def _run_micro_batch(
+    entry: _LoadedPipeline,
+    prompts: Sequence[str],
+    *,
+    negative_prompt: str,
+    seeds: Sequence[int | None],
+    config: GenerationConfig,
+    output_type: str,
+) -> list[Render]:
+    """One batched diffusion call with a generator per item."""
+    generators = [_make_generator(seed) for seed in seeds]
+    # One shared prompt is passed once and fanned out by the pipeline.
+    per_prompt = len(prompts) if len(set(prompts)) == 1 else 1
+    result = entry.pipe(
+        **_embedding_kwargs(entry, prompts, negative_prompt),
+        num_images_per_prompt=per_prompt,
+        num_inference_steps=config.num_inference_steps,
+        guidance_scale=config.guidance_scale,
+        width=config.render_size,
+        height=config.render_size,
+        generator=generators,
+        output_type=output_type,
+    )
+    return list(result.images)
+
+
+def run_pipeline_batch(
+    prompts: Sequence[str],
+    *,
+    negative_prompt: str,
+    seeds: Sequence[int | None],
+    config: GenerationConfig,
+    max_batch_size: int | None = None,
+    output_type: str = "pil",
+) -> list[Render]:
+    """Run several prompt/seed pairs through batched pipeline calls, in order.
+
+    Work is split into micro-batches of at most ``max_batch_size`` items (default:
+    sized from free device memory). A micro-batch that runs out of memory is halved
+    and retried. ``output_type`` is as for :func:`run_pipeline`.
+    """
+    with _use_entry(config) as entry:
+        batch_size = max_batch_size or _auto_batch_size(config)
+        images: list[Render] = []
+
+        start = 0
+        while start < len(prompts):
+            end = min(start + batch_size, len(prompts))
+            try:
+                chunk = _run_micro_batch(
+                    entry,
+                    prompts[start:end],
+                    negative_prompt=negative_prompt,
+                    seeds=seeds[start:end],
+                    config=config,
+                    output_type=output_type,
+                )
+            except Exception as exc:
+                if not _is_out_of_memory(exc) or batch_size == 1:
+                    raise GenerationError(f"Generation failed: {exc}") from exc
+                batch_size //= 2
+                logger.warning("Out of memory; retrying with batch size %d", batch_size)
+                chunk = None
+            if chunk is None:
+                # Outside the except block, so the failed batch's tensors are unreachable.
+                _release_memory()
+                continue
+            images.extend(chunk)
+            start = end
+    return images
+
+
+def unload_pipeline(config: GenerationConfig | None = None) -> None:
+    """Free cached pipelines and GPU memory.
+
+    Args:
+        config: Only unload the pipeline loaded for this config. Default: unload all.
+
+    Safe to call while a load is in flight: that load still completes for the
+    callers waiting on it, but its pipeline is not cached.
+    """
+    global _unload_epoch, _cleared_at
+    with _cache_lock:
+        _unload_epoch += 1
+        if config is None:
+            _cleared_at = _unload_epoch
+            _unloaded_at.clear()
+            evicted = _cache.clear()
+        else:
+            key = config.load_key()
+            _unloaded_at[key] = _unload_epoch
+            entry = _cache.pop(key)
+            evicted = [] if entry is None else [entry]
+    _free_memory(evicted)
 
-    except Exception as exc:
-        raise GenerationError(f"Generation failed: {exc}") from exc
 
+def _free_memory(evicted: list[_LoadedPipeline]) -> None:
+    """Drop references to evicted entries, then release Python and CUDA memory."""
+    if not evicted:
+        return
+    for entry in evicted:
+        _embeddings.drop(entry.token)
+    evicted.clear()
+    _release_memory()
 
-def unload_pipeline() -> None:
-    """Free the cached pipeline and GPU memory."""
-    global _cached_pipeline, _cached_config  # noqa: PLW0603
-    _cached_pipeline = None
-    _cached_config = None
 
+def _release_memory() -> None:
+    """Collect garbage and return cached CUDA blocks to the driver."""
     try:
         import gc
 
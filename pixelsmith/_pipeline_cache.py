@@ -0,0 +1,165 @@
+"""LRU cache of loaded pipelines, bounded by entry count and memory budgets."""
+
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Generic, Protocol, TypeVar
+
+from pixelsmith._config import PipelineKey
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry(Protocol):
+    """What the cache needs to know about a loaded pipeline."""
+
+    key: PipelineKey
+    host_bytes: int
+    device_bytes: int
+
+
+EntryT = TypeVar("EntryT", bound=CacheEntry)
+
+
+@dataclass(frozen=True, slots=True)
+class PipelineCacheStats:
+    """Snapshot of pipeline cache occupancy and counters."""
+
+    entries: int
+    hits: int
+    misses: int
+    evictions: int
+    host_bytes: int
+    device_bytes: int
+    max_entries: int
+    host_budget_bytes: int | None
+    device_budget_bytes: int | None
+
+
+class PipelineCache(Generic[EntryT]):
+    """Holds loaded pipelines keyed by PipelineKey, evicting least recently used first.
+
+    An entry is evicted when the cache holds more than ``max_entries`` pipelines or
+    when the summed host/device footprint exceeds its budget (``None`` = unbounded).
+    The most recently inserted entry is never evicted, even if it alone is over budget.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1,
+        host_budget_bytes: int | None = None,
+        device_budget_bytes: int | None = None,
+    ) -> None:
+        self._entries: OrderedDict[PipelineKey, EntryT] = OrderedDict()
+        self.max_entries = max_entries
+        self.host_budget_bytes = host_budget_bytes
+        self.device_budget_bytes = device_budget_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def keys(self) -> list[PipelineKey]:
+        """Cached keys, least recently used first."""
+        return list(self._entries)
+
+    def get(self, key: PipelineKey) -> EntryT | None:
+        """Return the entry for key and mark it most recently used, counting hit/miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def peek(self, key: PipelineKey) -> EntryT | None:
+        """Return the entry for key without counting a hit/miss or changing LRU order."""
+        return self._entries.get(key)
+
+    def reserve(self) -> list[EntryT]:
+        """Evict down to ``max_entries - 1`` so a new pipeline can load; return evictees.
+
+        Only the entry count is enforced here: nothing is evicted while there is room
+        for one more entry, and memory budgets are enforced by :meth:`put` once the
+        new pipeline's footprint is known.
+        """
+        return self._evict_while(lambda: len(self._entries) >= max(1, self.max_entries), 0)
+
+    def put(self, entry: EntryT) -> list[EntryT]:
+        """Insert entry as most recently used and enforce limits; return evictees."""
+        self._entries[entry.key] = entry
+        self._entries.move_to_end(entry.key)
+        return self.enforce()
+
+    def enforce(self) -> list[EntryT]:
+        """Evict LRU entries until within limits, keeping the most recent; return evictees."""
+        evicted = self._evict_while(self._over_limit, 1)
+        if self._over_limit():
+            newest = next(reversed(self._entries.values()))
+            logger.warning(
+                "Pipeline %s alone exceeds the cache memory budget; keeping it resident",
+                newest.key.base_model,
+            )
+        return evicted
+
+    def trim(self, keep: int) -> list[EntryT]:
+        """Evict LRU entries until at most ``keep`` remain; return evictees."""
+        return self._evict_while(lambda: True, keep)
+
+    def pop(self, key: PipelineKey) -> EntryT | None:
+        """Remove and return the entry for key, if cached."""
+        return self._entries.pop(key, None)
+
+    def clear(self) -> list[EntryT]:
+        """Remove and return every entry."""
+        entries = list(self._entries.values())
+        self._entries.clear()
+        return entries
+
+    def host_bytes(self) -> int:
+        return sum(e.host_bytes for e in self._entries.values())
+
+    def device_bytes(self) -> int:
+        return sum(e.device_bytes for e in self._entries.values())
+
+    def stats(self) -> PipelineCacheStats:
+        """Return a snapshot of occupancy and hit/miss/eviction counters."""
+        return PipelineCacheStats(
+            entries=len(self._entries),
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            host_bytes=self.host_bytes(),
+            device_bytes=self.device_bytes(),
+            max_entries=self.max_entries,
+            host_budget_bytes=self.host_budget_bytes,
+            device_budget_bytes=self.device_budget_bytes,
+        )
+
+    def _over_limit(self) -> bool:
+        if len(self._entries) > max(1, self.max_entries):
+            return True
+        if self.host_budget_bytes is not None and self.host_bytes() > self.host_budget_bytes:
+            return True
+        return self.device_budget_bytes is not None and (
+            self.device_bytes() > self.device_budget_bytes
+        )
+
+    def _evict_while(self, condition: Callable[[], bool], keep: int) -> list[EntryT]:
+        """Pop LRU entries while condition() holds, always leaving ``keep`` entries."""
+        evicted: list[EntryT] = []
+        while len(self._entries) > keep and condition():
+            _, entry = self._entries.popitem(last=False)
+            self.evictions += 1
+            logger.info("Evicting cached pipeline %s", entry.key)
+            evicted.append(entry)
+        return evicted
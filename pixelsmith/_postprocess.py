@@ -1,31 +1,415 @@
-"""Post-processing: downscale and palette quantization."""
+"""Post-processing: downscale and palette quantization.
+
+Sprites are finished by a short chain of stages (downscale, quantize/dither, outline,
+upscale) that pass one contiguous uint8 buffer along, writing in place where they can;
+PIL images are only made at the edge, by :func:`to_image`.
+"""
 
 from __future__ import annotations
 
+import os
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from typing import ClassVar, Protocol
+
 import numpy as np
+from numpy.typing import NDArray
 from PIL import Image
 
+from pixelsmith._dither import check_dither, floyd_steinberg, ordered_dither
+from pixelsmith._downscale import block_reduce, check_downscale_mode, nearest_rows
 from pixelsmith._palettes import Palette
+from pixelsmith.exceptions import PaletteError
+
+# Anything quantize_array accepts: a PIL image, an (H, W[, 3|4]) uint8 array or a path.
+ImageSource = Image.Image | NDArray[np.uint8] | str | os.PathLike
+
+# What the stages accept: also a float array in [0, 1], as diffusers returns with
+# output_type="np".
+RenderSource = ImageSource | NDArray[np.floating]
+
+# Working-memory ceiling for one band of rows, and the approximate bytes each pixel
+# costs while in flight (RGB copy, int32 channels and code, table index).
+_DEFAULT_MAX_BYTES = 64 << 20
+_BYTES_PER_PIXEL = 32
+
+
+def downscale(image: Image.Image, size: int, mode: str = "nearest") -> Image.Image:
+    """Downscale to a square target size (see :class:`Downscale` for the modes)."""
+    if mode == "nearest":
+        return image.resize((size, size), Image.Resampling.NEAREST)
+    return to_image(Downscale(size, mode).load(image))
+
+
+def quantize_palette(
+    image: ImageSource,
+    palette: Palette,
+    *,
+    indexed: bool = False,
+    dither: str | None = None,
+) -> Image.Image:
+    """Snap every pixel to the nearest color in the palette (RGB Euclidean distance).
+
+    With ``indexed``, returns a "P" mode image whose color table is the palette.
+    ``dither`` is one of ``_dither.DITHER_MODES`` or None for hard snapping.
+    """
+    if indexed:
+        return to_indexed_image(index_array(image, palette, dither=dither), palette)
+    return Image.fromarray(quantize_array(image, palette, dither=dither), "RGB")
+
+
+def quantize_array(
+    source: ImageSource,
+    palette: Palette,
+    *,
+    out: NDArray[np.uint8] | None = None,
+    max_bytes: int = _DEFAULT_MAX_BYTES,
+    dither: str | None = None,
+) -> NDArray[np.uint8]:
+    """Quantize an image to the palette in row bands, writing into an (H, W, 3) uint8 array.
+
+    Each band is converted to RGB, looked up and written on its own, so working
+    memory stays under roughly ``max_bytes`` regardless of image size. ``out`` may be
+    a preallocated C-contiguous array to fill; one is allocated when omitted. Dithering
+    patterns and diffused error carry across band boundaries.
+    """
+    return _quantize_bands(
+        source, palette, indexed=False, out=out, max_bytes=max_bytes, dither=dither
+    )
+
+
+def index_array(
+    source: ImageSource,
+    palette: Palette,
+    *,
+    out: NDArray[np.uint8] | None = None,
+    max_bytes: int = _DEFAULT_MAX_BYTES,
+    dither: str | None = None,
+) -> NDArray[np.uint8]:
+    """Like :func:`quantize_array`, but writes (H, W) uint8 palette indices."""
+    if len(palette.colors) > 256:
+        n = len(palette.colors)
+        msg = f"indexed output supports at most 256 colors, {palette.name!r} has {n}"
+        raise PaletteError(msg)
+    return _quantize_bands(
+        source, palette, indexed=True, out=out, max_bytes=max_bytes, dither=dither
+    )
+
+
+def to_indexed_image(indices: NDArray[np.uint8], palette: Palette) -> Image.Image:
+    """Wrap (H, W) palette indices in a "P" mode image carrying the palette's colors."""
+    img = Image.fromarray(indices, "P")
+    img.putpalette(palette.as_array().tobytes(), "RGB")
+    return img
+
+
+def _quantize_bands(
+    source: ImageSource,
+    palette: Palette,
+    *,
+    indexed: bool,
+    out: NDArray[np.uint8] | None,
+    max_bytes: int,
+    dither: str | None,
+) -> NDArray[np.uint8]:
+    check_dither(dither)
+    if isinstance(source, (str, os.PathLike)):
+        with Image.open(source) as img:
+            return _quantize_bands(
+                img, palette, indexed=indexed, out=out, max_bytes=max_bytes, dither=dither
+            )
+
+    if isinstance(source, Image.Image):
+        width, height = source.size
+    else:
+        source = _as_rgb_array(source)
+        height, width = source.shape[:2]
+
+    shape = (height, width) if indexed else (height, width, 3)
+    if out is None:
+        out = np.empty(shape, dtype=np.uint8)
+    elif out.shape != shape or out.dtype != np.uint8 or not out.flags.c_contiguous:
+        msg = f"out must be a C-contiguous {shape} uint8 array"
+        raise ValueError(msg)
+
+    colors = palette.as_array()
+    # Chosen once for the whole image, so every band uses the same search structure.
+    strategy = palette.nearest_strategy(height * width)
+    rows = max(1, max_bytes // (max(1, width) * _BYTES_PER_PIXEL))
+    carry = None  # Floyd–Steinberg error flowing into the next band
+    for top in range(0, height, rows):
+        bottom = min(top + rows, height)
+        if isinstance(source, Image.Image):
+            band = np.asarray(source.crop((0, top, width, bottom)).convert("RGB"))
+        else:
+            band = source[top:bottom]
+        if dither is None:
+            nearest = palette.nearest_indices(band, strategy=strategy)
+        elif dither == "floyd_steinberg":
+            nearest, carry = floyd_steinberg(band, palette, strategy, carry)
+        else:
+            nearest = ordered_dither(band, top, palette, dither, strategy)
+        if indexed:
+            out[top:bottom] = nearest
+        else:
+            np.take(colors, nearest, axis=0, out=out[top:bottom])
+    return out
+
+
+def _as_rgb_array(arr: NDArray) -> NDArray[np.uint8]:
+    """View an (H, W), (H, W, 3) or (H, W, 4) uint8 array as RGB, like ``convert("RGB")``."""
+    if arr.dtype != np.uint8:
+        msg = f"expected a uint8 image array, got {arr.dtype}"
+        raise ValueError(msg)
+    return _rgb_view(arr)
+
+
+def _rgb_view(arr: NDArray) -> NDArray:
+    if arr.ndim == 2:
+        return np.broadcast_to(arr[:, :, None], (*arr.shape, 3))
+    if arr.ndim == 3 and arr.shape[2] in (3, 4):
+        return arr[:, :, :3]
+    msg = f"expected an (H, W), (H, W, 3) or (H, W, 4) array, got shape {arr.shape}"
+    raise ValueError(msg)
+
+
+def _float_to_uint8(arr: NDArray[np.floating]) -> NDArray[np.uint8]:
+    """Scale [0, 1] floats to uint8 the way diffusers' ``numpy_to_pil`` does.
+
+    Rescales ``arr`` in place, so pass a buffer the caller owns.
+    """
+    np.multiply(arr, 255, out=arr)
+    np.rint(arr, out=arr)
+    np.clip(arr, 0, 255, out=arr)
+    return arr.astype(np.uint8)
+
+
+@dataclass(slots=True)
+class StageStats:
+    """Buffers allocated by one :func:`run_stages` call, as ``(stage name, bytes)``."""
+
+    allocations: list[tuple[str, int]] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.allocations)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(n for _, n in self.allocations)
+
+
+class Stage(Protocol):
+    """One post-processing step over an (H, W, 3) RGB or (H, W) index buffer.
+
+    ``apply`` may write into ``buf`` only when ``owned`` is true; otherwise the
+    buffer belongs to the caller and the stage must return a new one.
+    """
+
+    name: ClassVar[str]
+
+    def apply(self, buf: NDArray[np.uint8], owned: bool) -> NDArray[np.uint8]: ...
+
+
+@dataclass(frozen=True, slots=True)
+class Downscale:
+    """Resample to ``size`` x ``size``.
+
+    ``mode`` "nearest" is identical to PIL's NEAREST and, as the first stage, reads
+    only the kept pixels of a float render. "center", "mode" and "median" reduce
+    whole blocks of pixels instead (see ``_downscale.block_reduce``).
+    """
+
+    size: int
+    mode: str = "nearest"
+    name: ClassVar[str] = "downscale"
+
+    def __post_init__(self) -> None:
+        check_downscale_mode(self.mode)
+
+    def load(self, source: RenderSource) -> NDArray[np.uint8]:
+        if isinstance(source, (str, os.PathLike)):
+            with Image.open(source) as img:
+                return self.load(img)
+        if isinstance(source, Image.Image):
+            if self.mode != "nearest":
+                return block_reduce(np.asarray(source.convert("RGB")), self.size, self.mode)
+            small = source.resize((self.size, self.size), Image.Resampling.NEAREST)
+            return np.array(small.convert("RGB"))
+        is_float = np.issubdtype(source.dtype, np.floating)
+        arr = _rgb_view(source) if is_float else _as_rgb_array(source)
+        if self.mode != "nearest":
+            # Block reducers read every pixel, so a float render is converted in full.
+            rgb = _float_to_uint8(arr.astype(np.float32)) if is_float else arr
+            return block_reduce(rgb, self.size, self.mode)
+        rows = nearest_rows(arr.shape[0], self.size)
+        cols = nearest_rows(arr.shape[1], self.size)
+        picked = arr[rows[:, None], cols[None, :]]
+        return _float_to_uint8(picked) if is_float else picked
+
+    def apply(self, buf: NDArray[np.uint8], owned: bool) -> NDArray[np.uint8]:
+        return self.load(buf)
+
+
+@dataclass(frozen=True, slots=True)
+class Quantize:
+    """Snap to the palette, optionally dithered, in place on an owned RGB buffer.
+
+    With ``indexed``, produces an (H, W) buffer of palette indices instead.
+    """
+
+    palette: Palette
+    dither: str | None = None
+    indexed: bool = False
+    name: ClassVar[str] = "quantize"
+
+    def apply(self, buf: NDArray[np.uint8], owned: bool) -> NDArray[np.uint8]:
+        if self.indexed:
+            return index_array(buf, self.palette, dither=self.dither)
+        writable = owned and buf.ndim == 3 and buf.shape[2] == 3 and buf.flags.c_contiguous
+        return quantize_array(buf, self.palette, out=buf if writable else None, dither=self.dither)
+
+
+@dataclass(frozen=True, slots=True)
+class Outline:
+    """Paint background pixels that touch the sprite (4-neighborhood) with ``color``.
+
+    ``color`` is an RGB triple for RGB buffers or a palette index for indexed ones.
+    The background is ``background`` if given, otherwise the top-left pixel's value.
+    """
+
+    color: int | tuple[int, int, int]
+    background: int | tuple[int, int, int] | None = None
+    name: ClassVar[str] = "outline"
+
+    def apply(self, buf: NDArray[np.uint8], owned: bool) -> NDArray[np.uint8]:
+        if isinstance(self.color, int) != (buf.ndim == 2):
+            kind = "a palette index" if buf.ndim == 2 else "an RGB triple"
+            msg = f"outline color for a {buf.shape} buffer must be {kind}, got {self.color!r}"
+            raise ValueError(msg)
+        if not owned:
+            buf = buf.copy()
+        bg = buf[0, 0] if self.background is None else np.asarray(self.background, np.uint8)
+        is_bg = buf == bg
+        if buf.ndim == 3:
+            is_bg = is_bg.all(axis=2)
+        sprite = ~is_bg
+        edge = np.zeros_like(sprite)
+        edge[1:] |= sprite[:-1]
+        edge[:-1] |= sprite[1:]
+        edge[:, 1:] |= sprite[:, :-1]
+        edge[:, :-1] |= sprite[:, 1:]
+        buf[edge & is_bg] = self.color
+        return buf
+
+
+@dataclass(frozen=True, slots=True)
+class Upscale:
+    """Integer nearest-neighbor upscale, e.g. to view a 64 px preview at 8x."""
+
+    factor: int
+    name: ClassVar[str] = "upscale"
+
+    def apply(self, buf: NDArray[np.uint8], owned: bool) -> NDArray[np.uint8]:
+        if self.factor == 1:
+            return buf
+        height, width = buf.shape[:2]
+        f = self.factor
+        out = np.empty((height * f, width * f, *buf.shape[2:]), dtype=np.uint8)
+        # One write through a 4-D view of the output broadcasts each pixel to its block.
+        out.reshape(height, f, width, f, *buf.shape[2:])[...] = buf[:, None, :, None]
+        return out
+
+
+def run_stages(
+    source: RenderSource, stages: Iterable[Stage], *, stats: StageStats | None = None
+) -> NDArray[np.uint8]:
+    """Run ``stages`` over a source image and return the final uint8 buffer.
+
+    A leading :class:`Downscale` reads ``source`` directly. Otherwise PIL images, paths
+    and float arrays are loaded into a new buffer, while uint8 arrays are passed on
+    as-is and copied only by a stage that needs to write. Each buffer a stage
+    allocates is recorded in ``stats``.
+    """
+    stages = list(stages)
+    if stages and isinstance(stages[0], Downscale):
+        buf, owned = stages.pop(0).load(source), True
+        _record(stats, "downscale", buf)
+    elif isinstance(source, np.ndarray) and source.dtype == np.uint8:
+        buf, owned = source, False
+    else:
+        buf, owned = _load_buffer(source), True
+        _record(stats, "load", buf)
+
+    for stage in stages:
+        out = stage.apply(buf, owned)
+        if out is not buf:
+            owned = True
+            _record(stats, stage.name, out)
+        buf = out
+    return buf
+
+
+def _record(stats: StageStats | None, name: str, buf: NDArray[np.uint8]) -> None:
+    if stats is not None:
+        stats.allocations.append((name, buf.nbytes))
+
+
+def _load_buffer(source: RenderSource) -> NDArray[np.uint8]:
+    """A new C-contiguous (H, W, 3) uint8 buffer holding ``source``."""
+    if isinstance(source, (str, os.PathLike)):
+        with Image.open(source) as img:
+            return _load_buffer(img)
+    if isinstance(source, Image.Image):
+        return np.array(source.convert("RGB"))
+    return _float_to_uint8(_rgb_view(source).astype(np.float32))
 
 
-def downscale(image: Image.Image, size: int) -> Image.Image:
-    """Nearest-neighbor downscale to a square target size."""
-    return image.resize((size, size), Image.Resampling.NEAREST)
+def to_image(buf: NDArray[np.uint8], palette: Palette | None = None) -> Image.Image:
+    """Wrap a stage buffer as a PIL image: "P" mode for index buffers, else RGB."""
+    if buf.ndim == 2 and palette is not None:
+        return to_indexed_image(buf, palette)
+    return Image.fromarray(buf, "L" if buf.ndim == 2 else "RGB")
 
 
-def quantize_palette(image: Image.Image, palette: Palette) -> Image.Image:
-    """Snap every pixel to the nearest color in the palette (RGB Euclidean distance)."""
-    arr = np.array(image.convert("RGB"), dtype=np.float32)  # (H, W, 3)
-    h, w, _ = arr.shape
-    pixels = arr.reshape(-1, 3)  # (H*W, 3)
+def finalize(
+    raw: RenderSource,
+    size: int,
+    palette: Palette | None,
+    *,
+    indexed: bool = False,
+    dither: str | None = None,
+    downscale_mode: str = "nearest",
+) -> Image.Image:
+    """Turn a raw render into a sprite: downscale, then quantize if a palette is given.
 
-    pal = palette.as_array().astype(np.float32)  # (N, 3)
+    ``raw`` may be a PIL image or the float array diffusers returns with
+    ``output_type="np"``. ``indexed`` returns quantized sprites as "P" mode images;
+    unquantized stay RGB.
+    """
+    stages: list[Stage] = [Downscale(size, downscale_mode)]
+    if palette is not None:
+        stages.append(Quantize(palette, dither, indexed))
+    return to_image(run_stages(raw, stages), palette)
 
-    # Vectorized nearest-color: broadcast distance computation
-    # pixels[:, None, :] is (H*W, 1, 3), pal[None, :, :] is (1, N, 3)
-    diffs = pixels[:, None, :] - pal[None, :, :]  # (H*W, N, 3)
-    dists = np.sum(diffs**2, axis=2)  # (H*W, N)
-    nearest = np.argmin(dists, axis=1)  # (H*W,)
 
-    result = pal[nearest].reshape(h, w, 3).astype(np.uint8)
-    return Image.fromarray(result, "RGB")
+def finalize_many(
+    raw: RenderSource,
+    outputs: Sequence[tuple[int, Palette | None]],
+    *,
+    indexed: bool = False,
+    dither: str | None = None,
+    downscale_mode: str = "nearest",
+) -> list[Image.Image]:
+    """Finalize one raw render at several (size, palette) pairs, downscaling once per size."""
+    scaled: dict[int, NDArray[np.uint8]] = {}
+    results = []
+    for size, palette in outputs:
+        if size not in scaled:
+            scaled[size] = run_stages(raw, [Downscale(size, downscale_mode)])
+        # The downscaled buffer is shared between palettes, so quantizing copies it.
+        buf = scaled[size]
+        if palette is not None:
+            buf = run_stages(buf, [Quantize(palette, dither, indexed)])
+        results.append(to_image(buf, palette))
+    return results
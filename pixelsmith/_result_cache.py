@@ -0,0 +1,196 @@
+"""Content-addressed on-disk cache of raw renders and finished sprites."""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import fields
+from pathlib import Path
+
+from PIL import Image
+
+from pixelsmith._config import GenerationConfig
+from pixelsmith._palettes import Palette
+from pixelsmith._singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Bump when anything that affects cached pixels changes outside the hashed inputs.
+_FORMAT_VERSION = 1
+
+# Config fields that cannot change the rendered pixels. Attention backend, slicing,
+# tiling, memory format and offload settings all stay keyed: they change float
+# rounding in the UNet and VAE, which can still flip palette indices. So does
+# lora_snapshot, whose fused weights are stored in the pipeline dtype.
+_OUTPUT_NEUTRAL_FIELDS = frozenset(
+    {
+        "cache_dir",
+        "num_threads",
+        "result_cache",
+        "result_cache_max_bytes",
+    }
+)
+
+# Temp files older than this were left behind by a crashed writer.
+_STALE_TMP_SECONDS = 3600
+
+
+def _digest(payload: dict) -> str:
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def raw_key(prompt: str, *, negative_prompt: str, seed: int, config: GenerationConfig) -> str:
+    """Stable hash of every input that affects the raw diffusion render."""
+    render_config = {
+        f.name: getattr(config, f.name)
+        for f in fields(config)
+        if f.name not in _OUTPUT_NEUTRAL_FIELDS
+    }
+    return _digest(
+        {
+            "version": _FORMAT_VERSION,
+            "prompt": prompt,
+            "negative_prompt": negative_prompt,
+            "seed": seed,
+            "config": render_config,
+        }
+    )
+
+
+def sprite_key(
+    raw: str,
+    *,
+    size: int,
+    palette: Palette | None,
+    indexed: bool = False,
+    dither: str | None = None,
+    downscale_mode: str = "nearest",
+) -> str:
+    """Stable hash of a raw render key plus the post-processing applied to it."""
+    colors = None if palette is None else [list(c) for c in palette.colors]
+    return _digest(
+        {
+            "version": _FORMAT_VERSION,
+            "raw": raw,
+            "size": size,
+            "palette": colors,
+            "indexed": indexed and palette is not None,
+            "dither": None if palette is None else dither,
+            "downscale": downscale_mode,
+        }
+    )
+
+
+class ResultCache:
+    """PNG files under ``root`` named by content key, evicted least recently used first.
+
+    Writes go to a temp file in the destination directory and are renamed into place,
+    so concurrent processes sharing the directory only ever see complete files. Reads
+    refresh the file's mtime, which is the LRU clock. Within one process, concurrent
+    :meth:`get_or_create` calls for the same key run the computation once.
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._flight: SingleFlight[Image.Image] = SingleFlight()
+        self._evict_lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.png"
+
+    def get(self, key: str) -> Image.Image | None:
+        """Return the cached image for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with Image.open(path) as img:
+                img.load()
+                result = img.copy()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except OSError:
+            logger.warning("Discarding unreadable cache entry %s", path)
+            with contextlib.suppress(OSError):
+                path.unlink()
+            return None
+        return result
+
+    def put(self, key: str, image: Image.Image) -> None:
+        """Atomically store image under key, then evict down to the size budget."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                image.save(f, format="PNG")
+            os.replace(tmp, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+            raise
+        self.evict()
+
+    def get_or_create(self, key: str, create: Callable[[], Image.Image]) -> Image.Image:
+        """Return the cached image for key, computing and storing it on a miss."""
+
+        def load_or_compute() -> Image.Image:
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+            image = create()
+            try:
+                self.put(key, image)
+            except OSError as exc:
+                logger.warning("Could not write result cache entry: %s", exc)
+            return image
+
+        return self._flight.do(key, load_or_compute)
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        with self._evict_lock:
+            entries = []
+            now = time.time()
+            for path in self.root.glob("*/*"):
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue  # removed by another process
+                if path.suffix == ".tmp":
+                    if now - st.st_mtime > _STALE_TMP_SECONDS:
+                        with contextlib.suppress(OSError):
+                            path.unlink()
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                with contextlib.suppress(FileNotFoundError):
+                    path.unlink()
+                total -= size
+
+
+_caches: dict[Path, ResultCache] = {}
+_caches_lock = threading.Lock()
+
+
+def result_cache_for(config: GenerationConfig) -> ResultCache:
+    """The process-wide ResultCache for config's cache directory."""
+    root = Path(config.cache_dir) / "results"
+    with _caches_lock:
+        cache = _caches.get(root)
+        if cache is None:
+            cache = _caches[root] = ResultCache(root, config.result_cache_max_bytes)
+        cache.max_bytes = config.result_cache_max_bytes
+        return cache
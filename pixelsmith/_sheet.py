@@ -0,0 +1,141 @@
+"""Sprite-sheet assembly: many frames post-processed into one preallocated atlas."""
+
+from __future__ import annotations
+
+import math
+import secrets
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+from pixelsmith._palettes import Palette
+from pixelsmith._postprocess import Downscale, RenderSource, index_array, quantize_array
+
+
+def sheet_plan(
+    prompts: str | Sequence[str],
+    *,
+    frames: int | None,
+    cols: int | None,
+    seed: int | None,
+    shared_seed: bool,
+) -> tuple[list[str], list[int], int]:
+    """(prompt per frame, seed per frame, cols) for a sheet request.
+
+    A single prompt string is repeated ``frames`` times (default 1); a sequence gives
+    one prompt per frame, and ``frames``, if passed, must match its length.
+    """
+    if isinstance(prompts, str):
+        prompts = [prompts] * (frames or 1)
+    elif frames is not None and frames != len(prompts):
+        msg = f"got {len(prompts)} prompts but frames={frames}"
+        raise ValueError(msg)
+    prompts = list(prompts)
+    _, cols = sheet_grid(len(prompts), cols)
+    return prompts, sheet_seeds(len(prompts), seed, shared=shared_seed), cols
+
+
+def sheet_seeds(n_frames: int, seed: int | None, *, shared: bool) -> list[int]:
+    """One seed per frame: ``seed`` for every frame, or ``seed + i`` for frame i.
+
+    Without a seed a random base is drawn, so the manifest still records seeds that
+    reproduce every frame.
+    """
+    base = secrets.randbelow(2**31) if seed is None else seed
+    return [base] * n_frames if shared else [base + i for i in range(n_frames)]
+
+
+def sheet_grid(n_frames: int, cols: int | None) -> tuple[int, int]:
+    """(rows, cols) of the atlas; ``cols`` defaults to a near-square layout."""
+    if n_frames < 1:
+        msg = "a sheet needs at least one frame"
+        raise ValueError(msg)
+    if cols is None:
+        cols = math.ceil(math.sqrt(n_frames))
+    elif cols < 1:
+        msg = f"cols must be at least 1, got {cols}"
+        raise ValueError(msg)
+    cols = min(cols, n_frames)
+    return math.ceil(n_frames / cols), cols
+
+
+def build_sheet(
+    raws: Sequence[RenderSource],
+    size: int,
+    palette: Palette | None,
+    *,
+    cols: int,
+    indexed: bool = False,
+    dither: str | None = None,
+    downscale_mode: str = "nearest",
+) -> NDArray[np.uint8]:
+    """Downscale every frame into its cell of one atlas buffer, then quantize it whole.
+
+    Returns an (rows * size, cols * size, 3) RGB atlas, or (rows * size, cols * size)
+    palette indices when ``indexed``. Cells past the last frame are black before
+    quantization. Error diffusion runs per cell, so one frame's error never bleeds
+    into its neighbors.
+    """
+    rows = math.ceil(len(raws) / cols)
+    atlas = np.zeros((rows * size, cols * size, 3), dtype=np.uint8)
+    downscale = Downscale(size, downscale_mode)
+    for i, raw in enumerate(raws):
+        atlas[_cell(i, cols, size)] = downscale.load(raw)
+
+    if palette is None:
+        return atlas
+    if dither != "floyd_steinberg":
+        # One pass over the whole sheet: one search strategy, one distinct-color scan.
+        if indexed:
+            return index_array(atlas, palette, dither=dither)
+        return quantize_array(atlas, palette, out=atlas, dither=dither)
+
+    out = np.zeros(atlas.shape[:2], dtype=np.uint8) if indexed else atlas
+    for i in range(rows * cols):
+        cell = _cell(i, cols, size)
+        tile = np.ascontiguousarray(atlas[cell])
+        if indexed:
+            out[cell] = index_array(tile, palette, dither=dither)
+        else:
+            out[cell] = quantize_array(tile, palette, out=tile, dither=dither)
+    return out
+
+
+def _cell(i: int, cols: int, size: int) -> tuple[slice, slice]:
+    top, left = (i // cols) * size, (i % cols) * size
+    return slice(top, top + size), slice(left, left + size)
+
+
+def sheet_manifest(
+    prompts: Sequence[str],
+    seeds: Sequence[int],
+    *,
+    size: int,
+    cols: int,
+    palette: Palette | None,
+) -> dict[str, Any]:
+    """JSON-serializable frame coordinates, in the order frames were given."""
+    rows = math.ceil(len(prompts) / cols)
+    frames = [
+        {
+            "index": i,
+            "prompt": prompt,
+            "seed": seed,
+            "x": (i % cols) * size,
+            "y": (i // cols) * size,
+            "w": size,
+            "h": size,
+        }
+        for i, (prompt, seed) in enumerate(zip(prompts, seeds, strict=True))
+    ]
+    return {
+        "width": cols * size,
+        "height": rows * size,
+        "cols": cols,
+        "rows": rows,
+        "frame_size": size,
+        "palette": None if palette is None else palette.name,
+        "frames": frames,
+    }
@@ -0,0 +1,209 @@
+"""Fused-LoRA snapshots: SDXL weights with the pixel-art LoRA baked in, as safetensors.
+
+A snapshot holds the state dicts of the components the LoRA patches (the UNet and,
+when the LoRA has text-encoder weights, the text encoders) after fusing it at one
+weight. Loading a snapshot skips both the base weights of those components and the
+LoRA load and fuse.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from pixelsmith._config import PipelineKey
+
+logger = logging.getLogger(__name__)
+
+# Bump when the snapshot layout or the way weights are fused changes.
+_FORMAT_VERSION = 1
+
+# SDXL components a LoRA can patch
+COMPONENTS = ("unet", "text_encoder", "text_encoder_2")
+
+_MANIFEST = "manifest.json"
+
+
+def source_fingerprint(source: str, cache_dir: str) -> str | None:
+    """Identify the exact weights behind a model path or hub id, without network access.
+
+    Local files and directories are fingerprinted by relative path, size and mtime;
+    hub repos by the commit the local Hugging Face cache resolved ``main`` to. None
+    when the weights have not been downloaded yet.
+    """
+    path = Path(source).expanduser()
+    if path.exists():
+        files = [path] if path.is_file() else sorted(p for p in path.rglob("*") if p.is_file())
+        digest = hashlib.sha256()
+        for f in files:
+            st = f.stat()
+            name = f.name if f == path else f.relative_to(path).as_posix()
+            digest.update(f"{name}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+        return digest.hexdigest()
+    ref = Path(cache_dir) / f"models--{source.replace('/', '--')}" / "refs" / "main"
+    try:
+        return ref.read_text().strip()
+    except OSError:
+        return None
+
+
+def snapshot_id(key: PipelineKey) -> str | None:
+    """Digest of every input that determines the fused weights; None if any is unknown."""
+    if key.lora_weight is None:
+        return None
+    base = source_fingerprint(key.base_model, key.cache_dir)
+    lora = source_fingerprint(key.lora_repo, key.cache_dir)
+    if base is None or lora is None:
+        return None
+    payload = {
+        "format": _FORMAT_VERSION,
+        "base_model": key.base_model,
+        "base": base,
+        "lora_repo": key.lora_repo,
+        "lora": lora,
+        "lora_weight": key.lora_weight,
+        "dtype": key.dtype,
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+
+def snapshot_dir(key: PipelineKey, sid: str) -> Path:
+    return Path(key.cache_dir) / "snapshots" / sid
+
+
+def find_snapshot(key: PipelineKey) -> dict[str, Path] | None:
+    """Component files of the valid snapshot for key, or None.
+
+    A snapshot whose manifest, file sizes or embedded ids do not check out is
+    deleted, so the next load rebuilds it.
+    """
+    sid = snapshot_id(key)
+    if sid is None:
+        return None
+    directory = snapshot_dir(key, sid)
+    try:
+        manifest = json.loads((directory / _MANIFEST).read_text())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        manifest = None
+    files = _verify(directory, manifest, sid)
+    if files is None:
+        logger.warning("Discarding invalid LoRA snapshot %s", directory)
+        shutil.rmtree(directory, ignore_errors=True)
+    return files
+
+
+def _verify(directory: Path, manifest: Any, sid: str) -> dict[str, Path] | None:
+    if not isinstance(manifest, dict):
+        return None
+    if manifest.get("format") != _FORMAT_VERSION or manifest.get("id") != sid:
+        return None
+    files = {}
+    for name, info in manifest.get("components", {}).items():
+        path = directory / f"{name}.safetensors"
+        if name not in COMPONENTS or not path.is_file():
+            return None
+        if path.stat().st_size != info.get("bytes") or _header_id(path) != sid:
+            return None
+        files[name] = path
+    return files or None
+
+
+def _header_id(path: Path) -> str | None:
+    """The snapshot id in a safetensors file's header metadata."""
+    # Layout: 8-byte little-endian header length, then the JSON header.
+    try:
+        with open(path, "rb") as f:
+            size = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(size))
+        return header.get("__metadata__", {}).get("snapshot")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def save_snapshot(pipe: Any, key: PipelineKey, components: Iterable[str]) -> Path | None:
+    """Write the named components of a pipeline with its LoRA fused in.
+
+    Files are written to a temporary directory that is renamed into place once the
+    manifest is complete, so a crashed or concurrent writer never leaves a snapshot
+    that validates. Returns the snapshot directory, or None when the inputs cannot
+    be fingerprinted.
+    """
+    from safetensors.torch import save_file
+
+    sid = snapshot_id(key)
+    if sid is None:
+        return None
+    directory = snapshot_dir(key, sid)
+    tmp = directory.with_name(f"{sid}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    try:
+        written = {}
+        for name in components:
+            state = {
+                k: v.detach().contiguous() for k, v in getattr(pipe, name).state_dict().items()
+            }
+            path = tmp / f"{name}.safetensors"
+            save_file(state, path, metadata={"snapshot": sid, "component": name})
+            written[name] = {"bytes": path.stat().st_size, "tensors": len(state)}
+        manifest = {
+            "format": _FORMAT_VERSION,
+            "id": sid,
+            "base_model": key.base_model,
+            "lora_repo": key.lora_repo,
+            "lora_weight": key.lora_weight,
+            "dtype": key.dtype,
+            "components": written,
+        }
+        (tmp / _MANIFEST).write_text(json.dumps(manifest, indent=2))
+        try:
+            os.replace(tmp, directory)
+        except OSError:
+            # Another process published the same snapshot first.
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    logger.info("Saved fused LoRA snapshot %s", directory)
+    return directory
+
+
+def load_components(key: PipelineKey, files: dict[str, Path], dtype: Any) -> dict[str, Any]:
+    """Build each snapshot component from its base config and the snapshot weights.
+
+    Modules are created with empty weights and take over the tensors read from the
+    memory-mapped safetensors files, so the base checkpoint's weights for these
+    components are never read.
+    """
+    from accelerate import init_empty_weights
+    from diffusers import UNet2DConditionModel
+    from safetensors.torch import load_file
+    from transformers import CLIPTextConfig, CLIPTextModel, CLIPTextModelWithProjection
+
+    modules = {}
+    for name, path in files.items():
+        if name == "unet":
+            config = UNet2DConditionModel.load_config(
+                key.base_model, subfolder=name, cache_dir=key.cache_dir
+            )
+            with init_empty_weights():
+                module = UNet2DConditionModel.from_config(config)
+        else:
+            cls = CLIPTextModel if name == "text_encoder" else CLIPTextModelWithProjection
+            config = CLIPTextConfig.from_pretrained(
+                key.base_model, subfolder=name, cache_dir=key.cache_dir
+            )
+            with init_empty_weights():
+                module = cls(config)
+        module.load_state_dict(load_file(path), strict=True, assign=True)
+        modules[name] = module.to(dtype).eval()
+    return modules
@@ -0,0 +1,318 @@
+"""Asyncio front end that batches generation requests onto one GPU worker thread."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from pixelsmith._config import GenerationConfig
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+    from pixelsmith._palettes import Palette
+
+logger = logging.getLogger(__name__)
+
+# runner(prompts, *, negative_prompt, seeds, config) -> raw renders, in order: PIL
+# images or float arrays in [0, 1]
+BatchRunner = Callable[..., Sequence[Any]]
+
+
+def _default_runner(
+    prompts: list[str],
+    *,
+    negative_prompt: str,
+    seeds: list[int | None],
+    config: GenerationConfig,
+) -> list[Any]:
+    from pixelsmith._pipeline import run_pipeline_batch
+
+    # Raw float arrays go straight into the post-processing stages, skipping PIL.
+    return run_pipeline_batch(
+        prompts, negative_prompt=negative_prompt, seeds=seeds, config=config, output_type="np"
+    )
+
+
+@dataclass(slots=True)
+class _Request:
+    prompt: str
+    negative_prompt: str
+    seed: int | None
+    # (size, palette) sprites to derive, or None for the raw render itself
+    outputs: list[tuple[int, Palette | None]] | None
+    indexed: bool  # quantized sprites as "P" mode images
+    dither: str | None
+    downscale_mode: str
+    config: GenerationConfig
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future[list[Image.Image]]
+    enqueued_at: float
+
+    @property
+    def batch_key(self) -> tuple[GenerationConfig, str]:
+        # Equal configs share load-time settings, render size and sampling parameters.
+        return self.config, self.negative_prompt
+
+
+@dataclass(slots=True)
+class _Stats:
+    requests: int = 0
+    batches: int = 0
+    batch_sizes: Counter[int] = field(default_factory=Counter)
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+
+class GenerationQueue:
+    """Queue of generate requests drained by a dedicated worker thread.
+
+    The worker takes the oldest request, keeps collecting for ``batch_window``
+    seconds (or until ``max_batch_size`` requests are waiting), then runs each group
+    of compatible requests as one batched diffusion call and resolves the callers'
+    futures on their event loops. ``on_submit`` is called as each request arrives.
+    """
+
+    def __init__(
+        self,
+        runner: BatchRunner | None = None,
+        *,
+        batch_window: float = 0.05,
+        max_batch_size: int = 8,
+        clock: Callable[[], float] = time.monotonic,
+        on_submit: Callable[[], None] | None = None,
+    ) -> None:
+        self._runner = runner or _default_runner
+        self._on_submit = on_submit
+        self._batch_window = batch_window
+        self._max_batch_size = max_batch_size
+        self._clock = clock
+        self._queue: queue.Queue[_Request | None] = queue.Queue()
+        self._stats = _Stats()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+
+    async def submit(
+        self,
+        prompt: str,
+        *,
+        negative_prompt: str,
+        size: int = 64,
+        palette: str | Palette | None = None,
+        seed: int | None = None,
+        config: GenerationConfig | None = None,
+        indexed: bool = False,
+        dither: str | None = None,
+        downscale_mode: str = "nearest",
+    ) -> Image.Image:
+        """Enqueue one generate request and wait for its sprite."""
+        images = await self.submit_variants(
+            prompt,
+            negative_prompt=negative_prompt,
+            outputs=[(size, palette)],
+            seed=seed,
+            config=config,
+            indexed=indexed,
+            dither=dither,
+            downscale_mode=downscale_mode,
+        )
+        return images[0]
+
+    async def submit_variants(
+        self,
+        prompt: str,
+        *,
+        negative_prompt: str,
+        outputs: Sequence[tuple[int, str | Palette | None]],
+        seed: int | None = None,
+        config: GenerationConfig | None = None,
+        indexed: bool = False,
+        dither: str | None = None,
+        downscale_mode: str = "nearest",
+    ) -> list[Image.Image]:
+        """Enqueue one render and wait for a sprite per ``(size, palette)`` output."""
+        from pixelsmith._dither import check_dither
+        from pixelsmith._downscale import check_downscale_mode
+        from pixelsmith._palettes import resolve_palette
+
+        loop = asyncio.get_running_loop()
+        request = _Request(
+            prompt=prompt,
+            negative_prompt=negative_prompt,
+            seed=seed,
+            outputs=[(size, resolve_palette(pal)) for size, pal in outputs],
+            indexed=indexed,
+            dither=check_dither(dither),
+            downscale_mode=check_downscale_mode(downscale_mode),
+            config=config or GenerationConfig(),
+            loop=loop,
+            future=loop.create_future(),
+            enqueued_at=self._clock(),
+        )
+        self._enqueue([request])
+        return await request.future
+
+    async def submit_frames(
+        self,
+        prompts: Sequence[str],
+        *,
+        negative_prompt: str,
+        seeds: Sequence[int | None],
+        config: GenerationConfig | None = None,
+    ) -> list[Any]:
+        """Enqueue one request per frame and wait for every raw render, in order.
+
+        The frames are queued together, so the worker batches them like concurrent
+        clients; post-processing is left to the caller (e.g. to pack a sprite sheet).
+        """
+        loop = asyncio.get_running_loop()
+        config = config or GenerationConfig()
+        requests = [
+            _Request(
+                prompt=prompt,
+                negative_prompt=negative_prompt,
+                seed=seed,
+                outputs=None,
+                indexed=False,
+                dither=None,
+                downscale_mode="nearest",
+                config=config,
+                loop=loop,
+                future=loop.create_future(),
+                enqueued_at=self._clock(),
+            )
+            for prompt, seed in zip(prompts, seeds, strict=True)
+        ]
+        self._enqueue(requests)
+        results = await asyncio.gather(*(r.future for r in requests))
+        return [raw for (raw,) in results]
+
+    def stats(self) -> dict[str, Any]:
+        """Queue depth, batch-size histogram and queue wait times (seconds)."""
+        with self._lock:
+            s = self._stats
+            return {
+                "queue_depth": self._queue.qsize(),
+                "requests": s.requests,
+                "batches": s.batches,
+                "batch_size_histogram": dict(sorted(s.batch_sizes.items())),
+                "mean_wait_s": s.total_wait / s.requests if s.requests else 0.0,
+                "max_wait_s": s.max_wait,
+            }
+
+    def close(self) -> None:
+        """Stop the worker after the requests already queued have been served."""
+        worker = self._worker
+        if worker is not None:
+            self._queue.put(None)
+            worker.join()
+            self._worker = None
+
+    def _enqueue(self, requests: list[_Request]) -> None:
+        if self._on_submit is not None:
+            self._on_submit()
+        self._ensure_worker()
+        for request in requests:
+            self._queue.put(request)
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._work, name="pixelsmith-gpu", daemon=True
+                )
+                self._worker.start()
+
+    def _work(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            pending, stop = self._collect(first)
+            groups: dict[tuple[GenerationConfig, str], list[_Request]] = {}
+            for request in pending:
+                groups.setdefault(request.batch_key, []).append(request)
+            for group in groups.values():
+                for start in range(0, len(group), self._max_batch_size):
+                    self._run(group[start : start + self._max_batch_size])
+            if stop:
+                return
+
+    def _collect(self, first: _Request) -> tuple[list[_Request], bool]:
+        """Gather requests arriving within the batching window after ``first``."""
+        pending = [first]
+        deadline = time.monotonic() + self._batch_window
+        while len(pending) < self._max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                return pending, True
+            pending.append(request)
+        return pending, False
+
+    def _run(self, batch: list[_Request]) -> None:
+        from pixelsmith._postprocess import finalize_many
+
+        started = self._clock()
+        with self._lock:
+            s = self._stats
+            s.batches += 1
+            s.batch_sizes[len(batch)] += 1
+            for request in batch:
+                wait = started - request.enqueued_at
+                s.requests += 1
+                s.total_wait += wait
+                s.max_wait = max(s.max_wait, wait)
+
+        head = batch[0]
+        try:
+            raws = self._runner(
+                [r.prompt for r in batch],
+                negative_prompt=head.negative_prompt,
+                seeds=[r.seed for r in batch],
+                config=head.config,
+            )
+            results = [
+                [raw]
+                if r.outputs is None
+                else finalize_many(
+                    raw,
+                    r.outputs,
+                    indexed=r.indexed,
+                    dither=r.dither,
+                    downscale_mode=r.downscale_mode,
+                )
+                for raw, r in zip(raws, batch, strict=True)
+            ]
+        except Exception as exc:
+            logger.exception("Batch of %d generation requests failed", len(batch))
+            for request in batch:
+                request.loop.call_soon_threadsafe(_resolve, request.future, None, exc)
+            return
+        for request, images in zip(batch, results, strict=True):
+            request.loop.call_soon_threadsafe(_resolve, request.future, images, None)
+
+
+def _resolve(
+    future: asyncio.Future[list[Image.Image]],
+    result: list[Image.Image] | None,
+    exc: BaseException | None,
+) -> None:
+    if future.done():  # caller went away (cancelled)
+        return
+    if exc is not None:
+        future.set_exception(exc)
+    else:
+        future.set_result(result)  # type: ignore[arg-type]
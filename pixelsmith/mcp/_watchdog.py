@@ -0,0 +1,382 @@
+"""Idle auto-unload, memory-pressure watchdog and prewarm for the server's pipeline."""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import replace
+from datetime import datetime, timedelta
+from datetime import time as dtime
+from typing import Any
+
+from pixelsmith import _pipeline
+from pixelsmith._config import GenerationConfig
+from pixelsmith.mcp._queue import BatchRunner
+
+logger = logging.getLogger(__name__)
+
+# Fraction of host and device memory in use, None where it cannot be measured
+MemoryProbe = Callable[[], dict[str, float | None]]
+
+_MAX_EVENTS = 32
+
+
+def memory_usage() -> dict[str, float | None]:
+    """Fraction of host RAM and CUDA memory in use.
+
+    Device memory is only probed when torch is already imported, so an idle server
+    never pays for the import just to learn that nothing is loaded.
+    """
+    return {"host": _host_usage(), "device": _device_usage()}
+
+
+def _host_usage() -> float | None:
+    try:
+        with open("/proc/meminfo") as f:
+            info = {line.split(":")[0]: int(line.split()[1]) for line in f}
+        return 1 - info["MemAvailable"] / info["MemTotal"]
+    except (OSError, KeyError, ValueError, IndexError):
+        return None
+
+
+def _device_usage() -> float | None:
+    torch = sys.modules.get("torch")
+    if torch is None or not torch.cuda.is_available():
+        return None
+    free, total = torch.cuda.mem_get_info()
+    return 1 - free / total
+
+
+def parse_prewarm(spec: str) -> tuple[bool, list[dtime]]:
+    """Parse a prewarm spec such as ``"request,09:00,13:30"``.
+
+    Returns whether to prewarm on the first request after an unload, and the daily
+    local times at which to prewarm.
+    """
+    on_request, times = False, []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        if part == "request":
+            on_request = True
+            continue
+        try:
+            times.append(dtime.fromisoformat(part))
+        except ValueError:
+            msg = f"Unknown prewarm trigger {part!r}. Expected 'request' or HH:MM"
+            raise ValueError(msg) from None
+    return on_request, times
+
+
+class PipelineWatchdog:
+    """Keeps the generation pipeline resident only while it earns its memory.
+
+    Each :meth:`tick`:
+
+    - under memory pressure (host or device usage at or above ``memory_threshold``),
+      drops cached prompt embeddings and all but the most recent pipeline, then
+      unloads everything if usage is still over the threshold;
+    - unloads the pipeline once nothing has run for ``idle_timeout`` seconds;
+    - prewarms (reloads in the background) at each daily ``prewarm_at`` time.
+
+    With ``prewarm_on_request`` the first request queued after an unload starts the
+    reload immediately. Batches wait for a prewarm in flight (including its warm-up
+    inference) instead of racing it, and nothing is unloaded while a batch is
+    running.
+
+    :meth:`start` runs ticks every ``interval`` seconds on a daemon thread; tests
+    call :meth:`tick` directly with a fake ``clock`` and ``now``.
+    """
+
+    def __init__(
+        self,
+        *,
+        idle_timeout: float | None = None,
+        memory_threshold: float | None = None,
+        prewarm_on_request: bool = False,
+        prewarm_at: Sequence[dtime] = (),
+        config: GenerationConfig | None = None,
+        interval: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+        now: Callable[[], datetime] = datetime.now,
+        memory_probe: MemoryProbe = memory_usage,
+    ) -> None:
+        if memory_threshold is not None and not 0 < memory_threshold <= 1:
+            msg = f"memory_threshold must be in (0, 1], got {memory_threshold}"
+            raise ValueError(msg)
+        self.idle_timeout = idle_timeout
+        self.memory_threshold = memory_threshold
+        self.prewarm_on_request = prewarm_on_request
+        self.prewarm_at = list(prewarm_at)
+        self._config = config or GenerationConfig()
+        self._interval = interval
+        self._clock = clock
+        self._now = now
+        self._probe = memory_probe
+
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._last_active = clock()
+        self._last_tick = now()
+        self._events: deque[dict[str, Any]] = deque(maxlen=_MAX_EVENTS)
+        self._counts: Counter[str] = Counter()
+        self._prewarm: threading.Thread | None = None
+        # Progress of the latest prewarm: state, reason, start/end clock and error
+        self._state = "cold"
+        self._reason: str | None = None
+        self._started: float | None = None
+        self._finished: float | None = None
+        self._error: str | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def from_env(cls, **kwargs: Any) -> PipelineWatchdog:
+        """Configure from environment variables.
+
+        ``PIXELSMITH_IDLE_TIMEOUT`` is in seconds, ``PIXELSMITH_MEMORY_THRESHOLD`` is
+        the fraction of memory in use, and ``PIXELSMITH_PREWARM`` is as for
+        :func:`parse_prewarm`. Unset variables leave that feature off.
+        """
+        idle = os.environ.get("PIXELSMITH_IDLE_TIMEOUT")
+        threshold = os.environ.get("PIXELSMITH_MEMORY_THRESHOLD")
+        on_request, times = parse_prewarm(os.environ.get("PIXELSMITH_PREWARM", ""))
+        return cls(
+            idle_timeout=float(idle) if idle else None,
+            memory_threshold=float(threshold) if threshold else None,
+            prewarm_on_request=on_request,
+            prewarm_at=times,
+            **kwargs,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(
+            self.idle_timeout is not None or self.memory_threshold is not None or self.prewarm_at
+        )
+
+    def wrap(self, runner: BatchRunner) -> BatchRunner:
+        """A runner that waits out any prewarm, then runs ``runner`` marked busy."""
+
+        def run(*args: Any, **kwargs: Any) -> Sequence[Any]:
+            self.wait_ready()
+            with self.active():
+                return runner(*args, **kwargs)
+
+        return run
+
+    @contextmanager
+    def active(self) -> Iterator[None]:
+        """Mark the pipeline in use: no unloads until the block exits."""
+        # Taking the lock waits out an unload already in progress.
+        with self._lock:
+            self._busy += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._busy -= 1
+                self._last_active = self._clock()
+
+    def on_request(self) -> None:
+        """Note a queued request, prewarming if enabled and nothing is loaded."""
+        with self._lock:
+            self._last_active = self._clock()
+        if self.prewarm_on_request and not _resident():
+            self.prewarm("request")
+
+    def prewarm(self, reason: str, *, warmup: bool = False) -> bool:
+        """Load the pipeline on a background thread; False if a prewarm is running.
+
+        With ``warmup`` a one-step throwaway inference follows the load, so kernel
+        selection and allocator growth happen before the first real request.
+        """
+        with self._lock:
+            if self._prewarm is not None and self._prewarm.is_alive():
+                return False
+            self._record("prewarm", reason)
+            self._state, self._reason, self._error = "loading", reason, None
+            self._started, self._finished = self._clock(), None
+            self._prewarm = threading.Thread(
+                target=self._load, args=(warmup,), name="pixelsmith-prewarm", daemon=True
+            )
+            self._prewarm.start()
+        return True
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Block until any prewarm in flight has finished; False on timeout."""
+        thread = self._prewarm
+        if thread is None or thread is threading.current_thread():
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def readiness(self) -> dict[str, Any]:
+        """Load state of the pipeline and how long the latest prewarm took (or has run).
+
+        ``state`` is "cold" (not loaded), "loading", "warming" (throwaway inference),
+        "ready" or "failed" (``error`` says why).
+        """
+        resident = _resident()
+        with self._lock:
+            state = self._state
+            if state in ("cold", "failed") and resident:
+                state = "ready"  # loaded by a request since
+            elif state == "ready" and not resident:
+                state = "cold"  # unloaded since
+            elapsed = None
+            if self._started is not None:
+                elapsed = (self._finished or self._clock()) - self._started
+            return {
+                "state": state,
+                "ready": state == "ready",
+                "resident": resident,
+                "reason": self._reason,
+                "elapsed_s": elapsed,
+                "error": self._error,
+            }
+
+    def tick(self) -> None:
+        """Run one round of pressure, idle and schedule checks."""
+        self._check_pressure()
+        self._check_idle()
+        self._check_schedule()
+
+    def start(self) -> None:
+        """Run :meth:`tick` every ``interval`` seconds on a daemon thread."""
+        if self._thread is not None or not self.enabled:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="pixelsmith-watchdog", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stop the watchdog thread and wait for any prewarm to finish."""
+        self._stop.set()
+        for thread in (self._thread, self._prewarm):
+            if thread is not None:
+                thread.join()
+        self._thread = None
+
+    def stats(self) -> dict[str, Any]:
+        """Residency, settings, memory usage, event counts and recent events."""
+        cache = _pipeline.pipeline_cache_stats()
+        memory = self._probe()
+        with self._lock:
+            return {
+                "resident": cache.entries > 0,
+                "pipelines": cache.entries,
+                "host_bytes": cache.host_bytes,
+                "device_bytes": cache.device_bytes,
+                "busy": self._busy > 0,
+                "idle_s": self._clock() - self._last_active,
+                "prewarming": self._prewarm is not None and self._prewarm.is_alive(),
+                "memory_usage": memory,
+                "idle_timeout_s": self.idle_timeout,
+                "memory_threshold": self.memory_threshold,
+                "prewarm_on_request": self.prewarm_on_request,
+                "prewarm_at": [t.isoformat("minutes") for t in self.prewarm_at],
+                "event_counts": dict(self._counts),
+                "events": list(self._events),
+            }
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("Pipeline watchdog check failed")
+
+    def _load(self, warmup: bool) -> None:
+        try:
+            _pipeline._load_pipeline(self._config)
+            if warmup:
+                with self._lock:
+                    self._state = "warming"
+                _warmup(self._config)
+        except Exception as exc:
+            logger.exception("Pipeline prewarm failed")
+            state, error = "failed", str(exc)
+        else:
+            state, error = "ready", None
+        with self._lock:
+            self._state, self._error = state, error
+            # A fresh load counts as activity, so the idle timer starts now.
+            self._finished = self._last_active = self._clock()
+
+    def _pressure(self) -> list[str]:
+        """Memory kinds at or above the threshold."""
+        if self.memory_threshold is None:
+            return []
+        usage = self._probe()
+        return [
+            kind
+            for kind, used in usage.items()
+            if used is not None and used >= self.memory_threshold
+        ]
+
+    def _check_pressure(self) -> None:
+        over = self._pressure()
+        # Usage held by someone else: nothing here to free, so nothing to do or log.
+        if not over or not _reclaimable():
+            return
+        _pipeline.shrink_caches()
+        with self._lock:
+            self._record("shrink", "+".join(over))
+        over = self._pressure()
+        with self._lock:
+            if over and not self._busy and _resident():
+                _pipeline.unload_pipeline()
+                self._record("pressure_unload", "+".join(over))
+
+    def _check_idle(self) -> None:
+        if self.idle_timeout is None:
+            return
+        with self._lock:
+            idle = self._clock() - self._last_active
+            if idle >= self.idle_timeout and not self._busy and _resident():
+                _pipeline.unload_pipeline()
+                self._record("idle_unload", f"idle {idle:.0f}s")
+
+    def _check_schedule(self) -> None:
+        now = self._now()
+        last, self._last_tick = self._last_tick, now
+        for at in self.prewarm_at:
+            # The most recent occurrence of this daily time, at or before now.
+            due = datetime.combine(now.date(), at, tzinfo=now.tzinfo)
+            if due > now:
+                due -= timedelta(days=1)
+            if last < due and not self._pressure() and not _resident():
+                self.prewarm(f"schedule {at.isoformat('minutes')}")
+
+    def _record(self, event: str, detail: str) -> None:
+        """Log and remember an event; the caller holds the lock."""
+        logger.info("Pipeline watchdog: %s (%s)", event, detail)
+        self._counts[event] += 1
+        self._events.append({"event": event, "detail": detail, "at": self._now().isoformat()})
+
+
+def _warmup(config: GenerationConfig) -> None:
+    """One-step render at the configured size, discarded; warms kernels and caches."""
+    from pixelsmith import _DEFAULT_NEGATIVE
+
+    _pipeline.run_pipeline(
+        "pixel art",
+        negative_prompt=_DEFAULT_NEGATIVE,
+        seed=0,
+        config=replace(config, num_inference_steps=1),
+        output_type="np",
+    )
+
+
+def _resident() -> bool:
+    return _pipeline.pipeline_cache_stats().entries > 0
+
+
+def _reclaimable() -> bool:
+    """Whether a shrink or unload could free anything: a pipeline or cached embeddings."""
+    return _resident() or _pipeline.embedding_cache_stats().entries > 0
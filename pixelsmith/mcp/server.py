@@ -2,20 +2,42 @@
 
 from __future__ import annotations
 
+import argparse
+import asyncio
 import io
+import json
+import os
+from collections.abc import Sequence
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 from fastmcp import FastMCP
 from fastmcp.utilities.types import Image as MCPImage
 
+from pixelsmith.mcp._queue import GenerationQueue, _default_runner
+from pixelsmith.mcp._watchdog import PipelineWatchdog
+
+if TYPE_CHECKING:
+    from PIL import Image
+
 mcp = FastMCP("pixelsmith")
 
+# Every generate request goes through one queue so concurrent clients are batched
+# onto a single GPU worker instead of racing on the shared pipeline.
+# The watchdog unloads the pipeline when idle or under memory pressure and can
+# prewarm it (see PipelineWatchdog.from_env for the environment variables).
+_watchdog = PipelineWatchdog.from_env()
+_queue = GenerationQueue(_watchdog.wrap(_default_runner), on_submit=_watchdog.on_request)
 
-def _generate_pixel_art(
+
+async def _generate_pixel_art(
     prompt: str,
     size: int = 64,
     palette: str | None = None,
     seed: int | None = None,
+    preview: bool = False,
+    dither: str | None = None,
+    downscale_mode: str = "nearest",
 ) -> MCPImage:
     """Generate pixel art from a text prompt.
 
@@ -24,16 +46,145 @@ def _generate_pixel_art(
         size: Output pixel dimensions (square). Default 64.
         palette: Optional retro palette: "nes", "gameboy", "pico8", "c64".
         seed: Optional seed for reproducibility.
+        preview: Fast low-fidelity draft for iterating on a prompt. Default false.
+        dither: Optional dithering when a palette is given: "bayer2", "bayer4",
+            "bayer8" or "floyd_steinberg".
+        downscale_mode: "nearest" (default), or "center", "mode" (dominant color) or
+            "median" per block for cleaner sprites with fewer stray pixels.
 
     Returns:
         Generated pixel art as a PNG image.
     """
-    from pixelsmith import generate
+    from pixelsmith import _DEFAULT_NEGATIVE, GenerationConfig
+
+    img = await _queue.submit(
+        prompt,
+        negative_prompt=_DEFAULT_NEGATIVE,
+        size=size,
+        palette=palette,
+        seed=seed,
+        config=GenerationConfig().as_preview() if preview else None,
+        indexed=True,
+        dither=dither,
+        downscale_mode=downscale_mode,
+    )
+    return _to_png(img)
+
+
+async def _generate_pixel_art_variants(
+    prompt: str,
+    sizes: list[int],
+    palettes: list[str | None] | None = None,
+    seed: int | None = None,
+    dither: str | None = None,
+    downscale_mode: str = "nearest",
+) -> list[MCPImage]:
+    """Generate pixel art once and return it at several sizes and palettes.
+
+    Args:
+        prompt: Description of the pixel art to generate.
+        sizes: Output pixel dimensions (square), e.g. [32, 64, 128].
+        palettes: Retro palettes ("nes", "gameboy", "pico8", "c64"; null = unquantized).
+            Default: unquantized only.
+        seed: Optional seed for reproducibility.
+        dither: Optional dithering for quantized outputs: "bayer2", "bayer4", "bayer8"
+            or "floyd_steinberg".
+        downscale_mode: "nearest" (default), "center", "mode" or "median".
+
+    Returns:
+        One PNG per combination, ordered by size, then palette.
+    """
+    from pixelsmith import _DEFAULT_NEGATIVE
+
+    outputs = [(size, pal) for size in sizes for pal in (palettes or [None])]
+    images = await _queue.submit_variants(
+        prompt,
+        negative_prompt=_DEFAULT_NEGATIVE,
+        outputs=outputs,
+        seed=seed,
+        indexed=True,
+        dither=dither,
+        downscale_mode=downscale_mode,
+    )
+    return [_to_png(img) for img in images]
+
+
+async def _generate_sprite_sheet(
+    prompts: str | list[str],
+    frames: int | None = None,
+    cols: int | None = None,
+    size: int = 64,
+    palette: str | None = None,
+    seed: int | None = None,
+    shared_seed: bool = False,
+    preview: bool = False,
+    dither: str | None = None,
+    downscale_mode: str = "nearest",
+) -> list[MCPImage | str]:
+    """Generate a sprite sheet (item set or animation frames) as one atlas image.
+
+    Args:
+        prompts: A list with one prompt per frame, or a single prompt string repeated
+            ``frames`` times.
+        frames: Number of frames for a single prompt string; with a list it must
+            match the list's length.
+        cols: Frames per atlas row. Default: a near-square grid.
+        size: Frame pixel dimensions (square). Default 64.
+        palette: Optional retro palette for the whole sheet: "nes", "gameboy", "pico8", "c64".
+        seed: Base seed; frame i uses seed + i. Default: random (recorded in the manifest).
+        shared_seed: Use the same seed for every frame, for consistent animation frames.
+        preview: Fast low-fidelity drafts. Default false.
+        dither: Optional dithering: "bayer2", "bayer4", "bayer8" or "floyd_steinberg".
+        downscale_mode: "nearest" (default), "center", "mode" or "median".
+
+    Returns:
+        The sheet as a PNG, then a JSON manifest of each frame's prompt, seed and
+        x/y/w/h in the sheet.
+    """
+    from pixelsmith import _DEFAULT_NEGATIVE, GenerationConfig
+    from pixelsmith._dither import check_dither
+    from pixelsmith._downscale import check_downscale_mode
+    from pixelsmith._palettes import resolve_palette
+    from pixelsmith._postprocess import to_image
+    from pixelsmith._sheet import build_sheet, sheet_manifest, sheet_plan
+
+    resolved = resolve_palette(palette)
+    check_dither(dither)
+    check_downscale_mode(downscale_mode)
+    prompts, seeds, cols = sheet_plan(
+        prompts, frames=frames, cols=cols, seed=seed, shared_seed=shared_seed
+    )
+
+    raws = await _queue.submit_frames(
+        prompts,
+        negative_prompt=_DEFAULT_NEGATIVE,
+        seeds=seeds,
+        config=GenerationConfig().as_preview() if preview else None,
+    )
+    # Packing and quantizing the sheet is CPU work; keep it off the event loop.
+    atlas = await asyncio.to_thread(
+        build_sheet,
+        raws,
+        size,
+        resolved,
+        cols=cols,
+        indexed=True,
+        dither=dither,
+        downscale_mode=downscale_mode,
+    )
+    manifest = sheet_manifest(prompts, seeds, size=size, cols=cols, palette=resolved)
+    return [_to_png(to_image(atlas, resolved)), json.dumps(manifest)]
 
-    img = generate(prompt, size=size, palette=palette, seed=seed)
 
+def _to_png(img: Image.Image) -> MCPImage:
+    """Encode as PNG; palette images are written at the smallest bit depth that fits."""
     buf = io.BytesIO()
-    img.save(buf, format="PNG")
+    if img.mode == "P":
+        colors = len(img.getpalette() or ()) // 3
+        bits = next(b for b in (1, 2, 4, 8) if colors <= 1 << b)
+        img.save(buf, format="PNG", optimize=True, bits=bits)
+    else:
+        img.save(buf, format="PNG")
     return MCPImage(data=buf.getvalue(), format="png")
 
 
@@ -41,6 +192,8 @@ def _quantize_to_palette(
     image_path: str,
     palette: str,
     size: int | None = None,
+    dither: str | None = None,
+    downscale_mode: str = "nearest",
 ) -> MCPImage:
     """Quantize an existing image to a retro color palette.
 
@@ -48,6 +201,8 @@ def _quantize_to_palette(
         image_path: Path to the source image file.
         palette: Retro palette name: "nes", "gameboy", "pico8", "c64".
         size: Optional target size to downscale to.
+        dither: Optional dithering: "bayer2", "bayer4", "bayer8" or "floyd_steinberg".
+        downscale_mode: With size: "nearest" (default), "center", "mode" or "median".
 
     Returns:
         Quantized image as a PNG.
@@ -56,23 +211,81 @@ def _quantize_to_palette(
 
     from pixelsmith import downscale, quantize_palette
 
-    img = Image.open(Path(image_path))
+    if size is None:
+        # Quantized straight from the file in row bands, so huge sheets stay in budget.
+        return _to_png(quantize_palette(Path(image_path), palette, indexed=True, dither=dither))
 
-    if size is not None:
-        img = downscale(img, size)
+    with Image.open(Path(image_path)) as img:
+        small = downscale(img, size, downscale_mode)
+    return _to_png(quantize_palette(small, palette, indexed=True, dither=dither))
 
-    result = quantize_palette(img, palette)
 
-    buf = io.BytesIO()
-    result.save(buf, format="PNG")
-    return MCPImage(data=buf.getvalue(), format="png")
+def _generation_queue_stats() -> dict[str, Any]:
+    """Report the generation queue: depth, batch-size histogram and wait times.
+
+    Returns:
+        Queue depth, request and batch counts, a histogram of batch sizes, and the
+        mean and max seconds requests waited before their batch started.
+    """
+    return _queue.stats()
+
+
+def _pipeline_residency() -> dict[str, Any]:
+    """Report whether the diffusion pipeline is loaded and what the watchdog has done.
+
+    Returns:
+        Residency (loaded pipelines and their host/device bytes), busy/idle time,
+        memory usage, the idle-unload, memory and prewarm settings, event counts
+        and the most recent unload/shrink/prewarm events.
+    """
+    return _watchdog.stats()
+
+
+def _pipeline_readiness() -> dict[str, Any]:
+    """Report whether the diffusion pipeline is loaded and ready for requests.
+
+    Returns:
+        ``state`` ("cold", "loading", "warming", "ready" or "failed"), whether it is
+        resident, what started the latest load, how long that load took or has been
+        running (seconds), and the error if it failed.
+    """
+    return _watchdog.readiness()
 
 
 # Register tools with MCP server (names without underscore prefix)
 mcp.tool(name="generate_pixel_art")(_generate_pixel_art)
+mcp.tool(name="generate_pixel_art_variants")(_generate_pixel_art_variants)
+mcp.tool(name="generate_sprite_sheet")(_generate_sprite_sheet)
 mcp.tool(name="quantize_to_palette")(_quantize_to_palette)
+mcp.tool(name="generation_queue_stats")(_generation_queue_stats)
+mcp.tool(name="pipeline_residency")(_pipeline_residency)
+mcp.tool(name="pipeline_readiness")(_pipeline_readiness)
+
+
+def _parse_args(argv: Sequence[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="pixelsmith-mcp", description="Pixel art MCP server.")
+    preload = os.environ.get("PIXELSMITH_PRELOAD", "").strip().lower()
+    parser.add_argument(
+        "--preload",
+        action="store_true",
+        default=preload in ("1", "true", "yes", "warmup"),
+        help="load the pipeline in the background at startup (env: PIXELSMITH_PRELOAD=1)",
+    )
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        default=preload == "warmup",
+        help="also run a throwaway one-step render after preloading, implies --preload "
+        "(env: PIXELSMITH_PRELOAD=warmup)",
+    )
+    return parser.parse_args(argv)
 
 
-def run() -> None:
+def run(argv: Sequence[str] | None = None) -> None:
     """Entry point for the pixelsmith-mcp console script."""
+    args = _parse_args(argv)
+    if args.preload or args.warmup:
+        # Requests arriving meanwhile wait on this load instead of starting another.
+        _watchdog.prewarm("startup", warmup=args.warmup)
+    _watchdog.start()
     mcp.run()
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import io
 import tempfile
 from pathlib import Path
 
@@ -56,6 +57,20 @@ class TestQuantizeToPalette:
             )
             assert result.data is not None
 
+    def test_emits_low_bit_depth_indexed_png(self):
+        from pixelsmith.mcp.server import _quantize_to_palette
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            img_path = Path(tmpdir) / "test.png"
+            _make_test_image(img_path)
+
+            for palette, bits in (("gameboy", 2), ("pico8", 4), ("c64", 4), ("nes", 8)):
+                data = _quantize_to_palette(image_path=str(img_path), palette=palette).data
+                assert data[25] == 3  # IHDR color type: palette
+                assert data[24] == bits  # IHDR bit depth
+                with Image.open(io.BytesIO(data)) as png:
+                    assert png.mode == "P"
+
 
 @pytest.mark.skipif(not HAS_CUDA, reason="CUDA GPU required")
 class TestGeneratePixelArt:
@@ -66,10 +81,11 @@ class TestGeneratePixelArt:
 
         unload_pipeline()
 
-    def test_generate_returns_image(self):
+    @pytest.mark.asyncio
+    async def test_generate_returns_image(self):
         from pixelsmith.mcp.server import _generate_pixel_art
 
-        result = _generate_pixel_art(prompt="a tiny red gem", size=32, seed=42)
+        result = await _generate_pixel_art(prompt="a tiny red gem", size=32, seed=42)
         assert result.data is not None
         assert len(result.data) > 100  # Non-trivial PNG
 
@@ -91,3 +107,51 @@ class TestMCPServerDefinition:
         from pixelsmith.mcp.server import _quantize_to_palette
 
         assert callable(_quantize_to_palette)
+
+    def test_variants_tool_callable(self):
+        from pixelsmith.mcp.server import _generate_pixel_art_variants
+
+        assert callable(_generate_pixel_art_variants)
+
+    def test_sprite_sheet_tool_callable(self):
+        from pixelsmith.mcp.server import _generate_sprite_sheet
+
+        assert callable(_generate_sprite_sheet)
+
+    @pytest.mark.asyncio
+    async def test_sprite_sheet_rejects_frames_mismatch(self):
+        from pixelsmith.mcp.server import _generate_sprite_sheet
+
+        # Same rule as pixelsmith.generate_sheet; rejected before anything is queued.
+        with pytest.raises(ValueError, match="frames=4"):
+            await _generate_sprite_sheet(prompts=["idle", "walk"], frames=4)
+
+    def test_queue_stats_tool(self):
+        from pixelsmith.mcp.server import _generation_queue_stats
+
+        stats = _generation_queue_stats()
+        assert stats["queue_depth"] == 0
+        assert "batch_size_histogram" in stats
+
+    def test_pipeline_readiness_tool(self):
+        from pixelsmith.mcp.server import _pipeline_readiness
+
+        assert _pipeline_readiness()["state"] in ("cold", "ready")
+
+    def test_preload_options(self, monkeypatch: pytest.MonkeyPatch):
+        from pixelsmith.mcp.server import _parse_args
+
+        monkeypatch.delenv("PIXELSMITH_PRELOAD", raising=False)
+        assert not _parse_args([]).preload
+        assert _parse_args(["--preload"]).preload
+        monkeypatch.setenv("PIXELSMITH_PRELOAD", "warmup")
+        args = _parse_args([])
+        assert args.preload
+        assert args.warmup
+
+    def test_pipeline_residency_tool(self):
+        from pixelsmith.mcp.server import _pipeline_residency
+
+        stats = _pipeline_residency()
+        assert stats["busy"] is False
+        assert "events" in stats
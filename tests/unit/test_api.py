@@ -0,0 +1,134 @@
+"""Tests for the top-level generation API with the diffusion pipeline stubbed out."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import pixelsmith
+from pixelsmith import GAMEBOY
+
+
+@pytest.fixture
+def batch_calls(monkeypatch: pytest.MonkeyPatch) -> list:
+    """Stub run_pipeline_batch to return flat-colored 256px renders."""
+    calls: list = []
+
+    def fake_batch(
+        prompts, *, negative_prompt, seeds, config, max_batch_size=None, output_type="pil"
+    ):
+        calls.append((prompts, seeds, max_batch_size))
+        return [Image.new("RGB", (256, 256), (i * 40, 200, 10)) for i in range(len(prompts))]
+
+    monkeypatch.setattr(pixelsmith, "run_pipeline_batch", fake_batch)
+    return calls
+
+
+class TestGenerateBatch:
+    def test_postprocesses_every_item(self, batch_calls: list):
+        images = pixelsmith.generate_batch(["a", "b", "c"], size=16, palette="gameboy")
+        assert [img.size for img in images] == [(16, 16)] * 3
+        colors = {tuple(c) for img in images for c in np.array(img).reshape(-1, 3)}
+        assert colors <= set(GAMEBOY.colors)
+        assert batch_calls[0][1] == [None, None, None]
+
+    def test_single_prompt_fans_out_over_seeds(self, batch_calls: list):
+        images = pixelsmith.generate_batch("a knight", seeds=[1, 2, 3, 4], max_batch_size=2)
+        assert len(images) == 4
+        assert batch_calls == [(["a knight"] * 4, [1, 2, 3, 4], 2)]
+
+    def test_mismatched_seeds_raise(self, batch_calls: list):
+        with pytest.raises(ValueError, match="2 prompts but 3 seeds"):
+            pixelsmith.generate_batch(["a", "b"], seeds=[1, 2, 3])
+
+
+class TestGenerateVariants:
+    def test_one_render_many_outputs(self, monkeypatch: pytest.MonkeyPatch):
+        renders: list = []
+
+        def fake_run(prompt, *, negative_prompt, seed, config, output_type="pil"):
+            renders.append(seed)
+            return Image.new("RGB", (256, 256), (250, 30, 30))
+
+        monkeypatch.setattr(pixelsmith, "run_pipeline", fake_run)
+        variants = pixelsmith.generate_variants(
+            "a potion", sizes=[16, 32], palettes=[None, "gameboy", GAMEBOY], seed=5
+        )
+        assert renders == [5]
+        assert len(variants) == 6
+        assert variants[(32, "gameboy")].size == (32, 32)
+        assert tuple(np.array(variants[(16, None)])[0, 0]) == (250, 30, 30)
+        assert tuple(np.array(variants[(16, GAMEBOY)])[0, 0]) in GAMEBOY.colors
+
+    def test_bad_palette_fails_before_rendering(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(pixelsmith, "run_pipeline", pytest.fail)
+        with pytest.raises(pixelsmith.PaletteError):
+            pixelsmith.generate_variants("a potion", palettes=["amiga"])
+
+
+class TestPreview:
+    def test_generate_preview_uses_preset(self, monkeypatch: pytest.MonkeyPatch):
+        configs: list = []
+
+        def fake_run(prompt, *, negative_prompt, seed, config, output_type="pil"):
+            configs.append(config)
+            return Image.new("RGB", (512, 512), (0, 0, 0))
+
+        monkeypatch.setattr(pixelsmith, "run_pipeline", fake_run)
+        base = pixelsmith.GenerationConfig(device="cpu")
+        pixelsmith.generate("a slime", size=32, config=base, preview=True)
+        pixelsmith.generate("a slime", size=32, config=base)
+        assert configs == [base.as_preview(), base]
+
+
+class TestPostprocess:
+    def test_generate_uses_float_render(self, monkeypatch: pytest.MonkeyPatch):
+        render = np.random.default_rng(0).random((128, 128, 3), dtype=np.float32)
+        output_types: list = []
+
+        def fake_run(prompt, *, negative_prompt, seed, config, output_type="pil"):
+            output_types.append(output_type)
+            return render
+
+        monkeypatch.setattr(pixelsmith, "run_pipeline", fake_run)
+        img = pixelsmith.generate("a bat", size=16, palette="pico8", indexed=True)
+        assert output_types == ["np"]
+        assert img.mode == "P"
+        assert img.size == (16, 16)
+
+    def test_stage_chain(self):
+        raw = np.zeros((64, 64, 3), dtype=np.uint8)
+        raw[24:40, 24:40] = (250, 250, 250)
+        stages = [
+            pixelsmith.Downscale(8),
+            pixelsmith.Quantize(GAMEBOY, indexed=True),
+            pixelsmith.Outline(3),
+            pixelsmith.Upscale(2),
+        ]
+        img = pixelsmith.postprocess(raw, stages)
+        assert img.mode == "P"
+        assert img.size == (16, 16)
+        arr = pixelsmith.postprocess(raw, stages, output_type="np")
+        assert arr.shape == (16, 16)
+        assert np.array_equal(np.array(img), arr)
+
+    def test_unknown_output_type(self):
+        with pytest.raises(ValueError, match="Unknown output_type 'tensor'"):
+            pixelsmith.postprocess(np.zeros((4, 4, 3), np.uint8), [], output_type="tensor")
+
+
+class TestGenerateSheet:
+    def test_atlas_and_manifest(self, batch_calls: list):
+        sheet, manifest = pixelsmith.generate_sheet(["idle", "walk"], frames=None, size=16, seed=3)
+        assert sheet.size == (32, 16)
+        assert batch_calls[0][:2] == (["idle", "walk"], [3, 4])
+        assert [(f["x"], f["y"], f["seed"]) for f in manifest["frames"]] == [(0, 0, 3), (16, 0, 4)]
+
+    def test_repeated_prompt_with_shared_seed(self, batch_calls: list):
+        sheet, manifest = pixelsmith.generate_sheet(
+            "coin", frames=4, cols=4, size=8, seed=9, shared_seed=True, palette="gameboy"
+        )
+        assert sheet.size == (32, 8)
+        assert batch_calls[0][:2] == (["coin"] * 4, [9] * 4)
+        assert manifest["palette"] == "gameboy"
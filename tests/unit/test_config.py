@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import pytest
+
 from pixelsmith._config import GenerationConfig
 
 
@@ -42,3 +44,84 @@ class TestGenerationConfig:
         cfg = GenerationConfig()
         assert cfg.cache_dir  # non-empty string
         assert "pixelsmith" in cfg.cache_dir
+
+    def test_load_key_ignores_sampling_params(self):
+        base = GenerationConfig()
+        tweaked = GenerationConfig(
+            num_inference_steps=8, guidance_scale=3.0, render_size=512, lora_weight=0.6
+        )
+        assert base.load_key() == tweaked.load_key()
+
+    def test_load_key_tracks_load_time_settings(self):
+        assert GenerationConfig().load_key() != GenerationConfig(dtype="float32").load_key()
+        assert GenerationConfig().load_key() != GenerationConfig(lora_repo="x/y").load_key()
+
+    def test_load_key_tracks_lcm_lora(self):
+        lcm = GenerationConfig(lcm_lora_path="/models/lcm")
+        assert lcm.load_key() != GenerationConfig().load_key()
+        assert (
+            lcm.load_key()
+            == GenerationConfig(lcm_lora_path="/models/lcm", scheduler="lcm").load_key()
+        )
+
+
+class TestScheduler:
+    def test_unknown_scheduler_rejected(self):
+        with pytest.raises(ValueError, match="Unknown scheduler"):
+            GenerationConfig(scheduler="ddim2")
+
+    def test_lcm_requires_lora_path(self):
+        with pytest.raises(ValueError, match="lcm_lora_path"):
+            GenerationConfig(scheduler="lcm")
+
+    def test_preview_without_lcm(self):
+        cfg = GenerationConfig().as_preview()
+        assert cfg.scheduler == "dpmpp_2m_karras"
+        assert cfg.render_size == 512
+        assert cfg.num_inference_steps <= 12
+        assert cfg.load_key() == GenerationConfig().load_key()
+
+    def test_preview_with_lcm(self):
+        cfg = GenerationConfig(lcm_lora_path="/models/lcm").as_preview()
+        assert cfg.scheduler == "lcm"
+        assert cfg.num_inference_steps == 4
+        assert cfg.guidance_scale == 1.0
+
+    def test_preview_keeps_smaller_render_size(self):
+        assert GenerationConfig(render_size=256).as_preview().render_size == 256
+
+
+class TestInferenceOptions:
+    def test_defaults(self):
+        cfg = GenerationConfig()
+        assert (cfg.attention, cfg.offload_mode, cfg.attention_slicing) == ("sdpa", "model", None)
+        assert not (cfg.vae_slicing or cfg.vae_tiling or cfg.channels_last)
+
+    @pytest.mark.parametrize(
+        "change",
+        [
+            {"attention": "xformers"},
+            {"offload_mode": "sequential"},
+            {"attention_slicing": "auto"},
+            {"vae_slicing": True},
+            {"vae_tiling": True},
+            {"channels_last": True},
+            {"num_threads": 4},
+        ],
+    )
+    def test_part_of_load_key(self, change: dict):
+        assert GenerationConfig(**change).load_key() != GenerationConfig().load_key()
+
+    @pytest.mark.parametrize(
+        ("change", "match"),
+        [
+            ({"attention": "flash"}, "Unknown attention"),
+            ({"offload_mode": "disk"}, "Unknown offload_mode"),
+            ({"attention_slicing": 0}, "attention_slicing"),
+            ({"attention_slicing": "half"}, "attention_slicing"),
+            ({"num_threads": 0}, "num_threads"),
+        ],
+    )
+    def test_invalid_rejected(self, change: dict, match: str):
+        with pytest.raises(ValueError, match=match):
+            GenerationConfig(**change)
@@ -0,0 +1,102 @@
+"""Tests for ordered and error-diffusion dithering."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from pixelsmith import quantize_palette
+from pixelsmith._dither import bayer_matrix, floyd_steinberg, palette_spread
+from pixelsmith._palettes import GAMEBOY, NES, PICO8, Palette
+from pixelsmith._postprocess import quantize_array
+
+BW = Palette("bw", ((0, 0, 0), (255, 255, 255)))
+
+
+def _gradient(height: int = 16, width: int = 64) -> np.ndarray:
+    ramp = np.linspace(0, 255, width).astype(np.uint8)
+    return np.ascontiguousarray(np.broadcast_to(ramp[None, :, None], (height, width, 3)))
+
+
+def _reference_floyd_steinberg(image: np.ndarray, palette: Palette) -> np.ndarray:
+    """Straightforward per-pixel Floyd–Steinberg with the same rounding rules."""
+    work = image.astype(np.float32)
+    colors = palette.as_array().astype(np.float32)
+    height, width = work.shape[:2]
+    out = np.empty((height, width), dtype=np.intp)
+    for y in range(height):
+        for x in range(width):
+            value = work[y, x].copy()
+            pixel = np.clip(np.rint(value), 0, 255).astype(np.uint8)[None]
+            idx = int(palette.nearest_indices(pixel, strategy="brute")[0])
+            out[y, x] = idx
+            err = value - colors[idx]
+            for dy, dx, weight in ((0, 1, 7), (1, -1, 3), (1, 0, 5), (1, 1, 1)):
+                if 0 <= y + dy < height and 0 <= x + dx < width:
+                    work[y + dy, x + dx] += err * weight / 16
+    return out
+
+
+class TestBayerMatrix:
+    @pytest.mark.parametrize("n", [2, 4, 8])
+    def test_thresholds_are_a_permutation(self, n: int):
+        m = bayer_matrix(n)
+        ranks = np.sort(((m + 0.5) * n * n - 0.5).round().ravel())
+        assert np.array_equal(ranks, np.arange(n * n))
+        assert m.mean() == pytest.approx(0.0)
+
+    def test_two_by_two_order(self):
+        assert np.array_equal(np.argsort(bayer_matrix(2).ravel()), [0, 3, 1, 2])
+
+
+class TestOrderedDither:
+    def test_mixes_neighbouring_colors_on_gradient(self):
+        grad = _gradient()
+        hard = quantize_array(grad, BW)
+        dithered = quantize_array(grad, BW, dither="bayer4")
+
+        # Hard snapping switches once per row; dithering alternates across mid-tones.
+        def transitions(a: np.ndarray) -> int:
+            return int(np.count_nonzero(np.diff(a[..., 0].astype(int), axis=1)))
+
+        assert transitions(hard) == 16
+        assert transitions(dithered) > 4 * transitions(hard)
+        assert set(np.unique(dithered.reshape(-1, 3), axis=0).ravel()) <= {0, 255}
+
+    @pytest.mark.parametrize("mode", ["bayer2", "bayer8", "floyd_steinberg"])
+    def test_bands_tile_seamlessly(self, mode: str):
+        noise = np.random.default_rng(1).integers(0, 256, (21, 17, 3), dtype=np.uint8)
+        whole = quantize_array(noise, PICO8, dither=mode)
+        banded = quantize_array(noise, PICO8, dither=mode, max_bytes=1)
+        assert np.array_equal(whole, banded)
+
+    def test_spread_follows_palette_spacing(self):
+        assert palette_spread(BW) == pytest.approx(255 * np.sqrt(3))
+        assert palette_spread(NES) < palette_spread(GAMEBOY) * 2
+
+
+class TestFloydSteinberg:
+    def test_matches_per_pixel_reference(self):
+        image = np.random.default_rng(2).integers(0, 256, (9, 13, 3), dtype=np.uint8)
+        nearest, _ = floyd_steinberg(image, GAMEBOY, "brute")
+        assert np.array_equal(nearest, _reference_floyd_steinberg(image, GAMEBOY))
+
+    def test_preserves_mean_tone(self):
+        gray = np.full((32, 32, 3), 64, dtype=np.uint8)
+        result = quantize_array(gray, BW, dither="floyd_steinberg")
+        assert result[..., 0].mean() == pytest.approx(64, abs=4)
+        assert quantize_array(gray, BW)[..., 0].mean() == 0
+
+
+class TestDitherOption:
+    def test_indexed_and_dithered(self):
+        img = Image.fromarray(_gradient())
+        result = quantize_palette(img, GAMEBOY, indexed=True, dither="bayer8")
+        rgb = quantize_palette(img, GAMEBOY, dither="bayer8")
+        assert result.mode == "P"
+        assert np.array_equal(np.array(result.convert("RGB")), np.array(rgb))
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError, match="Unknown dither mode"):
+            quantize_palette(Image.new("RGB", (2, 2)), GAMEBOY, dither="atkinson")
@@ -0,0 +1,119 @@
+"""Tests for block-reduction downscale modes."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import pixelsmith
+from pixelsmith._downscale import DOWNSCALE_MODES, block_reduce, nearest_rows
+from pixelsmith._postprocess import Downscale, run_stages
+
+BLOCK_MODES = ("center", "mode", "median")
+
+
+def _noisy_sprite(seed: int = 0, cells: int = 8, k: int = 8) -> tuple[np.ndarray, np.ndarray]:
+    """A (cells * k)² render of flat cells with mild noise and one stray pixel each.
+
+    The stray sits where nearest sampling looks, so only block reductions avoid it.
+    """
+    rng = np.random.default_rng(seed)
+    sprite = rng.integers(0, 256, (cells, cells, 3), dtype=np.uint8)
+    render = sprite.repeat(k, axis=0).repeat(k, axis=1).astype(np.int16)
+    render += rng.integers(-2, 3, render.shape, dtype=np.int16)
+    render = np.clip(render, 0, 255).astype(np.uint8)
+    render[k // 2 :: k, k // 2 :: k] = 255 - sprite  # stray pixel per cell
+    return render, sprite
+
+
+class TestNearestRows:
+    @pytest.mark.parametrize(("n_in", "n_out"), [(64, 63), (1024, 100), (333, 64), (7, 16)])
+    def test_matches_pil(self, n_in, n_out):
+        row = np.arange(n_in, dtype=np.uint8 if n_in < 256 else np.int32)
+        ramp = Image.fromarray(row[None, :].astype(np.int32), "I")
+        expected = np.asarray(ramp.resize((n_out, 1), Image.Resampling.NEAREST))[0]
+        assert np.array_equal(nearest_rows(n_in, n_out), expected)
+
+
+class TestBlockReduce:
+    @pytest.mark.parametrize("mode", ["mode", "median"])
+    def test_recovers_flat_cells(self, mode):
+        render, sprite = _noisy_sprite()
+        out = block_reduce(render, 8, mode)
+        assert np.abs(out.astype(int) - sprite).max() <= 2
+
+    def test_nearest_keeps_stray_pixels(self):
+        render, sprite = _noisy_sprite()
+        out = run_stages(render, [Downscale(8)])
+        assert np.array_equal(out, 255 - sprite)
+
+    def test_mode_ignores_minority_colors(self):
+        block = np.zeros((4, 4, 3), dtype=np.uint8)
+        block[:] = (10, 200, 30)
+        block[0, :3] = (250, 0, 0)  # three red pixels, thirteen green
+        assert tuple(block_reduce(block, 1, "mode")[0, 0]) == (10, 200, 30)
+
+    def test_mode_returns_a_render_color(self):
+        render, _ = _noisy_sprite(seed=3)
+        out = block_reduce(render, 8, "mode")
+        colors = {tuple(c) for c in render.reshape(-1, 3)}
+        assert all(tuple(c) in colors for c in out.reshape(-1, 3))
+
+    def test_median_matches_numpy(self):
+        rng = np.random.default_rng(1)
+        image = rng.integers(0, 256, (48, 48, 3), dtype=np.uint8)
+        blocks = image.reshape(6, 8, 6, 8, 3).transpose(0, 2, 1, 3, 4).reshape(6, 6, 64, 3)
+        expected = np.sort(blocks, axis=2)[:, :, 32]  # upper median of 64 samples
+        assert np.array_equal(block_reduce(image, 6, "median"), expected)
+
+    def test_median_of_even_count_is_upper(self):
+        block = np.array([10, 40, 30, 20], dtype=np.uint8).reshape(2, 2, 1).repeat(3, axis=2)
+        assert tuple(block_reduce(block, 1, "median")[0, 0]) == (30, 30, 30)
+
+    def test_center_of_odd_and_even_blocks(self):
+        image = np.arange(9 * 9 * 3, dtype=np.uint8).reshape(9, 9, 3)
+        assert np.array_equal(block_reduce(image, 3, "center"), image[1::3, 1::3])
+        even = np.zeros((2, 2, 3), dtype=np.uint8)
+        even[0, 0] = 40
+        assert block_reduce(even, 1, "center")[0, 0, 0] == 10
+
+    @pytest.mark.parametrize("mode", BLOCK_MODES)
+    @pytest.mark.parametrize(("shape", "size"), [((100, 333), 64), ((65, 65), 64), ((7, 7), 16)])
+    def test_non_divisible_sizes(self, mode, shape, size):
+        flat = np.full((*shape, 3), (12, 34, 56), dtype=np.uint8)
+        out = block_reduce(flat, size, mode)
+        assert out.shape == (size, size, 3)
+        assert (out == (12, 34, 56)).all()
+
+    def test_huge_blocks_are_sampled(self):
+        image = np.full((2048, 2048, 3), 77, dtype=np.uint8)
+        assert (block_reduce(image, 16, "mode") == 77).all()
+
+
+class TestDownscaleStage:
+    @pytest.mark.parametrize("mode", BLOCK_MODES)
+    def test_float_render_matches_uint8(self, mode):
+        render = np.random.default_rng(2).random((64, 64, 3), dtype=np.float32)
+        as_uint8 = (render * 255).round().astype(np.uint8)
+        from_float = run_stages(render, [Downscale(16, mode)])
+        assert np.array_equal(from_float, run_stages(as_uint8, [Downscale(16, mode)]))
+
+    @pytest.mark.parametrize("mode", DOWNSCALE_MODES)
+    def test_pil_source(self, mode):
+        render, _ = _noisy_sprite()
+        img = Image.fromarray(render)
+        assert np.array_equal(
+            run_stages(img, [Downscale(8, mode)]), run_stages(render, [Downscale(8, mode)])
+        )
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError, match="Unknown downscale mode 'bilinear'"):
+            Downscale(8, "bilinear")
+        with pytest.raises(ValueError, match="Unknown downscale mode"):
+            pixelsmith.generate("a frog", downscale_mode="bilinear")
+
+    def test_public_downscale(self):
+        render, sprite = _noisy_sprite()
+        out = pixelsmith.downscale(Image.fromarray(render), 8, "median")
+        assert np.abs(np.array(out).astype(int) - sprite).max() <= 2
@@ -0,0 +1,94 @@
+"""Tests for adaptive palette extraction."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from pixelsmith import quantize_array
+from pixelsmith._extract import EXTRACT_METHODS, extract_colors
+from pixelsmith._palettes import Palette, resolve_palette
+
+
+def _noise(seed: int = 0, side: int = 64) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, (side, side, 3), dtype=np.uint8)
+
+
+def _two_tone() -> np.ndarray:
+    image = np.zeros((32, 32, 3), dtype=np.uint8)
+    image[:, :16] = (200, 30, 40)
+    image[:, 16:] = (10, 90, 250)
+    return image
+
+
+class TestFromImage:
+    @pytest.mark.parametrize("method", EXTRACT_METHODS)
+    @pytest.mark.parametrize("n_colors", [1, 4, 16, 64])
+    def test_rich_image_fills_the_palette(self, method, n_colors):
+        palette = Palette.from_image(_noise(), n_colors, method)
+        colors = palette.as_array()
+        assert len(colors) <= n_colors
+        assert len(np.unique(colors, axis=0)) == len(colors)
+        assert len(colors) >= max(1, n_colors * 3 // 4)
+
+    @pytest.mark.parametrize("method", EXTRACT_METHODS)
+    def test_flat_regions_recover_exact_colors(self, method):
+        palette = Palette.from_image(_two_tone(), 8, method)
+        assert set(palette.colors) == {(200, 30, 40), (10, 90, 250)}
+
+    @pytest.mark.parametrize("method", EXTRACT_METHODS)
+    def test_most_used_color_first(self, method):
+        image = _two_tone()
+        image[:, 12:16] = (10, 90, 250)
+        assert Palette.from_image(image, 2, method).colors[0] == (10, 90, 250)
+
+    def test_deterministic_for_a_seed(self):
+        image = _noise()
+        assert Palette.from_image(image, 16, seed=3) == Palette.from_image(image, 16, seed=3)
+
+    def test_accepts_pil_and_path(self, tmp_path):
+        image = _two_tone()
+        path = tmp_path / "sprite.png"
+        Image.fromarray(image).save(path)
+        from_array = Palette.from_image(image, 2)
+        assert Palette.from_image(Image.fromarray(image), 2).colors == from_array.colors
+        assert Palette.from_image(path, 2).colors == from_array.colors
+
+    def test_default_name(self):
+        assert Palette.from_image(_two_tone(), 4, "octree").name == "octree4"
+        assert Palette.from_image(_two_tone(), 4, name="hero").name == "hero"
+
+    def test_unknown_method_raises(self):
+        with pytest.raises(ValueError, match="Unknown method 'wu'"):
+            Palette.from_image(_two_tone(), 4, "wu")
+
+    @pytest.mark.parametrize("n_colors", [0, 257])
+    def test_bad_color_count_raises(self, n_colors):
+        with pytest.raises(ValueError, match="n_colors"):
+            Palette.from_image(_two_tone(), n_colors)
+
+    def test_plugs_into_quantization(self):
+        image = _two_tone()
+        palette = Palette.from_image(image, 4)
+        assert resolve_palette(palette) is palette
+        np.testing.assert_array_equal(quantize_array(image, palette), image)
+
+
+class TestFromImages:
+    def test_shared_palette_covers_every_image(self):
+        red = np.full((64, 64, 3), (220, 20, 20), dtype=np.uint8)
+        blue = np.full((8, 8, 3), (20, 20, 220), dtype=np.uint8)
+        palette = Palette.from_images([red, blue], 4)
+        assert set(palette.colors) == {(220, 20, 20), (20, 20, 220)}
+
+    def test_each_image_gets_an_equal_share(self):
+        # Four times the pixels, but both images are sampled down to the same share.
+        big = _noise(1, side=512)
+        flat = np.full((256, 256, 3), (0, 255, 0), dtype=np.uint8)
+        colors = extract_colors([big, flat], 8, "median_cut")
+        assert np.abs(colors[0].astype(int) - (0, 255, 0)).max() <= 4
+
+    def test_empty_batch_raises(self):
+        with pytest.raises(ValueError, match="at least one image"):
+            Palette.from_images([], 4)
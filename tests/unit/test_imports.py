@@ -0,0 +1,63 @@
+"""Tests for import-time cost: heavy dependencies load only when they are used."""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import pytest
+
+# Cumulative microseconds `python -X importtime` may report for `import pixelsmith`.
+# Roughly 4x what it takes on a laptop, so only a real regression (such as NumPy or
+# torch creeping back into the import) trips it.
+_IMPORT_BUDGET_US = 250_000
+
+_HEAVY = ("numpy", "PIL.Image", "torch", "diffusers")
+
+
+def _loaded_after(statement: str) -> list[str]:
+    code = f"import sys; {statement}; print(','.join(m for m in {_HEAVY!r} if m in sys.modules))"
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return [m for m in out.strip().split(",") if m]
+
+
+def _import_time_us(module: str) -> int:
+    """Cumulative import time of module, from ``python -X importtime``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    raise AssertionError(f"{module} not in importtime output")
+
+
+class TestLazyImports:
+    def test_import_pixelsmith_is_light(self):
+        assert _loaded_after("import pixelsmith") == []
+
+    def test_mcp_server_import_is_light(self):
+        pytest.importorskip("fastmcp")
+        assert _loaded_after("import pixelsmith.mcp.server") == []
+
+    def test_palette_access_loads_numpy_only(self):
+        assert _loaded_after("from pixelsmith import GAMEBOY") == ["numpy"]
+
+    def test_lazy_names_resolve(self):
+        import pixelsmith
+
+        for name in pixelsmith.__all__:
+            assert getattr(pixelsmith, name) is not None
+        assert set(pixelsmith.__all__) <= set(dir(pixelsmith))
+        with pytest.raises(AttributeError, match="no attribute 'nope'"):
+            pixelsmith.nope  # noqa: B018
+
+    def test_import_time_budget(self):
+        assert _import_time_us("pixelsmith") < _IMPORT_BUDGET_US
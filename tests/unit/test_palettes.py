@@ -67,3 +67,106 @@ class TestResolvePalette:
     def test_palette_passthrough(self):
         custom = Palette("custom", ((0, 0, 0), (255, 255, 255)))
         assert resolve_palette(custom) is custom
+
+
+class TestLookupTable:
+    def test_compiled_once_and_cached(self):
+        custom = Palette("cached", ((0, 0, 0), (255, 255, 255)))
+        lut = custom.lookup_table()
+        assert lut.shape == (1 << 24,)
+        assert custom.lookup_table() is lut
+
+    def test_cache_does_not_affect_equality(self):
+        a = Palette("same", ((1, 2, 3), (4, 5, 6)))
+        b = Palette("same", ((1, 2, 3), (4, 5, 6)))
+        a.lookup_table()
+        assert a == b
+        assert hash(a) == hash(b)
+
+
+class TestNearestStrategies:
+    @pytest.fixture
+    def big_palette(self) -> Palette:
+        rng = np.random.default_rng(11)
+        colors = rng.integers(0, 256, (250, 3))
+        colors = np.vstack([colors, colors[:6]])  # duplicates must never win
+        return Palette("custom256", tuple(tuple(int(v) for v in c) for c in colors))
+
+    def test_strategies_match_argmin(self, big_palette: Palette):
+        rng = np.random.default_rng(5)
+        pal = big_palette.as_array().astype(np.int32)
+        # Random pixels plus exact midpoints between entries, which are ties.
+        mids = ((pal[:40, None, :] + pal[None, :40, :]) // 2).reshape(-1, 3)
+        pixels = np.vstack([rng.integers(0, 256, (20000, 3)), mids, pal]).astype(np.uint8)
+        dists = ((pixels[:, None, :].astype(np.float32) - pal[None].astype(np.float32)) ** 2).sum(2)
+        expected = np.argmin(dists, axis=1)
+
+        for strategy in ("brute", "index", "lut"):
+            result = big_palette.nearest_indices(pixels, strategy=strategy)
+            assert np.array_equal(result, expected), strategy
+
+    def test_preserves_leading_shape(self):
+        pixels = np.zeros((3, 5, 3), np.uint8)
+        assert GAMEBOY.nearest_indices(pixels, strategy="index").shape == (3, 5)
+
+    def test_choice_by_size(self, big_palette: Palette):
+        assert big_palette.nearest_strategy(64 * 64) == "brute"
+        assert big_palette.nearest_strategy(512 * 512) == "index"
+        assert big_palette.nearest_strategy(4096 * 4096) == "lut"
+
+    def test_busy_palette_graduates(self):
+        palette = Palette("busy", NES.colors)
+        sprite = np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        assert palette.nearest_strategy(sprite.size // 3) == "brute"
+        for _ in range(300):
+            palette.nearest_indices(sprite)
+        assert palette.nearest_strategy(sprite.size // 3) != "brute"
+
+    def test_built_structures_are_cached(self):
+        palette = Palette("idx", PICO8.colors)
+        assert palette.spatial_index() is palette.spatial_index()
+
+    def test_unknown_strategy(self):
+        with pytest.raises(ValueError, match="Unknown strategy"):
+            GAMEBOY.nearest_indices(np.zeros((1, 3), np.uint8), strategy="kdtree")
+
+
+class TestDistinctColors:
+    def test_flat_art_searches_each_color_once(self, monkeypatch: pytest.MonkeyPatch):
+        from pixelsmith import _palettes
+
+        searched = []
+        real = _palettes.nearest_brute
+
+        def spy(pixels, colors):
+            searched.append(len(pixels))
+            return real(pixels, colors)
+
+        monkeypatch.setattr(_palettes, "nearest_brute", spy)
+        rng = np.random.default_rng(2)
+        colors = rng.integers(0, 256, (300, 3), dtype=np.uint8)
+        pixels = colors[rng.integers(0, 300, (128, 128))]
+        dists = (
+            (pixels[..., None, :].astype(np.int32) - NES.as_array().astype(np.int32)) ** 2
+        ).sum(-1)
+
+        result = Palette("flat", NES.colors).nearest_indices(pixels, strategy="brute")
+        assert np.array_equal(result, np.argmin(dists, axis=-1))
+        assert searched == [300]
+
+    def test_noise_takes_dense_path(self):
+        from pixelsmith._nearest import distinct_colors, pack_rgb
+
+        noise = np.random.default_rng(3).integers(0, 256, (128, 128, 3), dtype=np.uint8)
+        assert distinct_colors(pack_rgb(noise)) is None
+
+    def test_index_strategy_with_repeats(self):
+        rng = np.random.default_rng(4)
+        pixels = PICO8.as_array()[rng.integers(0, 16, (64, 64))] + rng.integers(
+            0, 3, (64, 64, 1)
+        ).astype(np.uint8)
+        dense = Palette("dense", C64.colors)
+        assert np.array_equal(
+            dense.nearest_indices(pixels, strategy="index"),
+            dense.nearest_indices(pixels, strategy="lut"),
+        )
@@ -0,0 +1,555 @@
+"""Tests for pipeline caching (stub pipelines, no model downloads)."""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from types import SimpleNamespace
+
+import pytest
+
+from pixelsmith import _pipeline
+from pixelsmith._config import GenerationConfig
+from pixelsmith._embedding_cache import EmbeddingCache
+from pixelsmith._pipeline_cache import PipelineCache
+from pixelsmith.exceptions import GenerationError, ModelLoadError
+
+
+class _StubPipeline:
+    """Records LoRA calls and tracks the fused scale like a diffusers pipeline."""
+
+    def __init__(self, key):
+        self.key = key
+        self.calls: list[str] = []
+        self.adapter_weight = 1.0
+        self.adapters: list[str] = []
+        self.fused = 0.0
+        self.scheduler = SimpleNamespace(name="default", config={"num_train_timesteps": 1000})
+        self.batches: list[tuple] = []
+        self.oom_above = 1 << 30
+        self.on_call = None  # runs inside __call__, before the denoising state is read
+        self.seen: list[tuple[float, str]] = []
+
+    def set_adapters(self, names, adapter_weights):
+        self.calls.append("set_adapters")
+        self.adapters = list(names)
+        self.adapter_weight = adapter_weights[0]
+
+    def fuse_lora(self, lora_scale=1.0, adapter_names=None):
+        self.calls.append("fuse")
+        self.fused += self.adapter_weight * lora_scale
+
+    def unfuse_lora(self):
+        self.calls.append("unfuse")
+        self.fused = 0.0
+
+    def encode_prompt(self, *, prompt, num_images_per_prompt, do_classifier_free_guidance):
+        self.calls.append(f"encode:{prompt}")
+        return prompt, None, f"pooled:{prompt}", None
+
+    def __call__(self, *, prompt_embeds, generator, num_images_per_prompt=1, **kwargs):
+        self.calls.append("call")
+        if self.on_call is not None:
+            self.on_call()
+        self.seen.append((self.fused, self.scheduler.name))
+        self.last_kwargs = kwargs
+        self.last_scheduler = self.scheduler.name
+        prompt = prompt_embeds
+        generator = generator if isinstance(generator, list) else [generator]
+        self.batches.append((prompt, num_images_per_prompt, list(generator)))
+        if len(generator) > self.oom_above:
+            raise RuntimeError("CUDA out of memory")
+        prompts = [prompt] * num_images_per_prompt if isinstance(prompt, str) else prompt
+        return SimpleNamespace(images=[f"{p}#{g}" for p, g in zip(prompts, generator, strict=True)])
+
+
+@pytest.fixture
+def loads(monkeypatch: pytest.MonkeyPatch) -> list:
+    """Replace the diffusers loader with a stub and record every load."""
+    calls: list = []
+
+    def fake_build(key):
+        calls.append(key)
+        return _StubPipeline(key)
+
+    monkeypatch.setattr(_pipeline, "_build_pipeline", fake_build)
+    monkeypatch.setattr(_pipeline, "_cache", PipelineCache())
+    monkeypatch.setattr(_pipeline, "_make_generator", lambda seed: seed)
+    monkeypatch.setattr(_pipeline, "_concat_embeds", list)
+    monkeypatch.setattr(_pipeline, "_embeddings", EmbeddingCache())
+    monkeypatch.setattr(
+        _pipeline, "_make_scheduler", lambda name, config: SimpleNamespace(name=name, config=config)
+    )
+    return calls
+
+
+class TestPipelineCache:
+    def test_sampling_params_do_not_reload(self, loads: list):
+        cfg = GenerationConfig(device="cpu")
+        first = _pipeline._load_pipeline(cfg)
+        for variant in (
+            replace(cfg, num_inference_steps=4),
+            replace(cfg, guidance_scale=2.0),
+            replace(cfg, render_size=512),
+        ):
+            assert _pipeline._load_pipeline(variant) is first
+        assert len(loads) == 1
+
+    def test_load_time_change_reloads(self, loads: list):
+        cfg = GenerationConfig(device="cpu")
+        _pipeline._load_pipeline(cfg)
+        _pipeline._load_pipeline(replace(cfg, dtype="float32"))
+        assert len(loads) == 2
+        assert loads[1].dtype == "float32"
+
+    def test_unload_forces_reload(self, loads: list):
+        cfg = GenerationConfig(device="cpu")
+        _pipeline._load_pipeline(cfg)
+        _pipeline.unload_pipeline()
+        _pipeline._load_pipeline(cfg)
+        assert len(loads) == 2
+
+    def test_load_failure_wrapped(self, monkeypatch: pytest.MonkeyPatch):
+        def broken(key):
+            raise OSError("no such model")
+
+        monkeypatch.setattr(_pipeline, "_build_pipeline", broken)
+        with pytest.raises(ModelLoadError, match="no such model"):
+            _pipeline._load_pipeline(GenerationConfig(device="cpu"))
+
+
+@pytest.fixture
+def slow_loads(monkeypatch: pytest.MonkeyPatch, loads: list) -> threading.Event:
+    """Make the stub loader block until the returned event is set."""
+    release = threading.Event()
+    fake_build = _pipeline._build_pipeline
+
+    def slow_build(key):
+        assert release.wait(5)
+        return fake_build(key)
+
+    monkeypatch.setattr(_pipeline, "_build_pipeline", slow_build)
+    return release
+
+
+def _start_loads(pool: ThreadPoolExecutor, cfg: GenerationConfig, n: int) -> list:
+    futures = [pool.submit(_pipeline._load_pipeline, cfg) for _ in range(n)]
+    # Wait until the leader is inside the loader before letting it finish.
+    while not _pipeline._loads.in_flight(cfg.load_key()):
+        threading.Event().wait(0.001)
+    return futures
+
+
+class TestConcurrentLoading:
+    def test_cold_start_loads_once(self, loads: list, slow_loads: threading.Event):
+        cfg = GenerationConfig(device="cpu")
+        with ThreadPoolExecutor(8) as pool:
+            futures = _start_loads(pool, cfg, 8)
+            slow_loads.set()
+            pipes = [f.result() for f in futures]
+        assert len(loads) == 1
+        assert all(p is pipes[0] for p in pipes)
+        assert pipes[0].calls.count("fuse") == 1
+
+    def test_load_finished_before_flight_counts_one_miss(self, loads: list):
+        cfg = GenerationConfig(device="cpu")
+        key = cfg.load_key()
+        entry = _pipeline._load_and_cache(key)
+        # A caller that missed just before that load finished joins afterwards.
+        assert _pipeline._load_and_cache(key) is entry
+        stats = _pipeline.pipeline_cache_stats()
+        assert (stats.hits, stats.misses) == (0, 0)
+
+    def test_failure_reaches_every_waiter(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(_pipeline, "_cache", PipelineCache())
+        release = threading.Event()
+        attempts: list = []
+
+        def broken(key):
+            attempts.append(key)
+            release.wait(5)
+            raise OSError("no such model")
+
+        monkeypatch.setattr(_pipeline, "_build_pipeline", broken)
+        cfg = GenerationConfig(device="cpu")
+        with ThreadPoolExecutor(4) as pool:
+            futures = _start_loads(pool, cfg, 4)
+            release.set()
+            errors = [f.exception() for f in futures]
+        assert len(attempts) == 1
+        assert all(isinstance(e, ModelLoadError) for e in errors)
+
+    def test_unload_during_load(self, loads: list, slow_loads: threading.Event):
+        cfg = GenerationConfig(device="cpu")
+        with ThreadPoolExecutor(2) as pool:
+            futures = _start_loads(pool, cfg, 2)
+            _pipeline.unload_pipeline()
+            slow_loads.set()
+            pipes = [f.result() for f in futures]
+        assert pipes[0] is pipes[1]
+        assert len(_pipeline._cache) == 0  # the stale load was not cached
+        _pipeline._load_pipeline(cfg)
+        assert len(loads) == 2
+
+    def test_unrelated_unload_keeps_load(self, loads: list, slow_loads: threading.Event):
+        cfg = GenerationConfig(device="cpu")
+        with ThreadPoolExecutor(1) as pool:
+            (future,) = _start_loads(pool, cfg, 1)
+            _pipeline.unload_pipeline(replace(cfg, dtype="float32"))
+            slow_loads.set()
+            future.result()
+        assert _pipeline._cache.keys() == [cfg.load_key()]
+
+
+class _OptionsStub:
+    """Records the memory/speed switches a pipeline is given."""
+
+    def __init__(self) -> None:
+        self.calls: list = []
+        self.vae = SimpleNamespace(
+            enable_slicing=lambda: self.calls.append("vae_slicing"),
+            enable_tiling=lambda: self.calls.append("vae_tiling"),
+        )
+
+    def enable_xformers_memory_efficient_attention(self):
+        self.calls.append("xformers")
+
+    def enable_attention_slicing(self, slice_size):
+        self.calls.append(("attention_slicing", slice_size))
+
+
+class TestInferenceOptions:
+    def test_defaults_change_nothing(self):
+        pipe = _OptionsStub()
+        _pipeline._apply_inference_options(pipe, GenerationConfig().load_key())
+        assert pipe.calls == []
+
+    def test_switches_applied(self):
+        pipe = _OptionsStub()
+        cfg = GenerationConfig(
+            attention="xformers", attention_slicing=2, vae_slicing=True, vae_tiling=True
+        )
+        _pipeline._apply_inference_options(pipe, cfg.load_key())
+        assert pipe.calls == [
+            "xformers",
+            ("attention_slicing", 2),
+            "vae_slicing",
+            "vae_tiling",
+        ]
+
+    @pytest.mark.parametrize(
+        ("change", "expected"),
+        [
+            ({"device": "cpu"}, "to:cpu"),
+            ({"device": "cuda", "enable_cpu_offload": False}, "to:cuda"),
+            ({"device": "cuda"}, "model_offload"),
+            ({"device": "cuda", "offload_mode": "sequential"}, "sequential_offload"),
+        ],
+    )
+    def test_placement(self, change: dict, expected: str):
+        calls: list = []
+        pipe = SimpleNamespace(
+            to=lambda device: calls.append(f"to:{device}") or pipe,
+            enable_model_cpu_offload=lambda: calls.append("model_offload"),
+            enable_sequential_cpu_offload=lambda: calls.append("sequential_offload"),
+        )
+        assert _pipeline._place_pipeline(pipe, GenerationConfig(**change).load_key()) is pipe
+        assert calls == [expected]
+
+    def test_options_load_separate_pipelines(self, loads: list):
+        _pipeline._load_pipeline(GenerationConfig(device="cpu"))
+        _pipeline._load_pipeline(GenerationConfig(device="cpu", vae_tiling=True))
+        assert len(loads) == 2
+        assert loads[1].vae_tiling
+
+
+class TestLoraHotSwap:
+    def test_weight_change_refuses_without_reload(self, loads: list):
+        cfg = GenerationConfig(device="cpu", lora_weight=1.2)
+        pipe = _pipeline._load_pipeline(cfg)
+        assert pipe.fused == pytest.approx(1.2)
+
+        assert _pipeline._load_pipeline(replace(cfg, lora_weight=0.5)) is pipe
+        assert pipe.fused == pytest.approx(0.5)
+        assert len(loads) == 1
+        assert pipe.calls == ["set_adapters", "fuse", "unfuse", "set_adapters", "fuse"]
+
+    def test_embeddings_keyed_by_fused_weight(self, loads: list):
+        cfg = GenerationConfig(device="cpu")
+        for weight in (1.2, 0.5, 1.2):
+            entry = _pipeline._load_entry(replace(cfg, lora_weight=weight))
+            _pipeline._encode(entry, "knight")
+        assert entry.pipe.calls.count("encode:knight") == 2
+
+    def test_same_weight_is_noop(self, loads: list):
+        cfg = GenerationConfig(device="cpu")
+        pipe = _pipeline._load_pipeline(cfg)
+        pipe.calls.clear()
+        _pipeline._load_pipeline(replace(cfg, guidance_scale=1.0))
+        assert pipe.calls == []
+
+    def test_sweep_does_not_compound(self, loads: list):
+        cfg = GenerationConfig(device="cpu")
+        for weight in (0.4, 1.6, 0.9, 1.2):
+            pipe = _pipeline._load_pipeline(replace(cfg, lora_weight=weight))
+        assert pipe.fused == pytest.approx(1.2)
+
+
+def _overlap(first: GenerationConfig, second: GenerationConfig) -> _StubPipeline:
+    """Start a second generation while the first is inside the pipeline call."""
+    pipe = _pipeline._load_pipeline(first)
+    entered, release = threading.Event(), threading.Event()
+
+    def block():
+        if not entered.is_set():
+            entered.set()
+            assert release.wait(5)
+
+    pipe.on_call = block
+    with ThreadPoolExecutor(2) as pool:
+        a = pool.submit(_pipeline.run_pipeline, "knight", negative_prompt="", config=first)
+        assert entered.wait(5)
+        b = pool.submit(_pipeline.run_pipeline, "knight", negative_prompt="", config=second)
+        threading.Event().wait(0.05)  # time for b to interfere, were it not blocked
+        release.set()
+        a.result(5)
+        b.result(5)
+    return pipe
+
+
+class TestConcurrentGeneration:
+    def test_weight_change_waits_for_running_call(self, loads: list):
+        cfg = GenerationConfig(device="cpu", lora_weight=1.2)
+        pipe = _overlap(cfg, replace(cfg, lora_weight=0.5))
+        assert pipe.seen == [(pytest.approx(1.2), "default"), (pytest.approx(0.5), "default")]
+        assert len(loads) == 1
+
+    def test_scheduler_swap_waits_for_running_call(self, loads: list):
+        cfg = GenerationConfig(device="cpu", scheduler="euler_a")
+        pipe = _overlap(cfg, replace(cfg, scheduler="unipc"))
+        assert [name for _, name in pipe.seen] == ["euler_a", "unipc"]
+
+
+class TestSchedulerSelection:
+    def test_scheduler_swap_without_reload(self, loads: list):
+        cfg = GenerationConfig(device="cpu")
+        _pipeline.run_pipeline("gem", negative_prompt="", seed=1, config=cfg)
+        pipe = _pipeline._load_pipeline(cfg)
+        assert pipe.last_scheduler == "default"
+
+        for name in ("euler_a", "unipc", "dpmpp_2m_karras", "default"):
+            _pipeline.run_pipeline(
+                "gem", negative_prompt="", seed=1, config=replace(cfg, scheduler=name)
+            )
+            assert pipe.last_scheduler == name
+        assert len(loads) == 1
+
+    def test_schedulers_cached_per_pipeline(self, loads: list, monkeypatch: pytest.MonkeyPatch):
+        made = []
+
+        def make(name, config):
+            made.append(name)
+            return SimpleNamespace(name=name, config=config)
+
+        monkeypatch.setattr(_pipeline, "_make_scheduler", make)
+        cfg = GenerationConfig(device="cpu", scheduler="euler_a")
+        first = _pipeline._load_entry(cfg).pipe.scheduler
+        _pipeline._load_entry(replace(cfg, scheduler="unipc"))
+        assert _pipeline._load_entry(cfg).pipe.scheduler is first
+        assert made == ["euler_a", "unipc"]
+
+    def test_scheduler_built_from_model_config(self, loads: list, monkeypatch: pytest.MonkeyPatch):
+        configs = []
+        monkeypatch.setattr(
+            _pipeline,
+            "_make_scheduler",
+            lambda name, config: configs.append(config) or SimpleNamespace(name=name, config={}),
+        )
+        _pipeline._load_entry(GenerationConfig(device="cpu", scheduler="euler_a"))
+        _pipeline._load_entry(GenerationConfig(device="cpu", scheduler="unipc"))
+        assert configs == [{"num_train_timesteps": 1000}] * 2
+
+    def test_lcm_fuses_lcm_adapter(self, loads: list):
+        cfg = GenerationConfig(device="cpu", lcm_lora_path="/models/lcm")
+        pipe = _pipeline._load_pipeline(cfg)
+        assert pipe.adapters == ["pixel"]
+        assert loads[0].lcm_lora_path == "/models/lcm"
+
+        _pipeline._load_pipeline(replace(cfg, scheduler="lcm"))
+        assert pipe.adapters == ["pixel", "lcm"]
+        assert pipe.scheduler.name == "lcm"
+
+        _pipeline._load_pipeline(cfg)
+        assert pipe.adapters == ["pixel"]
+        assert len(loads) == 1
+
+    def test_scheduler_failure_wrapped(self, loads: list, monkeypatch: pytest.MonkeyPatch):
+        def broken(name, config):
+            raise AttributeError("no such scheduler")
+
+        monkeypatch.setattr(_pipeline, "_make_scheduler", broken)
+        with pytest.raises(ModelLoadError, match="euler_a"):
+            _pipeline._load_entry(GenerationConfig(device="cpu", scheduler="euler_a"))
+
+
+class TestMultiEntryCache:
+    def test_alternating_configs_stay_resident(self, loads: list):
+        _pipeline.configure_pipeline_cache(max_entries=2)
+        gpu = GenerationConfig(device="cuda", dtype="float16")
+        cpu = GenerationConfig(device="cpu", dtype="float32")
+        for _ in range(3):
+            _pipeline._load_pipeline(gpu)
+            _pipeline._load_pipeline(cpu)
+        assert len(loads) == 2
+        stats = _pipeline.pipeline_cache_stats()
+        assert (stats.entries, stats.hits, stats.misses, stats.evictions) == (2, 4, 2, 0)
+
+    def test_lru_eviction_by_count(self, loads: list):
+        _pipeline.configure_pipeline_cache(max_entries=2)
+        a, b, c = (
+            GenerationConfig(device="cpu", dtype=d) for d in ("float16", "float32", "bfloat16")
+        )
+        _pipeline._load_pipeline(a)
+        _pipeline._load_pipeline(b)
+        _pipeline._load_pipeline(a)  # b is now least recently used
+        _pipeline._load_pipeline(c)
+        assert _pipeline._cache.keys() == [a.load_key(), c.load_key()]
+        assert _pipeline.pipeline_cache_stats().evictions == 1
+
+    def test_eviction_by_memory_budget(self, loads: list, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(_pipeline, "_pipeline_footprint", lambda pipe, key: (0, 6 << 30))
+        _pipeline.configure_pipeline_cache(max_entries=4, device_budget_bytes=10 << 30)
+        a, b = (GenerationConfig(device="cuda", dtype=d) for d in ("float16", "float32"))
+        _pipeline._load_pipeline(a)
+        _pipeline._load_pipeline(b)
+        stats = _pipeline.pipeline_cache_stats()
+        assert stats.entries == 1
+        assert stats.device_bytes == 6 << 30
+        assert _pipeline._cache.keys() == [b.load_key()]
+
+    def test_oversized_entry_is_kept(self, loads: list, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(_pipeline, "_pipeline_footprint", lambda pipe, key: (8 << 30, 0))
+        _pipeline.configure_pipeline_cache(host_budget_bytes=1 << 30)
+        _pipeline._load_pipeline(GenerationConfig(device="cpu"))
+        assert _pipeline.pipeline_cache_stats().entries == 1
+
+    @pytest.mark.parametrize(
+        "limits",
+        [{"max_entries": 2}, {"max_entries": 4, "device_budget_bytes": 10 << 30}],
+    )
+    def test_failed_load_keeps_warm_pipeline(
+        self, loads: list, monkeypatch: pytest.MonkeyPatch, limits: dict
+    ):
+        monkeypatch.setattr(_pipeline, "_pipeline_footprint", lambda pipe, key: (0, 6 << 30))
+        _pipeline.configure_pipeline_cache(**limits)
+        warm = GenerationConfig(device="cuda")
+        _pipeline._load_pipeline(warm)
+
+        def broken(key):
+            raise OSError("no such model")
+
+        monkeypatch.setattr(_pipeline, "_build_pipeline", broken)
+        with pytest.raises(ModelLoadError):
+            _pipeline._load_pipeline(replace(warm, dtype="float32"))
+        assert _pipeline._cache.keys() == [warm.load_key()]
+        assert _pipeline.pipeline_cache_stats().evictions == 0
+
+    def test_unload_single_entry(self, loads: list):
+        _pipeline.configure_pipeline_cache(max_entries=2)
+        a, b = (GenerationConfig(device="cpu", dtype=d) for d in ("float16", "float32"))
+        _pipeline._load_pipeline(a)
+        _pipeline._load_pipeline(b)
+        _pipeline.unload_pipeline(a)
+        assert _pipeline._cache.keys() == [b.load_key()]
+        _pipeline.unload_pipeline()
+        assert len(_pipeline._cache) == 0
+
+
+class TestBatchedRun:
+    def _run(self, prompts, seeds, **kwargs):
+        cfg = GenerationConfig(device="cpu")
+        images = _pipeline.run_pipeline_batch(
+            prompts, negative_prompt="blurry", seeds=seeds, config=cfg, **kwargs
+        )
+        return images, _pipeline._load_pipeline(cfg)
+
+    def test_micro_batches_preserve_order(self, loads: list):
+        prompts = ["a", "b", "c", "d", "e"]
+        images, pipe = self._run(prompts, [1, 2, 3, 4, 5], max_batch_size=2)
+        assert images == ["a#1", "b#2", "c#3", "d#4", "e#5"]
+        assert [len(b[2]) for b in pipe.batches] == [2, 2, 1]
+        assert len(loads) == 1
+
+    def test_shared_prompt_uses_num_images_per_prompt(self, loads: list):
+        images, pipe = self._run(["slime"] * 3, [7, 8, 9], max_batch_size=4)
+        assert images == ["slime#7", "slime#8", "slime#9"]
+        assert pipe.batches == [("slime", 3, [7, 8, 9])]
+
+    def test_out_of_memory_halves_batch(self, loads: list, monkeypatch: pytest.MonkeyPatch):
+        original = _StubPipeline.__init__
+
+        def tight(self, key):
+            original(self, key)
+            self.oom_above = 2
+
+        monkeypatch.setattr(_StubPipeline, "__init__", tight)
+        images, pipe = self._run(list("abcdef"), list(range(6)), max_batch_size=8)
+        assert images == [f"{p}#{i}" for i, p in enumerate("abcdef")]
+        assert [len(b[2]) for b in pipe.batches] == [6, 4, 2, 2, 2]
+
+    def test_out_of_memory_at_batch_size_one_raises(self, loads: list):
+        cfg = GenerationConfig(device="cpu")
+        _pipeline._load_pipeline(cfg).oom_above = 0
+        with pytest.raises(GenerationError, match="out of memory"):
+            _pipeline.run_pipeline_batch(
+                ["a", "b"], negative_prompt="", seeds=[1, 2], config=cfg, max_batch_size=2
+            )
+
+
+class TestPromptEmbeddingCache:
+    def test_repeated_prompts_and_negative_encoded_once(self, loads: list):
+        cfg = GenerationConfig(device="cpu")
+        for seed in range(3):
+            _pipeline.run_pipeline("a gem", negative_prompt="blurry", seed=seed, config=cfg)
+        pipe = _pipeline._load_pipeline(cfg)
+        assert pipe.calls.count("encode:a gem") == 1
+        assert pipe.calls.count("encode:blurry") == 1
+        assert pipe.last_kwargs["negative_prompt_embeds"] == "blurry"
+        assert pipe.last_kwargs["pooled_prompt_embeds"] == "pooled:a gem"
+        stats = _pipeline.embedding_cache_stats()
+        assert (stats.hits, stats.misses) == (4, 2)
+
+    def test_batch_stacks_embeddings(self, loads: list):
+        cfg = GenerationConfig(device="cpu")
+        _pipeline.run_pipeline_batch(
+            ["a", "b", "a"], negative_prompt="n", seeds=[1, 2, 3], config=cfg, max_batch_size=3
+        )
+        pipe = _pipeline._load_pipeline(cfg)
+        assert pipe.batches[0][0] == ["a", "b", "a"]
+        assert pipe.last_kwargs["negative_prompt_embeds"] == ["n", "n", "n"]
+        assert [c for c in pipe.calls if c.startswith("encode")] == [
+            "encode:n",
+            "encode:a",
+            "encode:b",
+        ]
+
+    def test_unload_drops_embeddings(self, loads: list):
+        cfg = GenerationConfig(device="cpu")
+        _pipeline.run_pipeline("a gem", negative_prompt="", seed=1, config=cfg)
+        assert _pipeline.embedding_cache_stats().entries == 2
+        _pipeline.unload_pipeline()
+        assert _pipeline.embedding_cache_stats().entries == 0
+
+    def test_lru_bound(self):
+        cache = EmbeddingCache(max_entries=2)
+        encoded = []
+
+        def encode(text):
+            encoded.append(text)
+            return text, text
+
+        for text in ("a", "b", "a", "c", "b"):
+            cache.get(0, 1.0, text, encode)
+        assert encoded == ["a", "b", "c", "b"]
+        assert cache.stats().entries == 2
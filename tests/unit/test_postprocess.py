@@ -3,10 +3,24 @@
 from __future__ import annotations
 
 import numpy as np
+import pytest
 from PIL import Image
 
-from pixelsmith._palettes import GAMEBOY, Palette
-from pixelsmith._postprocess import downscale, quantize_palette
+from pixelsmith._palettes import C64, GAMEBOY, NES, PICO8, Palette
+from pixelsmith._postprocess import (
+    Downscale,
+    Outline,
+    Quantize,
+    StageStats,
+    Upscale,
+    downscale,
+    finalize,
+    finalize_many,
+    index_array,
+    quantize_array,
+    quantize_palette,
+    run_stages,
+)
 
 
 class TestDownscale:
@@ -76,3 +90,182 @@ class TestQuantizePalette:
         img = Image.new("RGBA", (8, 8), (255, 0, 0, 128))
         result = quantize_palette(img, GAMEBOY)
         assert result.mode == "RGB"
+
+    def test_matches_broadcast_argmin(self):
+        """The LUT path must be bit-identical to the brute-force float32 argmin."""
+        rng = np.random.default_rng(7)
+        # Random colors plus exact midpoints between palette entries, which are ties.
+        pal = NES.as_array().astype(np.int32)
+        mids = (pal[:, None, :] + pal[None, :, :]) // 2
+        arr = np.concatenate([rng.integers(0, 256, (4096, 3)), mids.reshape(-1, 3)])
+        arr = arr.astype(np.uint8)
+        img = Image.fromarray(arr.reshape(-1, 8, 3), "RGB")
+
+        for palette in (NES, GAMEBOY, PICO8, C64):
+            colors = palette.as_array().astype(np.float32)
+            diffs = arr.astype(np.float32)[:, None, :] - colors[None, :, :]
+            expected = colors[np.argmin(np.sum(diffs**2, axis=2), axis=1)].astype(np.uint8)
+
+            result = np.array(quantize_palette(img, palette)).reshape(-1, 3)
+            assert np.array_equal(result, expected)
+
+    def test_duplicate_palette_colors(self):
+        palette = Palette("dupes", ((10, 10, 10), (200, 0, 0), (10, 10, 10), (0, 0, 200)))
+        img = Image.new("RGB", (4, 4), (12, 9, 11))
+        arr = np.array(quantize_palette(img, palette))
+        assert tuple(arr[0, 0]) == (10, 10, 10)
+
+
+class TestQuantizeArray:
+    @pytest.fixture
+    def noise(self) -> np.ndarray:
+        return np.random.default_rng(3).integers(0, 256, (37, 23, 3), dtype=np.uint8)
+
+    def test_bands_match_whole_image(self, noise: np.ndarray):
+        expected = np.array(quantize_palette(Image.fromarray(noise), NES))
+        # A budget of one row per band forces 37 separate bands.
+        banded = quantize_array(Image.fromarray(noise), NES, max_bytes=1)
+        assert np.array_equal(banded, expected)
+
+    def test_array_and_path_inputs(self, noise: np.ndarray, tmp_path):
+        expected = np.array(quantize_palette(Image.fromarray(noise), PICO8))
+        path = tmp_path / "sheet.png"
+        Image.fromarray(noise).save(path)
+        assert np.array_equal(quantize_array(noise, PICO8, max_bytes=2000), expected)
+        assert np.array_equal(quantize_array(path, PICO8), expected)
+        assert np.array_equal(quantize_array(str(path), PICO8), expected)
+
+    def test_mode_conversion_per_band(self, noise: np.ndarray):
+        rgba = np.concatenate([noise, np.full((37, 23, 1), 90, np.uint8)], axis=2)
+        img = Image.fromarray(rgba, "RGBA")
+        expected = np.array(quantize_palette(img.convert("RGB"), C64))
+        assert np.array_equal(quantize_array(img, C64, max_bytes=1), expected)
+        assert np.array_equal(quantize_array(rgba, C64), expected)
+
+        gray = noise[:, :, 0]
+        expected = np.array(quantize_palette(Image.fromarray(gray).convert("RGB"), C64))
+        assert np.array_equal(quantize_array(gray, C64), expected)
+
+    def test_writes_into_preallocated_output(self, noise: np.ndarray):
+        out = np.zeros((37, 23, 3), np.uint8)
+        assert quantize_array(noise, GAMEBOY, out=out, max_bytes=1) is out
+        assert np.array_equal(out, np.array(quantize_palette(Image.fromarray(noise), GAMEBOY)))
+
+    def test_rejects_bad_output(self, noise: np.ndarray):
+        with pytest.raises(ValueError, match="out must be"):
+            quantize_array(noise, GAMEBOY, out=np.zeros((23, 37, 3), np.uint8))
+
+    def test_rejects_bad_arrays(self):
+        with pytest.raises(ValueError, match="uint8"):
+            quantize_array(np.zeros((4, 4, 3), np.float32), GAMEBOY)
+        with pytest.raises(ValueError, match="shape"):
+            quantize_array(np.zeros((4, 4, 2), np.uint8), GAMEBOY)
+
+
+class TestIndexedOutput:
+    def test_p_mode_matches_rgb(self):
+        noise = np.random.default_rng(8).integers(0, 256, (24, 24, 3), dtype=np.uint8)
+        for palette in (GAMEBOY, PICO8, NES):
+            indexed = quantize_palette(Image.fromarray(noise), palette, indexed=True)
+            assert indexed.mode == "P"
+            assert len(indexed.getpalette()) == 3 * len(palette.colors)
+            rgb = np.array(quantize_palette(Image.fromarray(noise), palette))
+            assert np.array_equal(np.array(indexed.convert("RGB")), rgb)
+
+    def test_index_array_banded(self):
+        noise = np.random.default_rng(9).integers(0, 256, (19, 7, 3), dtype=np.uint8)
+        out = np.empty((19, 7), np.uint8)
+        assert index_array(noise, C64, out=out, max_bytes=1) is out
+        assert np.array_equal(C64.as_array()[out], quantize_array(noise, C64))
+
+    def test_too_many_colors_for_p_mode(self):
+        from pixelsmith.exceptions import PaletteError
+
+        big = Palette("big", tuple((i % 256, i // 256, 0) for i in range(300)))
+        with pytest.raises(PaletteError, match="at most 256"):
+            index_array(np.zeros((2, 2, 3), np.uint8), big)
+
+    def test_finalize_many_indexed_keeps_unquantized_rgb(self):
+        raw = Image.new("RGB", (64, 64), (200, 10, 10))
+        plain, paletted = finalize_many(raw, [(16, None), (16, GAMEBOY)], indexed=True)
+        assert plain.mode == "RGB"
+        assert paletted.mode == "P"
+
+
+def _float_render(side: int = 256, seed: int = 0) -> np.ndarray:
+    """A raw render as diffusers returns it with output_type="np"."""
+    return np.random.default_rng(seed).random((side, side, 3), dtype=np.float32)
+
+
+def _as_pil(render: np.ndarray) -> Image.Image:
+    """diffusers' numpy_to_pil for one image."""
+    return Image.fromarray((render * 255).round().astype("uint8"))
+
+
+class TestStages:
+    @pytest.mark.parametrize("shape", [(64, 64), (100, 333), (1024, 1024), (7, 7)])
+    @pytest.mark.parametrize("size", [1, 16, 63, 64, 100])
+    def test_downscale_matches_pil_nearest(self, shape, size):
+        noise = np.random.default_rng(0).integers(0, 256, (*shape, 3), dtype=np.uint8)
+        expected = np.array(downscale(Image.fromarray(noise), size))
+        assert np.array_equal(run_stages(noise, [Downscale(size)]), expected)
+
+    def test_float_render_matches_pil_round_trip(self):
+        render = _float_render()
+        for palette in (None, PICO8):
+            from_array = finalize(render, 32, palette, dither="bayer4")
+            from_pil = finalize(_as_pil(render), 32, palette, dither="bayer4")
+            assert np.array_equal(np.array(from_array), np.array(from_pil))
+
+    def test_float_render_allocates_only_the_sprite(self):
+        stats = StageStats()
+        buf = run_stages(
+            _float_render(512), [Downscale(64), Quantize(PICO8), Outline((0, 0, 0))], stats=stats
+        )
+        # Quantize and outline write into the downscaled buffer; nothing is full size.
+        assert stats.allocations == [("downscale", 64 * 64 * 3)]
+        assert buf.shape == (64, 64, 3)
+        assert buf.flags.c_contiguous
+
+    def test_indexed_quantize_allocates_index_buffer(self):
+        stats = StageStats()
+        buf = run_stages(
+            _float_render(), [Downscale(16), Quantize(GAMEBOY, indexed=True)], stats=stats
+        )
+        assert stats.allocations == [("downscale", 16 * 16 * 3), ("quantize", 16 * 16)]
+        assert buf.shape == (16, 16)
+        assert buf.max() < len(GAMEBOY.colors)
+
+    def test_caller_array_is_never_written(self):
+        image = np.random.default_rng(1).integers(0, 256, (8, 8, 3), dtype=np.uint8)
+        before = image.copy()
+        stats = StageStats()
+        out = run_stages(image, [Quantize(GAMEBOY), Outline((0, 0, 0))], stats=stats)
+        assert np.array_equal(image, before)
+        assert out is not image
+        assert stats.count == 1
+        assert stats.nbytes == image.nbytes
+
+    def test_outline_marks_four_neighbors(self):
+        buf = np.zeros((5, 5, 3), dtype=np.uint8)
+        buf[2, 2] = (255, 0, 0)
+        out = run_stages(buf, [Outline((9, 9, 9))])
+        assert not (buf == 9).any()  # outlined on a copy
+        ring = np.argwhere((out == 9).all(axis=2))
+        assert sorted(map(tuple, ring)) == [(1, 2), (2, 1), (2, 3), (3, 2)]
+        assert tuple(out[2, 2]) == (255, 0, 0)
+
+    def test_outline_on_indices(self):
+        indices = np.zeros((4, 4), dtype=np.uint8)
+        indices[0, 3] = 2
+        out = run_stages(indices, [Outline(1, background=0)])
+        assert out[0, 2] == 1
+        assert out[1, 3] == 1
+        with pytest.raises(ValueError, match="palette index"):
+            run_stages(indices, [Outline((0, 0, 0))])
+
+    def test_upscale_repeats_pixels(self):
+        buf = np.arange(2 * 3 * 3, dtype=np.uint8).reshape(2, 3, 3)
+        out = run_stages(buf, [Upscale(4)])
+        assert np.array_equal(out, buf.repeat(4, axis=0).repeat(4, axis=1))
+        assert run_stages(buf, [Upscale(1)]) is buf
@@ -0,0 +1,128 @@
+"""Tests for the MCP generation queue (stub batch runner, no GPU)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from pixelsmith._config import GenerationConfig
+from pixelsmith._palettes import GAMEBOY
+from pixelsmith.mcp._queue import GenerationQueue
+
+
+class _StubRunner:
+    def __init__(self, fail: bool = False):
+        self.batches: list[tuple[list[str], GenerationConfig]] = []
+        self.fail = fail
+
+    def __call__(self, prompts, *, negative_prompt, seeds, config):
+        self.batches.append((list(prompts), config))
+        if self.fail:
+            raise RuntimeError("diffusion exploded")
+        return [Image.new("RGB", (128, 128), (seed or 0, 90, 200)) for seed in seeds]
+
+
+@pytest.fixture
+def runner():
+    return _StubRunner()
+
+
+@pytest.fixture
+def gen_queue(runner: _StubRunner):
+    q = GenerationQueue(runner, batch_window=0.2, max_batch_size=8)
+    yield q
+    q.close()
+
+
+def _submit(q: GenerationQueue, prompt: str, **kwargs):
+    return q.submit(prompt, negative_prompt="blurry", **kwargs)
+
+
+class TestGenerationQueue:
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_batch(self, gen_queue, runner):
+        images = await asyncio.gather(
+            *(_submit(gen_queue, f"item {i}", seed=i, size=16) for i in range(4))
+        )
+        assert [img.size for img in images] == [(16, 16)] * 4
+        assert [tuple(np.array(img)[0, 0]) for img in images] == [(i, 90, 200) for i in range(4)]
+        assert len(runner.batches) == 1
+        assert runner.batches[0][0] == ["item 0", "item 1", "item 2", "item 3"]
+
+    @pytest.mark.asyncio
+    async def test_incompatible_configs_run_separately(self, gen_queue, runner):
+        small = GenerationConfig(render_size=512)
+        await asyncio.gather(
+            _submit(gen_queue, "a"),
+            _submit(gen_queue, "b", config=small),
+            _submit(gen_queue, "c"),
+        )
+        assert sorted(len(prompts) for prompts, _ in runner.batches) == [1, 2]
+        assert {cfg.render_size for _, cfg in runner.batches} == {512, 1024}
+
+    @pytest.mark.asyncio
+    async def test_per_item_postprocessing(self, gen_queue, runner):
+        plain, quantized = await asyncio.gather(
+            _submit(gen_queue, "x", size=8), _submit(gen_queue, "y", size=32, palette="gameboy")
+        )
+        assert plain.size == (8, 8)
+        colors = {tuple(c) for c in np.array(quantized).reshape(-1, 3)}
+        assert colors <= set(GAMEBOY.colors)
+        assert len(runner.batches) == 1
+
+    @pytest.mark.asyncio
+    async def test_failure_propagates_to_every_caller(self):
+        q = GenerationQueue(_StubRunner(fail=True), batch_window=0.2)
+        try:
+            results = await asyncio.gather(_submit(q, "a"), _submit(q, "b"), return_exceptions=True)
+        finally:
+            q.close()
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_stats(self, gen_queue, runner):
+        await asyncio.gather(*(_submit(gen_queue, str(i)) for i in range(3)))
+        await _submit(gen_queue, "solo")
+        stats = gen_queue.stats()
+        assert stats["queue_depth"] == 0
+        assert stats["requests"] == 4
+        assert stats["batch_size_histogram"] == {1: 1, 3: 1}
+        assert stats["max_wait_s"] >= stats["mean_wait_s"] > 0
+
+    @pytest.mark.asyncio
+    async def test_max_batch_size_splits_groups(self, runner):
+        q = GenerationQueue(runner, batch_window=0.2, max_batch_size=2)
+        try:
+            await asyncio.gather(*(_submit(q, str(i)) for i in range(5)))
+        finally:
+            q.close()
+        assert all(len(prompts) <= 2 for prompts, _ in runner.batches)
+        assert sum(len(prompts) for prompts, _ in runner.batches) == 5
+
+    @pytest.mark.asyncio
+    async def test_variants_share_one_render(self, gen_queue, runner):
+        images = await gen_queue.submit_variants(
+            "sheet", negative_prompt="", outputs=[(8, None), (16, "gameboy"), (32, None)], seed=1
+        )
+        assert [img.size for img in images] == [(8, 8), (16, 16), (32, 32)]
+        assert runner.batches[0][0] == ["sheet"]
+
+    @pytest.mark.asyncio
+    async def test_frames_return_raw_renders(self, gen_queue, runner):
+        raws = await gen_queue.submit_frames(["a", "b", "c"], negative_prompt="", seeds=[4, 5, 6])
+        assert [img.getpixel((0, 0)) for img in raws] == [(4, 90, 200), (5, 90, 200), (6, 90, 200)]
+        assert runner.batches[0][0] == ["a", "b", "c"]
+
+    @pytest.mark.asyncio
+    async def test_on_submit_hook(self, runner):
+        submitted: list = []
+        q = GenerationQueue(runner, batch_window=0.01, on_submit=lambda: submitted.append(1))
+        try:
+            await _submit(q, "a")
+            await q.submit_frames(["b", "c"], negative_prompt="", seeds=[1, 2])
+        finally:
+            q.close()
+        assert len(submitted) == 2
@@ -0,0 +1,184 @@
+"""Tests for the on-disk result cache."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from pixelsmith._config import GenerationConfig
+from pixelsmith._palettes import GAMEBOY, PICO8
+from pixelsmith._result_cache import ResultCache, raw_key, sprite_key
+
+
+def _noise(seed: int, size: int = 32) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8), "RGB")
+
+
+class TestKeys:
+    def _key(self, **overrides):
+        args = {"negative_prompt": "blurry", "seed": 1, "config": GenerationConfig()}
+        args.update(overrides)
+        return raw_key("a knight", **args)
+
+    def test_stable(self):
+        assert self._key() == self._key()
+
+    def test_output_inputs_change_key(self):
+        base = self._key()
+        assert self._key(seed=2) != base
+        assert self._key(negative_prompt="") != base
+        assert self._key(config=GenerationConfig(guidance_scale=3.0)) != base
+        assert self._key(config=GenerationConfig(lora_weight=0.5)) != base
+
+    def test_output_neutral_settings_share_key(self):
+        cfg = GenerationConfig(cache_dir="/elsewhere", num_threads=2, result_cache=True)
+        assert self._key(config=cfg) == self._key()
+
+    @pytest.mark.parametrize(
+        "change",
+        [
+            {"attention": "xformers"},
+            {"attention_slicing": "auto"},
+            {"channels_last": True},
+            {"enable_cpu_offload": False},
+            {"lora_snapshot": True},
+            {"offload_mode": "sequential"},
+            {"vae_slicing": True},
+            {"vae_tiling": True},
+        ],
+    )
+    def test_rounding_sensitive_settings_change_key(self, change: dict):
+        # Different kernels round differently, which can flip quantized pixels.
+        assert self._key(config=GenerationConfig(**change)) != self._key()
+
+    def test_sprite_key_covers_post_processing(self):
+        raw = self._key()
+        keys = {
+            sprite_key(raw, size=32, palette=None),
+            sprite_key(raw, size=64, palette=None),
+            sprite_key(raw, size=64, palette=GAMEBOY),
+            sprite_key(raw, size=64, palette=PICO8),
+            sprite_key(raw, size=64, palette=PICO8, indexed=True),
+            sprite_key(raw, size=64, palette=PICO8, dither="bayer4"),
+            sprite_key(raw, size=64, palette=PICO8, downscale_mode="mode"),
+        }
+        assert len(keys) == 7
+        # Without a palette there is nothing to index, so the flag is irrelevant.
+        assert sprite_key(raw, size=32, palette=None, indexed=True) in keys
+
+
+class TestResultCache:
+    def test_roundtrip(self, tmp_path: Path):
+        cache = ResultCache(tmp_path, max_bytes=1 << 20)
+        assert cache.get("ab12") is None
+        img = _noise(0)
+        cache.put("ab12", img)
+        assert np.array_equal(np.array(cache.get("ab12")), np.array(img))
+        assert not list(tmp_path.rglob("*.tmp"))
+
+    def test_lru_eviction(self, tmp_path: Path):
+        cache = ResultCache(tmp_path, max_bytes=1 << 30)
+        for i, key in enumerate(("aa01", "bb02", "cc03")):
+            cache.put(key, _noise(i))
+            path = cache._path(key)
+            os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+        cache.get("aa01")  # refresh: bb02 is now least recently used
+
+        sizes = {k: cache._path(k).stat().st_size for k in ("aa01", "bb02", "cc03")}
+        cache.max_bytes = sizes["aa01"] + sizes["cc03"]
+        cache.evict()
+        assert cache.get("bb02") is None
+        assert cache.get("aa01") is not None
+        assert cache.get("cc03") is not None
+
+    def test_corrupt_entry_is_a_miss(self, tmp_path: Path):
+        cache = ResultCache(tmp_path, max_bytes=1 << 20)
+        path = cache._path("dd04")
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"not a png")
+        assert cache.get("dd04") is None
+        assert not path.exists()
+
+    def test_single_flight(self, tmp_path: Path):
+        cache = ResultCache(tmp_path, max_bytes=1 << 20)
+        started = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return _noise(5)
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_create("ee05", slow)))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(calls) == 1
+        assert len(results) == 4
+
+    def test_failure_is_not_cached(self, tmp_path: Path):
+        cache = ResultCache(tmp_path, max_bytes=1 << 20)
+
+        def boom():
+            raise RuntimeError("render failed")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_create("ff06", boom)
+        assert cache.get_or_create("ff06", lambda: _noise(6)).size == (32, 32)
+
+
+class TestGenerateWithResultCache:
+    @pytest.fixture
+    def renders(self, monkeypatch: pytest.MonkeyPatch) -> list:
+        import pixelsmith
+
+        calls: list = []
+
+        def fake_run(prompt, *, negative_prompt, seed, config, output_type="pil"):
+            calls.append(seed)
+            return _noise(seed, size=128)
+
+        monkeypatch.setattr(pixelsmith, "run_pipeline", fake_run)
+        return calls
+
+    def test_repeat_is_served_from_disk(self, renders: list, tmp_path: Path):
+        from pixelsmith import generate
+
+        cfg = GenerationConfig(cache_dir=str(tmp_path), result_cache=True)
+        first = generate("gem", size=16, seed=3, palette="pico8", config=cfg)
+        again = generate("gem", size=16, seed=3, palette="pico8", config=cfg)
+        assert renders == [3]
+        assert np.array_equal(np.array(first), np.array(again))
+
+    def test_new_size_reuses_raw_render(self, renders: list, tmp_path: Path):
+        from pixelsmith import generate
+
+        cfg = GenerationConfig(cache_dir=str(tmp_path), result_cache=True)
+        generate("gem", size=16, seed=3, config=cfg)
+        assert generate("gem", size=32, seed=3, config=cfg).size == (32, 32)
+        assert renders == [3]
+
+    def test_unseeded_and_disabled_skip_cache(self, renders: list, tmp_path: Path):
+        from pixelsmith import generate
+
+        cfg = GenerationConfig(cache_dir=str(tmp_path), result_cache=True)
+        generate("gem", size=16, seed=None, config=cfg)
+        generate("gem", size=16, seed=None, config=cfg)
+        generate("gem", size=16, seed=4, config=replace(cfg, result_cache=False))
+        generate("gem", size=16, seed=4, config=replace(cfg, result_cache=False))
+        assert renders == [None, None, 4, 4]
+        assert not (tmp_path / "results").exists()
@@ -0,0 +1,104 @@
+"""Tests for sprite-sheet assembly and manifests."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from pixelsmith import GAMEBOY
+from pixelsmith._sheet import build_sheet, sheet_grid, sheet_manifest, sheet_plan, sheet_seeds
+
+
+def _flat(color: tuple[int, int, int], side: int = 64) -> np.ndarray:
+    return np.full((side, side, 3), color, dtype=np.uint8)
+
+
+class TestSheetGrid:
+    def test_near_square_by_default(self):
+        assert sheet_grid(1, None) == (1, 1)
+        assert sheet_grid(4, None) == (2, 2)
+        assert sheet_grid(5, None) == (2, 3)
+
+    def test_cols_capped_at_frame_count(self):
+        assert sheet_grid(3, 8) == (1, 3)
+        assert sheet_grid(8, 1) == (8, 1)
+
+    @pytest.mark.parametrize(("n", "cols"), [(0, None), (3, 0)])
+    def test_rejects_empty_layouts(self, n: int, cols: int | None):
+        with pytest.raises(ValueError):
+            sheet_grid(n, cols)
+
+
+class TestSheetSeeds:
+    def test_derived_and_shared(self):
+        assert sheet_seeds(3, 10, shared=False) == [10, 11, 12]
+        assert sheet_seeds(3, 10, shared=True) == [10, 10, 10]
+
+    def test_random_base_is_recorded(self):
+        seeds = sheet_seeds(4, None, shared=False)
+        assert seeds == list(range(seeds[0], seeds[0] + 4))
+
+
+class TestSheetPlan:
+    def test_single_prompt_repeated(self):
+        prompts, seeds, cols = sheet_plan("coin", frames=3, cols=None, seed=5, shared_seed=False)
+        assert (prompts, seeds, cols) == (["coin"] * 3, [5, 6, 7], 2)
+
+    def test_prompt_list_one_per_frame(self):
+        prompts, _, _ = sheet_plan(["idle"], frames=None, cols=None, seed=1, shared_seed=True)
+        assert prompts == ["idle"]
+
+    @pytest.mark.parametrize("prompts", [["idle"], ["idle", "walk"]])
+    def test_frames_must_match_prompt_list(self, prompts: list[str]):
+        with pytest.raises(ValueError, match="frames=3"):
+            sheet_plan(prompts, frames=3, cols=None, seed=1, shared_seed=False)
+
+
+class TestBuildSheet:
+    def test_frames_land_in_their_cells(self):
+        colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+        atlas = build_sheet([_flat(c) for c in colors], 8, None, cols=2)
+        assert atlas.shape == (16, 16, 3)
+        for i, color in enumerate(colors):
+            y, x = (i // 2) * 8, (i % 2) * 8
+            assert (atlas[y : y + 8, x : x + 8] == color).all()
+        assert not atlas[8:, 8:].any()  # unused cell stays black
+
+    def test_quantizes_the_whole_sheet(self):
+        rng = np.random.default_rng(0)
+        raws = [rng.integers(0, 256, (32, 32, 3), dtype=np.uint8) for _ in range(4)]
+        atlas = build_sheet(raws, 16, GAMEBOY, cols=4)
+        assert {tuple(c) for c in atlas.reshape(-1, 3)} <= set(GAMEBOY.colors)
+
+    def test_indexed(self):
+        atlas = build_sheet(
+            [_flat((15, 56, 15)), _flat((155, 188, 15))], 8, GAMEBOY, cols=2, indexed=True
+        )
+        assert atlas.shape == (8, 16)
+        assert atlas.dtype == np.uint8
+        assert atlas.max() < len(GAMEBOY.colors)
+
+    def test_error_diffusion_stays_inside_cells(self):
+        rng = np.random.default_rng(1)
+        noisy = rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        frames = [noisy, _flat(GAMEBOY.colors[0])]
+        atlas = build_sheet(frames, 16, GAMEBOY, cols=2, dither="floyd_steinberg")
+        alone = build_sheet(frames[:1], 16, GAMEBOY, cols=1, dither="floyd_steinberg")
+        np.testing.assert_array_equal(atlas[:, :16], alone)
+        assert (atlas[:, 16:] == GAMEBOY.colors[0]).all()
+
+
+class TestSheetManifest:
+    def test_frame_coordinates(self):
+        manifest = sheet_manifest(["a", "b", "c"], [5, 6, 7], size=16, cols=2, palette=GAMEBOY)
+        assert (manifest["width"], manifest["height"]) == (32, 32)
+        assert manifest["palette"] == "gameboy"
+        assert manifest["frames"][2] == {
+            "index": 2,
+            "prompt": "c",
+            "seed": 7,
+            "x": 0,
+            "y": 16,
+            "w": 16,
+            "h": 16,
+        }
@@ -0,0 +1,230 @@
+"""Tests for fused-LoRA snapshots (fingerprints and validation offline, tiny models)."""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import replace
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from pixelsmith import _pipeline
+from pixelsmith._config import GenerationConfig, PipelineKey
+from pixelsmith._snapshot import (
+    find_snapshot,
+    snapshot_dir,
+    snapshot_id,
+    source_fingerprint,
+)
+
+
+@pytest.fixture
+def key(tmp_path: Path) -> PipelineKey:
+    """A snapshot key whose base model and LoRA are local directories."""
+    for name in ("base", "lora"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "weights.bin").write_bytes(b"w" * 16)
+    cfg = GenerationConfig(
+        base_model=str(tmp_path / "base"),
+        lora_repo=str(tmp_path / "lora"),
+        cache_dir=str(tmp_path / "cache"),
+        lora_snapshot=True,
+    )
+    return cfg.load_key()
+
+
+def _write_fake_snapshot(key: PipelineKey, sid: str | None = None) -> Path:
+    """A snapshot directory with one header-only safetensors file."""
+    sid = sid or snapshot_id(key)
+    directory = snapshot_dir(key, snapshot_id(key))
+    directory.mkdir(parents=True)
+    header = json.dumps({"__metadata__": {"snapshot": sid, "component": "unet"}}).encode()
+    path = directory / "unet.safetensors"
+    path.write_bytes(len(header).to_bytes(8, "little") + header)
+    manifest = {
+        "format": 1,
+        "id": snapshot_id(key),
+        "components": {"unet": {"bytes": path.stat().st_size, "tensors": 0}},
+    }
+    (directory / "manifest.json").write_text(json.dumps(manifest))
+    return directory
+
+
+class TestSnapshotKey:
+    def test_lora_weight_in_load_key_only_with_snapshot(self):
+        plain = GenerationConfig(lora_weight=0.6)
+        assert plain.load_key() == GenerationConfig().load_key()
+        snap = replace(plain, lora_snapshot=True)
+        assert snap.load_key().lora_weight == 0.6
+        assert snap.load_key() != replace(snap, lora_weight=1.2).load_key()
+
+    def test_id_tracks_inputs(self, key: PipelineKey):
+        sid = snapshot_id(key)
+        assert sid is not None
+        assert snapshot_id(replace(key, lora_weight=0.5)) != sid
+        assert snapshot_id(replace(key, dtype="float32")) != sid
+        lora = Path(key.lora_repo) / "weights.bin"
+        lora.write_bytes(b"v" * 17)  # retrained LoRA
+        assert snapshot_id(key) != sid
+
+    def test_no_id_without_weight_or_weights(self, key: PipelineKey):
+        assert snapshot_id(replace(key, lora_weight=None)) is None
+        assert snapshot_id(replace(key, base_model="org/not-downloaded")) is None
+
+    def test_hub_fingerprint_from_cache_ref(self, tmp_path: Path):
+        ref = tmp_path / "models--org--model" / "refs" / "main"
+        ref.parent.mkdir(parents=True)
+        ref.write_text("abc123\n")
+        assert source_fingerprint("org/model", str(tmp_path)) == "abc123"
+        assert source_fingerprint("org/other", str(tmp_path)) is None
+
+
+class TestFindSnapshot:
+    def test_valid(self, key: PipelineKey):
+        directory = _write_fake_snapshot(key)
+        assert find_snapshot(key) == {"unet": directory / "unet.safetensors"}
+
+    def test_missing(self, key: PipelineKey):
+        assert find_snapshot(key) is None
+
+    def test_truncated_file_is_discarded(self, key: PipelineKey):
+        directory = _write_fake_snapshot(key)
+        with open(directory / "unet.safetensors", "ab") as f:
+            f.write(b"junk")
+        assert find_snapshot(key) is None
+        assert not directory.exists()
+
+    def test_foreign_file_is_discarded(self, key: PipelineKey):
+        directory = _write_fake_snapshot(key, sid="0" * 32)
+        assert find_snapshot(key) is None
+        assert not directory.exists()
+
+    def test_corrupt_manifest_is_discarded(self, key: PipelineKey):
+        directory = _write_fake_snapshot(key)
+        (directory / "manifest.json").write_text("{not json")
+        assert find_snapshot(key) is None
+        assert not directory.exists()
+
+
+class _LcmStub:
+    def __init__(self) -> None:
+        self.calls: list = []
+        self.enabled = True  # loaded adapters start active
+
+    def enable_lora(self):
+        self.calls.append(("enable",))
+        self.enabled = True
+
+    def disable_lora(self):
+        self.calls.append(("disable",))
+        self.enabled = False
+
+    def set_adapters(self, names, adapter_weights):
+        self.calls.append(("set", list(names)))
+
+    def fuse_lora(self, lora_scale=1.0, adapter_names=None):
+        self.calls.append(("fuse", list(adapter_names)))
+
+    def unfuse_lora(self):
+        self.calls.append(("unfuse",))
+
+
+class TestBakedPipeline:
+    def test_without_lcm_nothing_is_applied(self, key: PipelineKey):
+        pipe = _LcmStub()
+        entry = _pipeline._LoadedPipeline(pipe, key)
+        _pipeline._apply_lora_weight(entry, key.lora_weight)
+        assert pipe.calls == []
+
+    def test_only_lcm_is_fused(self, key: PipelineKey):
+        key = replace(key, lcm_lora_path="/models/lcm")
+        pipe = _LcmStub()
+        entry = _pipeline._LoadedPipeline(pipe, key)
+        _pipeline._apply_lora_weight(entry, key.lora_weight)
+        assert not pipe.enabled  # the freshly loaded LCM adapter is switched off
+        pipe.calls.clear()
+
+        _pipeline._apply_lora_weight(entry, key.lora_weight, lcm=True)
+        assert pipe.enabled
+        assert pipe.calls == [("enable",), ("set", ["lcm"]), ("fuse", ["lcm"])]
+        pipe.calls.clear()
+
+        _pipeline._apply_lora_weight(entry, key.lora_weight)
+        assert not pipe.enabled  # LCM is inactive after switching back
+        assert pipe.calls == [("unfuse",), ("disable",)]
+
+
+def _tiny_components():
+    """A tiny SDXL-shaped UNet and text encoders, built from local configs only."""
+    torch = pytest.importorskip("torch")
+    diffusers = pytest.importorskip("diffusers")
+    transformers = pytest.importorskip("transformers")
+    pytest.importorskip("accelerate")
+    pytest.importorskip("safetensors")
+
+    torch.manual_seed(0)
+    unet = diffusers.UNet2DConditionModel(
+        block_out_channels=(32, 64),
+        layers_per_block=1,
+        sample_size=16,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+        up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+        attention_head_dim=(2, 4),
+        use_linear_projection=True,
+        addition_embed_type="text_time",
+        addition_time_embed_dim=8,
+        transformer_layers_per_block=(1, 2),
+        projection_class_embeddings_input_dim=80,
+        cross_attention_dim=64,
+    )
+    text_config = transformers.CLIPTextConfig(
+        hidden_size=32,
+        intermediate_size=37,
+        num_attention_heads=4,
+        num_hidden_layers=2,
+        vocab_size=1000,
+        projection_dim=32,
+    )
+    return {
+        "unet": unet,
+        "text_encoder": transformers.CLIPTextModel(text_config),
+        "text_encoder_2": transformers.CLIPTextModelWithProjection(text_config),
+    }
+
+
+class TestSnapshotRoundTrip:
+    def test_save_then_load_matches(self, key: PipelineKey):
+        components = _tiny_components()
+        import torch
+
+        from pixelsmith._snapshot import load_components, save_snapshot
+
+        base = Path(key.base_model)
+        for name, module in components.items():
+            module.save_pretrained(base / name)  # configs for load_components
+        pipe = SimpleNamespace(**components)
+
+        directory = save_snapshot(pipe, key, ["unet", "text_encoder"])
+        assert directory is not None
+        assert not [p for p in directory.parent.iterdir() if ".tmp-" in p.name]
+        files = find_snapshot(key)
+        assert set(files) == {"unet", "text_encoder"}
+
+        loaded = load_components(key, files, torch.float32)
+        for name, module in loaded.items():
+            expected = components[name].state_dict()
+            for k, v in module.state_dict().items():
+                assert torch.equal(v, expected[k]), (name, k)
+
+    def test_changed_base_invalidates(self, key: PipelineKey):
+        components = _tiny_components()
+        from pixelsmith._snapshot import save_snapshot
+
+        save_snapshot(SimpleNamespace(**components), key, ["text_encoder"])
+        assert find_snapshot(key) is not None
+        os.utime(Path(key.base_model) / "weights.bin", ns=(0, 0))
+        assert find_snapshot(key) is None
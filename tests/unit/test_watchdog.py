@@ -0,0 +1,266 @@
+"""Tests for the MCP server's pipeline watchdog (stub pipeline, fake clocks)."""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import replace
+from datetime import datetime, timedelta
+from datetime import time as dtime
+from types import SimpleNamespace
+
+import pytest
+
+from pixelsmith import _pipeline
+from pixelsmith._config import GenerationConfig
+from pixelsmith._embedding_cache import EmbeddingCache
+from pixelsmith._pipeline_cache import PipelineCache
+from pixelsmith.mcp._watchdog import PipelineWatchdog, parse_prewarm
+
+_CPU = GenerationConfig(device="cpu")
+
+
+class _StubPipeline:
+    def __init__(self, key):
+        self.key = key
+        self.scheduler = SimpleNamespace(config={})
+
+    def set_adapters(self, names, adapter_weights):
+        pass
+
+    def fuse_lora(self, lora_scale=1.0, adapter_names=None):
+        pass
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.t = 0.0
+        self.wall = datetime(2026, 1, 5, 8, 0)
+
+    def __call__(self) -> float:
+        return self.t
+
+    def now(self) -> datetime:
+        return self.wall
+
+    def advance(self, seconds: float) -> None:
+        self.t += seconds
+        self.wall += timedelta(seconds=seconds)
+
+
+@pytest.fixture
+def loads(monkeypatch: pytest.MonkeyPatch) -> list:
+    calls: list = []
+
+    def fake_build(key):
+        calls.append(key)
+        return _StubPipeline(key)
+
+    monkeypatch.setattr(_pipeline, "_build_pipeline", fake_build)
+    monkeypatch.setattr(_pipeline, "_cache", PipelineCache())
+    monkeypatch.setattr(_pipeline, "_embeddings", EmbeddingCache())
+    monkeypatch.setattr(
+        _pipeline, "_make_scheduler", lambda name, config: SimpleNamespace(config=config)
+    )
+    return calls
+
+
+@pytest.fixture
+def clock() -> _Clock:
+    return _Clock()
+
+
+def _watchdog(clock: _Clock, usage: dict | None = None, **kwargs) -> PipelineWatchdog:
+    usage = usage if usage is not None else {"host": 0.1, "device": None}
+    return PipelineWatchdog(
+        config=_CPU, clock=clock, now=clock.now, memory_probe=lambda: dict(usage), **kwargs
+    )
+
+
+def _resident() -> int:
+    return _pipeline.pipeline_cache_stats().entries
+
+
+class TestIdleUnload:
+    def test_unloads_after_timeout(self, loads: list, clock: _Clock):
+        dog = _watchdog(clock, idle_timeout=60)
+        _pipeline._load_pipeline(_CPU)
+        clock.advance(59)
+        dog.tick()
+        assert _resident() == 1
+        clock.advance(1)
+        dog.tick()
+        assert _resident() == 0
+        assert dog.stats()["event_counts"] == {"idle_unload": 1}
+
+    def test_activity_resets_timer(self, loads: list, clock: _Clock):
+        dog = _watchdog(clock, idle_timeout=60)
+        _pipeline._load_pipeline(_CPU)
+        clock.advance(50)
+        dog.wrap(lambda: None)()
+        clock.advance(50)
+        dog.tick()
+        assert _resident() == 1
+
+    def test_never_unloads_while_busy(self, loads: list, clock: _Clock):
+        dog = _watchdog(clock, idle_timeout=60)
+        _pipeline._load_pipeline(_CPU)
+        with dog.active():
+            clock.advance(600)
+            dog.tick()
+            assert _resident() == 1
+            assert dog.stats()["busy"]
+
+
+class TestMemoryPressure:
+    def test_shrinks_before_unloading(self, loads: list, clock: _Clock):
+        _pipeline.configure_pipeline_cache(max_entries=2)
+        try:
+            _pipeline._load_pipeline(_CPU)
+            _pipeline._load_pipeline(replace(_CPU, dtype="float32"))
+            usage = {"host": 0.95, "device": None}
+
+            def probe():
+                reading = dict(usage)
+                usage["host"] = 0.5  # shrinking relieves the pressure
+                return reading
+
+            dog = PipelineWatchdog(
+                memory_threshold=0.9, clock=clock, now=clock.now, memory_probe=probe
+            )
+            dog.tick()
+        finally:
+            _pipeline.configure_pipeline_cache(max_entries=1)
+        assert _resident() == 1
+        assert dog.stats()["event_counts"] == {"shrink": 1}
+
+    def test_unloads_when_still_over(self, loads: list, clock: _Clock):
+        dog = _watchdog(clock, {"host": 0.2, "device": 0.97}, memory_threshold=0.9)
+        _pipeline._load_pipeline(_CPU)
+        dog.tick()
+        assert _resident() == 0
+        events = dog.stats()["events"]
+        assert [(e["event"], e["detail"]) for e in events] == [
+            ("shrink", "device"),
+            ("pressure_unload", "device"),
+        ]
+
+    def test_nothing_to_free_is_quiet(self, loads: list, clock: _Clock):
+        # Another process holds the memory and nothing is loaded here.
+        dog = _watchdog(clock, {"host": 0.95, "device": None}, memory_threshold=0.9)
+        for _ in range(3):
+            dog.tick()
+            clock.advance(10)
+        assert dog.stats()["event_counts"] == {}
+
+    def test_rejects_bad_threshold(self):
+        with pytest.raises(ValueError, match="memory_threshold"):
+            PipelineWatchdog(memory_threshold=1.5)
+
+
+class TestPrewarm:
+    def test_scheduled(self, loads: list, clock: _Clock):
+        dog = _watchdog(clock, prewarm_at=[dtime(9, 0)])
+        clock.advance(3599)
+        dog.tick()
+        assert not loads
+        clock.advance(2)
+        dog.tick()
+        dog.close()
+        assert len(loads) == 1
+        clock.advance(60)
+        _pipeline.unload_pipeline()
+        dog.tick()  # once per day
+        assert len(loads) == 1
+
+    def test_on_first_request_after_unload(self, loads: list, clock: _Clock):
+        dog = _watchdog(clock, prewarm_on_request=True)
+        dog.on_request()
+        dog.close()
+        assert len(loads) == 1
+        dog.on_request()  # already resident
+        dog.close()
+        assert dog.stats()["event_counts"] == {"prewarm": 1}
+
+    def test_parse_spec(self):
+        assert parse_prewarm("") == (False, [])
+        assert parse_prewarm("request, 09:00,13:30") == (True, [dtime(9), dtime(13, 30)])
+        with pytest.raises(ValueError, match="Unknown prewarm trigger"):
+            parse_prewarm("hourly")
+
+    def test_from_env(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setenv("PIXELSMITH_IDLE_TIMEOUT", "300")
+        monkeypatch.setenv("PIXELSMITH_PREWARM", "request")
+        dog = PipelineWatchdog.from_env()
+        assert dog.idle_timeout == 300
+        assert dog.memory_threshold is None
+        assert dog.prewarm_on_request
+        assert dog.enabled
+
+
+class TestReadiness:
+    def test_requests_wait_for_startup_load(
+        self, loads: list, clock: _Clock, monkeypatch: pytest.MonkeyPatch
+    ):
+        release = threading.Event()
+        fake_build = _pipeline._build_pipeline
+
+        def slow_build(key):
+            assert release.wait(5)
+            return fake_build(key)
+
+        monkeypatch.setattr(_pipeline, "_build_pipeline", slow_build)
+        dog = _watchdog(clock)
+        dog.prewarm("startup")
+        clock.advance(3)
+        assert dog.readiness()["state"] == "loading"
+        assert dog.readiness()["elapsed_s"] == 3
+
+        ran = threading.Event()
+        request = threading.Thread(target=dog.wrap(ran.set))
+        request.start()
+        assert not ran.wait(0.05)  # still waiting on the load
+        release.set()
+        request.join(5)
+        assert ran.is_set()
+        ready = dog.readiness()
+        assert (ready["state"], ready["reason"], ready["elapsed_s"]) == ("ready", "startup", 3)
+        assert len(loads) == 1
+
+    def test_warmup_runs_one_step(
+        self, loads: list, clock: _Clock, monkeypatch: pytest.MonkeyPatch
+    ):
+        renders: list = []
+        monkeypatch.setattr(
+            _pipeline, "run_pipeline", lambda prompt, **kwargs: renders.append(kwargs["config"])
+        )
+        dog = _watchdog(clock)
+        dog.prewarm("startup", warmup=True)
+        dog.wait_ready()
+        assert [cfg.num_inference_steps for cfg in renders] == [1]
+        assert renders[0].load_key() == _CPU.load_key()
+        assert dog.readiness()["ready"]
+
+    def test_failure_reported(self, clock: _Clock, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(_pipeline, "_cache", PipelineCache())
+
+        def broken(key):
+            raise OSError("no such model")
+
+        monkeypatch.setattr(_pipeline, "_build_pipeline", broken)
+        dog = _watchdog(clock)
+        dog.prewarm("startup")
+        dog.wait_ready()
+        ready = dog.readiness()
+        assert ready["state"] == "failed"
+        assert "no such model" in ready["error"]
+
+    def test_prewarm_restarts_idle_timer(self, loads: list, clock: _Clock):
+        dog = _watchdog(clock, idle_timeout=60)
+        clock.advance(3600)
+        dog.prewarm("schedule")
+        dog.wait_ready()
+        dog.tick()
+        assert _resident() == 1
+        clock.advance(60)
+        dog.tick()
+        assert dog.readiness()["state"] == "cold"